@@ -5,8 +5,19 @@ tab1, tab2 = st.tabs(["Harmonization", "Add to or view Synonym Mappings"])
 with tab1:
     import pandas as pd
     from harmonization import process_raw_to_template
-    from harmonization import build_transformations
-    import io
+    from manifest_join import ManifestIndex
+    from batch_harmonize import mapping_config
+    from ingestion import preview_uploaded, read_uploaded, upload_digest
+    from column_cache import ColumnCache
+    from export import parquet_bytes, persist_dataset, xlsx_bytes
+    from profiling import StageProfiler, stage
+    from fuzzy import DEFAULT_THRESHOLD, SUGGESTION_COLUMNS, suggestion_report
+    from jobs import get_job_runner
+    from template_fields import TEMPLATE_FIELDS
+    from validation import Validator
+    from sample_store import save_harmonized
+    import json
+    import os
 
     st.title("Raw to Template Harmonization")
 
@@ -32,7 +43,7 @@ with tab1:
 
     if raw_file and sheet_name_raw:
         try:
-            raw_preview = pd.read_excel(raw_file, sheet_name=sheet_name_raw, header=raw_header)
+            raw_preview = preview_uploaded(raw_file, sheet_name=sheet_name_raw, header=raw_header)
             with st.sidebar.expander("Raw File Preview", expanded=True):
                 st.dataframe(raw_preview.head(5).reset_index(drop=True), height=200, hide_index=True)
             all_column_options.extend(raw_preview.columns.tolist())
@@ -40,107 +51,15 @@ with tab1:
             st.sidebar.warning(f"Could not preview raw file: {e}")
     if shipping_file and sheet_name_shipping:
         try:
-            shipping_preview = pd.read_excel(shipping_file, sheet_name=sheet_name_shipping, header=shipping_header)
+            shipping_preview = preview_uploaded(shipping_file, sheet_name=sheet_name_shipping, header=shipping_header)
             with st.sidebar.expander("Shipping Manifest Preview", expanded=True):
                 st.dataframe(shipping_preview.head(5).reset_index(drop=True), height=200, hide_index=True)
             all_column_options.extend(shipping_preview.columns.tolist())
         except Exception as e:
             st.sidebar.warning(f"Could not preview shipping manifest: {e}")
 
-    if raw_preview is not None and shipping_preview is not None:
-        st.subheader("Merge Raw and Shipping Files")
-        raw_col_merge = st.selectbox("Select column to merge raw file on:", options=[""] + raw_preview.columns.tolist(), key="raw_col_merge")
-        ship_col_merge = st.selectbox("Select column to merge shipping manifest on:", options=[""] + shipping_preview.columns.tolist(), key="ship_col_merge")
-    else:
-        raw_col_merge= ship_col_merge = None
-
-
-    st.markdown("<hr style='border: 1.5px solid black;'>", unsafe_allow_html=True)
-
     # Guided Column Mapping
-    st.subheader("Guided Column Mapping")
-    template_fields = {
-        "ExternalId":{"allowed":"","definition":"Sample ID received from site"},
-        "Received Date":{"allowed":"","definition":"Must be in format XX-MON-YYYY (e.g. 01-JAN-2023)"},
-        "ContainerType":{"allowed":"Slide, Tube, Plate, FFPE Block","definition":""},
-        "Volume_uL":{"allowed":"","definition":""},
-        "TubeBarcode":{"allowed":"","definition":""},
-        "Concentration":{"allowed":"","definition":""},
-        "ConcentrationUnits":{"allowed":"","definition":""},
-        "Organism":{"allowed":"Human, Mouse, Mouse PDX","definition":""},
-        "Stabilizer":{"allowed":"Streck, Accucyte, EDTA, PAXgene ccfDNA","definition":""},
-        "Single or Double Spun":{"allowed":"Single, Double","definition":""},
-        "Processing Method":{"allowed":"","definition":""},
-        "Processing Time(hrs)":{"allowed":"","definition":""},
-        "Freeze Thaw Status":{"allowed":"0,1,2,3,4,4, Unknown","definition":"Number of freeze-thaw cycles the sample has undergone."},
-        "Hemolysis":{"allowed":"no hemolysis, light hemolysis, strong hemolysis, hemolysis","definition":"Documentation for quality of plasma (leave blank for non-plasma samples)"},
-        "Project":{"allowed":"","definition":""},
-        "Matched FFPE Available":{"allowed":"Yes, No","definition":"Add for plasma samples (not for FFPE samples themselves)"},
-        "Date of Blood Draw/Cell Collection":{"allowed":"","definition":"Must be in format XX-MON-YYYY (e.g. 01-JAN-2023)"},
-        "Time of Draw":{"allowed":"","definition":"Must be in format HH:MM (e.g. 14:30)"},
-        "Block Size":{"allowed":"","definition":""},
-        "Tissue Size":{"allowed":"","definition":""},
-        "Tissue Weight (mg)":{"allowed":"","definition":"(Decimal value)"},
-        "% Tumor":{"allowed":"","definition":"(Decimal value)"},
-        "% Necrosis":{"allowed":"","definition":"(Decimal value)"},
-        "Surgery Type":{"allowed":"biopsy, resection","definition":""},
-        "Tumor Tissue Type":{"allowed":"primary, metastasis","definition":""},
-        "Data Transformer":{"allowed":"","definition":"Name of person transforming the data"},
-        "Date of Transformation":{"allowed":"","definition":"Must be in format XX-MON-YYYY (e.g. 01-JAN-2023)"},
-        "Other Sample Notes":{"allowed":"","definition":""},
-        "ExSpecimenId":{"allowed":"","definition":""},
-        "Collection Site":{"allowed":"","definition":""},
-        "SpecimenType":{"allowed":"Cell Line, Blood","definition":""},
-        "Condition":{"allowed":"cancer, autoimmune, pregnancy, healthy","definition":""},
-        "Diagnostic Condition":{"allowed":"breast cancer, colorectal cancer, lung cancer, gastroesophageal cancer, multiple sclerosis, osteosarcoma, ovarian cancer","definition":""},
-        "Histology":{"allowed":"adenocarcinoma, carcinoma, epithelial tumor, endometrioid carcinoma, mucinous adenocarcinoma, infiltrating ductal carcinoma, infiltrating lobular carcinoma, large cell neuroendocrine carcinoma, large cell carcinoma, lobular carcinoma in situ, ductal carcinoma in situ, non-small cell lung cancer NOS, phylloides tumor, secretory carcinoma, small cell carcinoma, squamous cell carcinoma, signet ring cell carcinoma, neuroendocrine carcinoma, NOS, metastatic castration-resistant prostate cancer (mCRPC), invasive carcinoma NOS, acinar adenocarcinoma, pleomorphic carcinoma, lepidic adenocarcinoma, papillary adenocarcinoma,metaplastic carcinoma, serous carcinoma, not applicable, not received, SPMS, RRMS, PPMS,","definition":""},
-        "Height":{"allowed":"","definition":""},
-        "Weight":{"allowed":"","definition":""},
-        "Duration between Cancer Diagnosis and Blood Draw (days)":{"allowed":"","definition":""},
-        "Duration between Metastatic Diagnosis and Blood Draw (days)":{"allowed":"","definition":""},
-        "Sample Timepoint":{"allowed":"treatment-naïve, undergoing treatment, progression, study termination","definition":""},
-        "Sample Timepoint Description":{"allowed":"","definition":"Use this field if the sample timepoint is not one of the standard options above."},
-        "AgeAtCollection":{"allowed":"","definition":""},
-        "Detailed Anatomical Location":{"allowed":"","definition":""},
-        "Grade":{"allowed":"","definition":""},
-        "Tumor Size":{"allowed":"","definition":""},
-        "TNM":{"allowed":"","definition":""},
-        "Duration between TNM Staging and Blood Draw (days)":{"allowed":"","definition":""},
-        "Stage":{"allowed":" I, II, III, IV","definition":""},
-        "Stage Detailed":{"allowed":"","definition":""},
-        "Morphology Code":{"allowed":"","definition":""},
-        "Description of Morphology Code":{"allowed":"","definition":""},
-        "Metastatic Sites":{"allowed":"","definition":"Organs the cancer has metastasized to, e.g. liver, lung, bone, brain"},
-        "Vehicle Control":{"allowed":"","definition":""},
-        "Media Conditions":{"allowed":"","definition":""},
-        "Additional Supplements to Media":{"allowed":"","definition":""},
-        "Protocols for Harvesting Cell Lines":{"allowed":"","definition":""},
-        "Blood collection date (days from birth)":{"allowed":"","definition":""},
-        "Number of lines of metastatic therapy at time of blood draw":{"allowed":"","definition":""},
-        "Number of lines of chemotherapy at time of blood draw":{"allowed":"","definition":""},
-        "Number of lines of anti-HER2 therapy at time of blood draw":{"allowed":"","definition":""},
-        "Number of lines of endocrine therapy at time of blood draw":{"allowed":"","definition":""},
-        "Overall Survival(months)":{"allowed":"","definition":""},
-        "Treatment Data":{"allowed":"","definition":""},
-        "Progression Free Survival(months)":{"allowed":"","definition":""},
-        "Gestational Age at Collection":{"allowed":"","definition":"Only needed for pregnancy samples"},
-        "Fetus Sex":{"allowed":"Male, Female, Unknown","definition":"Only needed for pregnancy samples"},
-        "Menopausal Status":{"allowed":"premenopause, perimenopause, menopause, postmenopause","definition":""},
-        "Blood Type":{"allowed":"","definition":""},
-        "RNA-Sequencing Available":{"allowed":"Yes, No","definition":""},
-        "ExPatientId":{"allowed":"","definition":""},
-        "Source":{"allowed":"AstraZeneca, Biomedica CRO Inc., DxBio, ATCC, Biometas, Menarini, Coriell, Precision for Medicine, BMS, Discovery Life Sciences, Rarecyte, Proteo, AMSBIO, UPMC, Indivumed GmbH, Research Blood Components, Garner Biosolutions Inc, Genentech, Genentech-UCSF, MD Anderson, MT Group, MGH Klempner, Other, OHSU, DFCI, UCSF, Turku, Duke, EMD Serono, Novartis, Tyra, Duke, MD Anderson, Menarini, AstraZeneca, EMD Serono","definition":"Vendor or Academic partner where samples were sourced from"},
-        "Country":{"allowed":"","definition":""},
-        "Gender":{"allowed":"Male, Female, Unknown","definition":""},
-        "Race":{"allowed":"American Indian or Alaska Native, Asian, Black or African American, Hispanic or Latino, Native Hawaiian or Other Pacific Islander, White","definition":""},
-        "MedicalHistory":{"allowed":"","definition":""},
-        "FamilyHistory":{"allowed":"","definition":""},
-        "AlcoholHistory":{"allowed":"","definition":""},
-        "SmokingHistory":{"allowed":"Current Smoker, Former Smoker, Never Smoked, not received, not applicable, Smoking History Present","definition":""},
-        "Number of years smoked or smoking":{"allowed":"","definition":""},
-        "Smoking Notes":{"allowed":"","definition":"Number of packs, ect."},
-        "Donor Notes":{"allowed":"","definition":"Any other info not captured above"}
-    }
+    template_fields = TEMPLATE_FIELDS
 
     column_mapping = {}
     fixed_values = {}
@@ -153,6 +72,81 @@ with tab1:
         "Duration between Metastatic Diagnosis and Blood Draw (days)"
     ]
 
+    # Saved mapping profiles: a profile matching these headers is applied automatically
+    profile = None
+    prefilled_fields = set()
+    if all_column_options:
+        from db import get_database
+        from profiles import covered_fields, header_signature, list_profiles, load_profile, match_profile, save_profile, widget_state
+
+        profile_db = get_database()
+        saved_profiles = list_profiles(profile_db)
+        profile_names = saved_profiles["name"].tolist()
+        matched_profile = match_profile(profile_db, all_column_options, saved_profiles)
+
+        st.subheader("Mapping Profile")
+        profile_name = st.selectbox(
+            "Apply a saved mapping profile:",
+            options=[""] + profile_names,
+            index=profile_names.index(matched_profile) + 1 if matched_profile else 0,
+            key=f"profile_{header_signature(all_column_options)}"
+        )
+        if profile_name:
+            profile = load_profile(profile_db, profile_name)
+        if profile is not None:
+            if profile_name == matched_profile:
+                st.caption(f"Profile '{profile_name}' matches these headers and was applied automatically.")
+            show_all_fields = st.checkbox("Show fields already filled by the profile", value=False, key="show_all_fields")
+            merge_options = {}
+            if raw_preview is not None and shipping_preview is not None:
+                merge_options = {"raw_col_merge": raw_preview.columns.tolist(), "ship_col_merge": shipping_preview.columns.tolist()}
+            profile_state = widget_state(profile, template_fields, all_column_options, calculated_fields, merge_options)
+            # a newly chosen profile overrides the widgets; after that only keys Streamlit dropped
+            # (widgets that were hidden) are seeded again, so edits survive reruns
+            if st.session_state.get("applied_profile") != profile_name:
+                st.session_state.update(profile_state)
+                st.session_state["applied_profile"] = profile_name
+            else:
+                for key, val in profile_state.items():
+                    st.session_state.setdefault(key, val)
+            if not show_all_fields:
+                prefilled_fields = covered_fields(profile, template_fields, all_column_options)
+
+    # Template-field suggestions from the column-mapping model, scored for all columns at once
+    suggestions = {}
+    if all_column_options:
+        from predictor import MIN_CONFIDENCE, SAMPLE_ROWS, load_predictor
+
+        column_predictor = load_predictor()
+        if column_predictor is not None and st.checkbox("Suggest mappings with the column-prediction model", value=True, key="use_predictor"):
+            sample_frames = []
+            if raw_preview is not None:
+                sample_frames.append(read_uploaded(raw_file, sheet_name=sheet_name_raw, header=raw_header, nrows=SAMPLE_ROWS))
+            if shipping_preview is not None:
+                sample_frames.append(read_uploaded(shipping_file, sheet_name=sheet_name_shipping, header=shipping_header, nrows=SAMPLE_ROWS))
+            suggestions = column_predictor.suggest(sample_frames, template_fields)
+
+            # prefill once per file, leaving profile decisions and earlier choices alone
+            if st.session_state.get("suggested_for") != header_signature(all_column_options):
+                profile_fields = profile["column_mapping"] if profile else {}
+                for field, candidates in suggestions.items():
+                    column, confidence = candidates[0]
+                    if confidence >= MIN_CONFIDENCE and field not in profile_fields and not st.session_state.get(f"map_{field}"):
+                        st.session_state[f"map_{field}"] = column
+                st.session_state["suggested_for"] = header_signature(all_column_options)
+
+    if raw_preview is not None and shipping_preview is not None:
+        st.subheader("Merge Raw and Shipping Files")
+        raw_col_merge = st.selectbox("Select column to merge raw file on:", options=[""] + raw_preview.columns.tolist(), key="raw_col_merge")
+        ship_col_merge = st.selectbox("Select column to merge shipping manifest on:", options=[""] + shipping_preview.columns.tolist(), key="ship_col_merge")
+    else:
+        raw_col_merge= ship_col_merge = None
+
+
+    st.markdown("<hr style='border: 1.5px solid black;'>", unsafe_allow_html=True)
+
+    st.subheader("Guided Column Mapping")
+
     if all_column_options:
 
 
@@ -163,8 +157,25 @@ with tab1:
         progress_bar = st.sidebar.progress(0)
 
         review_comments= {}
+        height_truth = profile["height_truth"] if profile else "cm"
+        weight_truth = profile["weight_truth"] if profile else "kg"
+
+        if prefilled_fields:
+            st.info(f"{len(prefilled_fields)} fields were filled from profile '{profile_name}'; {total_fields - len(prefilled_fields)} still need a decision.")
 
         for field,meta in template_fields.items():
+            if field in prefilled_fields:
+                column_mapping[field] = profile["column_mapping"][field]
+                if field in profile["fixed_values"]:
+                    fixed_values[field] = profile["fixed_values"][field]
+                if field in profile["calculation_functions"]:
+                    calculation_functions[field] = profile["calculation_functions"][field]
+                if field in profile["review_comments"]:
+                    review_comments[field] = profile["review_comments"][field]
+                mapped_fields += 1
+                progress_bar.progress(int((mapped_fields / total_fields) * 100))
+                continue
+
             st.markdown(f"### {field}")
 
             if meta["definition"]:
@@ -208,6 +219,8 @@ with tab1:
                     options=[""] + all_column_options,
                     key=f"map_{field}"
                 )
+                if field in suggestions:
+                    st.caption("Suggested: " + ", ".join(f"{col} ({confidence:.0%})" for col, confidence in suggestions[field]))
 
             flag_for_review = st.checkbox(f"Flag '{field}' for review", key=f"flag_review_{field}")
             if flag_for_review:
@@ -225,6 +238,33 @@ with tab1:
 
             st.markdown("---")
 
+        mapping_configuration = mapping_config(
+            column_mapping=column_mapping,
+            fixed_values=fixed_values,
+            calculation_functions=calculation_functions,
+            height_truth=height_truth,
+            weight_truth=weight_truth,
+            raw_col_merge=raw_col_merge or None,
+            ship_col_merge=ship_col_merge or None,
+            sheet_name_raw=sheet_name_raw,
+            raw_header=int(raw_header),
+            sheet_name_shipping=sheet_name_shipping,
+            shipping_header=int(shipping_header),
+            review_comments=review_comments
+        )
+        st.download_button(
+            label="💾 Download mapping configuration (for batch_harmonize.py)",
+            data=json.dumps(mapping_configuration, indent=2),
+            file_name=f"{dataset}_mapping_config.json",
+            mime="application/json"
+        )
+
+        with st.expander("Save this mapping as a profile"):
+            new_profile_name = st.text_input("Profile name", value=profile_name or dataset, key="new_profile_name")
+            if st.button("Save profile") and new_profile_name:
+                save_profile(profile_db, new_profile_name, all_column_options, mapping_configuration)
+                st.success(f"Saved profile '{new_profile_name}'. Files with the same headers will use it automatically.")
+
     else:
         st.info("Please upload and configure the raw file and/or shipping manifest to proceed with mapping.")
 
@@ -233,37 +273,79 @@ with tab1:
     extract_menopause_from_biomarker = st.checkbox(
         "Extract Menopausal Status from Biomarker Columns?", value=True
     )
-    import mysql.connector
-    from harmonization import load_mapping
-
-    conn = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="your_new_password",
-        database="mappings_db"
+    from db import MAPPING_TABLES, get_database
+    from mapping_store import get_mapping_store
+    from synonym_io import import_synonyms
+
+    database = get_database()
+
+    # cached for the whole process; only tables edited since the last run are reloaded
+    mapping_store = get_mapping_store().refresh(database)
+    biomarker_mapping = mapping_store.mapping("biomarker_mappings")
+    pos_neg_mapping = mapping_store.mapping("pos_neg_mappings")
+    her2_ihc_mapping = mapping_store.mapping("her2_ihc_mappings")
+    menopause_mapping = mapping_store.mapping("menopause_mappings")
+
+    fuzzy_matching = st.checkbox("Fuzzy-match values that are not in the synonym tables", value=False)
+    fuzzy_threshold = st.slider("Fuzzy match threshold", 0.6, 1.0, DEFAULT_THRESHOLD, 0.01) if fuzzy_matching else None
+    transformations = mapping_store.transformations(fuzzy_threshold)
+
+
+    stream_xlsx = st.checkbox("Stream XLSX in constant-memory mode (large outputs)", value=False)
+    persist_arrow = st.checkbox("Save harmonized dataset as Arrow under the dataset name", value=False)
+    save_to_database = st.checkbox("Save harmonized samples to the database (updates samples saved before)", value=False)
+    profile_run = st.checkbox("Record run diagnostics (time per stage)", value=False)
+    profile_memory = profile_run and st.checkbox("Also track peak memory per stage (slower)", value=False)
+    run_in_background = st.checkbox(
+        "Run in the background (results stay downloadable below; runs queue instead of slowing each other down)", value=False
     )
 
-    biomarker_mapping = load_mapping(conn, "biomarker_mappings", std_col="standard_name")
-    pos_neg_mapping = load_mapping(conn, "pos_neg_mappings")
-    her2_ihc_mapping = load_mapping(conn, "her2_ihc_mappings")
-    menopause_mapping = load_mapping(conn, "menopause_mappings", std_col="standard_term")
-
-    conn = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="your_new_password",
-        database="mappings_db"
-    )
-
-    transformations = build_transformations(conn)
-
-
     #run the harmonization process
-    if st.button("Run Harmonization"):
-        raw = pd.read_excel(raw_file, sheet_name=sheet_name_raw, header=raw_header)
-        template = pd.read_excel(template_file, header=1)
-        shipping = pd.read_excel(shipping_file, sheet_name=sheet_name_shipping, header=shipping_header) if shipping_file else pd.DataFrame()
-        
+    run_clicked = st.button("Run Harmonization")
+    if run_clicked and run_in_background:
+        inputs = {
+            "raw": (raw_file.getvalue(), sheet_name_raw, raw_header),
+            "template": (template_file.getvalue(), 0, 1),
+            "shipping": (shipping_file.getvalue(), sheet_name_shipping, shipping_header) if shipping_file else None,
+        }
+        settings = {
+            "column_mapping": column_mapping,
+            "fixed_values": fixed_values,
+            "biomarker_cols": [],
+            "calculation_functions": calculation_functions,
+            "extract_menopause_from_biomarker": extract_menopause_from_biomarker,
+            "height_truth": height_truth,
+            "weight_truth": weight_truth,
+            "raw_col_merge": raw_col_merge,
+            "ship_col_merge": ship_col_merge,
+            "dataset": dataset,
+            "review_comments": review_comments,
+            "stream_xlsx": stream_xlsx,
+            "fuzzy_threshold": fuzzy_threshold,
+            "save_to_database": save_to_database,
+            "mapping_profile": profile_name if profile is not None else None,
+            "mapping_versions": dict(mapping_store.versions),
+        }
+        mappings = {table_name: mapping_store.mapping(table_name) for table_name in MAPPING_TABLES}
+        job_id = get_job_runner().submit(dataset, inputs, settings, mappings)
+        st.session_state.setdefault("job_ids", []).append(job_id)
+        st.success(f"Queued job {job_id}.")
+
+    if run_clicked and not run_in_background:
+        profiler = StageProfiler(memory=profile_memory) if profile_run else None
+        with stage(profiler, "read_files"):
+            raw = read_uploaded(raw_file, sheet_name=sheet_name_raw, header=raw_header)
+            template = read_uploaded(template_file, header=1)
+            shipping = read_uploaded(shipping_file, sheet_name=sheet_name_shipping, header=shipping_header) if shipping_file else pd.DataFrame()
+        manifest_index = ManifestIndex(shipping, ship_col_merge) if shipping_file and raw_col_merge and ship_col_merge else None
+
+        # columns whose mapping did not change since the last run on this file are reused
+        column_cache = st.session_state.setdefault("column_cache", ColumnCache())
+        column_cache.reset((
+            upload_digest(raw_file), sheet_name_raw, raw_header,
+            upload_digest(shipping_file) if shipping_file else None, sheet_name_shipping, shipping_header,
+            raw_col_merge, ship_col_merge
+        ))
 
         final_df = process_raw_to_template(
             template=template,
@@ -282,47 +364,150 @@ with tab1:
             height_truth=height_truth,
             weight_truth=weight_truth,
             raw_col_merge=raw_col_merge,
-            ship_col_merge=ship_col_merge
+            ship_col_merge=ship_col_merge,
+            biomarker_extractor=mapping_store.biomarker_extractor(),
+            manifest_index=manifest_index,
+            column_cache=column_cache,
+            profiler=profiler
         )
-        
+
+        if manifest_index is not None:
+            join_report = manifest_index.report()
+            if not join_report.empty:
+                with st.expander(f"⚠️ Shipping manifest join: {len(join_report)} unmatched or duplicated keys"):
+                    st.dataframe(join_report, hide_index=True)
+
+        with stage(profiler, "validate", len(final_df)):
+            validator = Validator()
+            invalid_cells = validator.check(final_df)
+            validation_summary = validator.summary()
+        if not validation_summary.empty:
+            with st.expander(f"⚠️ {validator.total()} values outside the template's allowed values or formats, "
+                             f"in {len(validation_summary)} columns (highlighted in the Excel output)"):
+                st.dataframe(validation_summary, hide_index=True)
 
         st.success("✅ Harmonization Complete!")
+        if len(column_cache.recomputed) < len(column_cache.entries):
+            st.caption(f"Recomputed {len(column_cache.recomputed)} column groups; reused the rest from the previous run.")
         st.dataframe(final_df.head())
 
-        output = io.BytesIO()
-
-
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            final_df.to_excel(writer, index=False)
-
-            workbook  = writer.book
-            worksheet = writer.sheets['Sheet1']
-            highlight_format = workbook.add_format({'bg_color': '#FFF2CC'})
-
-            for col_idx, col_name in enumerate(final_df.columns):
-                if col_name in review_comments:
-                    worksheet.set_column(col_idx, col_idx, None, highlight_format)
-                    worksheet.write_comment(0, col_idx, review_comments[col_name])
-
-        output.seek(0)
-
-
+        with stage(profiler, "export_xlsx", len(final_df)):
+            harmonized_xlsx = xlsx_bytes(final_df, review_comments, stream_xlsx, invalid_cells, validation_summary)
+        with stage(profiler, "export_parquet", len(final_df)):
+            harmonized_parquet = parquet_bytes(final_df, review_comments, dataset)
         st.download_button(
             label="📥 Download Harmonized Excel",
-            data=output,
+            data=harmonized_xlsx,
             file_name=f"{dataset}_formatted_auto.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
+        st.download_button(
+            label="📥 Download Harmonized Parquet",
+            data=harmonized_parquet,
+            file_name=f"{dataset}_formatted_auto.parquet",
+            mime="application/vnd.apache.parquet"
+        )
+
+        if persist_arrow:
+            with stage(profiler, "persist_arrow", len(final_df)):
+                arrow_path = persist_dataset(final_df, dataset, review_comments)
+            st.info(f"Saved Arrow dataset to {arrow_path}")
+
+        if save_to_database:
+            with stage(profiler, "save_database", len(final_df)):
+                saved = save_harmonized(
+                    database, final_df, dataset,
+                    mapping_profile=profile_name if profile is not None else None,
+                    mapping_versions=dict(mapping_store.versions),
+                    timings=profiler.report() if profiler is not None else None
+                )
+            st.info(f"Saved {saved['saved']} samples to the database (run {saved['run_id']}).")
+            if saved["skipped"]:
+                st.warning(f"{saved['skipped']} rows have neither a tube barcode nor an external id and were not saved.")
+
+        if profiler is not None:
+            with st.expander(f"Run diagnostics ({profiler.total_seconds():.2f}s)"):
+                st.dataframe(profiler.report(), hide_index=True)
+                st.download_button(
+                    label="📥 Download diagnostics (JSON)",
+                    data=profiler.to_json(dataset=dataset, rows=len(final_df)),
+                    file_name=f"{dataset}_run_diagnostics.json",
+                    mime="application/json"
+                )
+
+        if fuzzy_matching:
+            st.session_state["fuzzy_suggestions"] = suggestion_report([raw, shipping], column_mapping, transformations)
+
+    # kept in session_state so the suggestions survive the rerun triggered by accepting them
+    suggestions = st.session_state.get("fuzzy_suggestions")
+    if fuzzy_matching and suggestions is not None and not suggestions.empty:
+        with st.expander(f"🔎 Suggested synonyms for {suggestions['raw_value'].nunique()} unmatched values"):
+            st.caption("Rows marked applied were mapped by fuzzy matching in this run. Tick the suggestions to keep; "
+                       "they are added to the synonym tables and match exactly from then on.")
+            edited = st.data_editor(
+                suggestions.assign(accept=suggestions["applied"]),
+                disabled=SUGGESTION_COLUMNS, hide_index=True, key="fuzzy_suggestions_editor"
+            )
+            if st.button("Add accepted suggestions as synonyms"):
+                accepted = edited[edited["accept"]].drop_duplicates(["table_name", "raw_value"])
+                # classified like a file import, so a synonym added meanwhile is reported instead of failing the batch
+                plans = [
+                    import_synonyms(database, table_name, pd.DataFrame({"standard": rows["standard_value"], "synonym": rows["raw_value"]}))
+                    .assign(table_name=table_name)
+                    for table_name, rows in accepted.groupby("table_name")
+                ]
+                del st.session_state["fuzzy_suggestions"]
+                applied = pd.concat(plans, ignore_index=True) if plans else pd.DataFrame(columns=["status"])
+                st.success(f"Added {int((applied['status'] == 'new').sum())} synonyms. Rerun the harmonization to apply them.")
+                not_added = applied[applied["status"] != "new"]
+                if not not_added.empty:
+                    st.info(f"{len(not_added)} accepted suggestions were not added:")
+                    st.dataframe(not_added, hide_index=True)
+
+    # job ids are kept in session_state; the jobs themselves live on disk and outlast the session
+    job_runner = get_job_runner()
+    show_all_jobs = st.checkbox("Show jobs from every session on this server", value=False)
+    job_ids = None if show_all_jobs else st.session_state.get("job_ids", [])
+    if show_all_jobs or job_ids:
+        st.subheader("Background Jobs")
+        st.button("Refresh job status")
+        job_table = job_runner.jobs(job_ids)
+        queued = job_table.loc[job_table["status"] == "queued", "job_id"].tolist()
+        if queued:
+            cancel_id = st.selectbox("Cancel a queued job", queued, key="cancel_job_id")
+            if st.button("Cancel job"):
+                if job_runner.cancel(cancel_id):
+                    st.success(f"Cancelled job {cancel_id}.")
+                    job_table = job_runner.jobs(job_ids)
+                else:
+                    st.warning(f"Job {cancel_id} has already started and can no longer be cancelled.")
+        st.dataframe(job_table, hide_index=True)
+        finished = job_table.loc[job_table["status"] == "done", "job_id"].tolist()
+        if finished:
+            job_id = st.selectbox("Download results of job", finished)
+            for kind, label, mime in [
+                ("xlsx", "📥 Download Harmonized Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+                ("parquet", "📥 Download Harmonized Parquet", "application/vnd.apache.parquet"),
+                ("join_report", "📥 Download manifest join report (CSV)", "text/csv"),
+                ("validation", "📥 Download validation report (CSV)", "text/csv"),
+                ("diagnostics", "📥 Download diagnostics (JSON)", "application/json"),
+            ]:
+                path = job_runner.output_path(job_id, kind)
+                if path is not None:
+                    with open(path, "rb") as f:
+                        st.download_button(label=label, data=f.read(), file_name=os.path.basename(path), mime=mime, key=f"job_{kind}")
+        failed = job_table[job_table["status"] == "failed"]
+        for _, job in failed.iterrows():
+            st.error(f"Job {job['job_id']} ({job['label']}) failed: {job['error']}")
 
 with tab2:
+    from db import check_table, get_database
+    from mapping_store import remove_synonym
+    from synonym_io import count_synonyms, export_synonyms, import_synonyms, plan_import, read_synonym_file, synonym_page
+
     st.header("Synonym Mapping Management")
 
-    conn = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="your_new_password",
-        database="mappings_db"
-    )
+    database = get_database()
 
     mapping_tables = {
     "Biomarkers": ("biomarker_mappings", "standard_name"),
@@ -343,16 +528,26 @@ with tab2:
 
     table_display_name = st.selectbox("Select mapping table to view/edit:", list(mapping_tables.keys()))
     table_name, standard_col = mapping_tables[table_display_name]
+    check_table(table_name, standard_col)
 
     st.subheader(f"Existing Mappings in {table_display_name}")
-    mapping_df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
-    mapping_df = mapping_df.drop(columns=["id"])
-    st.dataframe(mapping_df)
+    # only one page is read per rerun; large tables are browsed with the search and page controls
+    search = st.text_input("Search synonyms and standard values", key="synonym_search")
+    page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="synonym_page_size")
+    total_rows = count_synonyms(database, table_name, search)
+    page_count = max(1, -(-total_rows // page_size))
+    page = st.number_input(
+        f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1,
+        key=f"synonym_page_{table_name}_{page_size}_{search}"
+    ) - 1
+    mapping_df = synonym_page(database, table_name, page, page_size, search)
+    st.caption(f"Rows {min(total_rows, page * page_size + 1)}-{page * page_size + len(mapping_df)} of {total_rows}")
+    st.dataframe(mapping_df.drop(columns=["id"]), hide_index=True)
 
     st.markdown("### Add a new synonym")
     st.markdown("Don't refresh the the page after adding a synonym, it will reset the mapping progress (even if you don't see it in the UI after adding, it will be added to the database).")
 
-    existing_standards_df = pd.read_sql(f"SELECT DISTINCT {standard_col} FROM {table_name}", conn)
+    existing_standards_df = database.read_sql(f"SELECT DISTINCT {standard_col} FROM {table_name}")
     standard_options = sorted(existing_standards_df[standard_col].dropna().unique().tolist())
 
     standard_options.append("➕ Create new")
@@ -369,26 +564,68 @@ with tab2:
 
     if st.button("Add Synonym"):
         if new_standard and new_synonym:
-            cursor = conn.cursor()
-            cursor.execute(
-                f"INSERT INTO {table_name} ({standard_col}, synonym) VALUES (%s, %s)",
-                (new_standard.strip(), new_synonym.strip())
-        )
-            conn.commit()
-            st.success("Synonym added ✅")
+            added = import_synonyms(database, table_name, pd.DataFrame({"standard": [new_standard], "synonym": [new_synonym]})).iloc[0]
+            if added["status"] == "new":
+                st.success("Synonym added ✅")
+            elif added["status"] == "duplicate":
+                st.info("This synonym is already mapped to that standard value.")
+            elif added["status"] == "invalid":
+                st.warning("The standard value and the synonym can't be blank.")
+            else:
+                st.warning(f"'{new_synonym.strip()}' is already mapped to '{added['existing_standard']}'. Delete it first to remap it.")
         else:
             st.warning("Please fill out both fields to add a new synonym.")
     st.markdown("### Delete a synonym")
-    delete_synonym= st.selectbox("Enter the synonym to delete", options=[""]+mapping_df["synonym"].tolist(), key="delete_synonym")
+    delete_synonym= st.selectbox("Enter the synonym to delete (search above to find it)", options=[""]+mapping_df["synonym"].tolist(), key="delete_synonym")
 
     if st.button("Delete Synonym"):
         if delete_synonym:
-            cursor= conn.cursor()
-            cursor.execute(
-                f"DELETE FROM {table_name} WHERE synonym = %s",
-                (delete_synonym.strip(),)
-            )
-            conn.commit()
+            remove_synonym(database, table_name, delete_synonym.strip())
             st.success("Synonym deleted ✅")
         else:
-            st.warning("Please enter a synonym to delete.") 
\ No newline at end of file
+            st.warning("Please enter a synonym to delete.") 
+
+    st.markdown("### Import synonyms from a file")
+    st.caption(f"CSV or XLSX with a 'synonym' column and a '{standard_col}' (or 'standard') column. "
+               "Nothing is written until you confirm; duplicates and conflicting rows are listed first.")
+    synonym_file = st.file_uploader("Upload synonym file (.csv or .xlsx)", type=["csv", "xlsx"], key="synonym_file")
+    if synonym_file is not None:
+        try:
+            incoming = read_synonym_file(synonym_file.getvalue(), synonym_file.name)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            existing_pairs = database.read_sql(f"SELECT {standard_col}, synonym FROM {table_name} ORDER BY id")
+            plan = plan_import(existing_pairs.itertuples(index=False, name=None), incoming)
+            counts = plan["status"].value_counts()
+            st.write(", ".join(f"{counts.get(status, 0)} {status}" for status in ["new", "duplicate", "conflict", "ambiguous", "invalid"]))
+            problems = plan[plan["status"].isin(["conflict", "ambiguous", "invalid"])]
+            if not problems.empty:
+                st.dataframe(problems, hide_index=True)
+            replace_conflicts = counts.get("conflict", 0) > 0 and st.checkbox(
+                "Remap conflicting synonyms to the standard values in the file", value=False, key="replace_conflicts"
+            )
+            if st.button(f"Import synonyms into {table_display_name}"):
+                applied = import_synonyms(database, table_name, incoming, replace_conflicts)
+                applied_counts = applied["status"].value_counts()
+                st.success(f"Imported {applied_counts.get('new', 0)} synonyms"
+                           + (f" and remapped {applied_counts.get('replaced', 0)}" if replace_conflicts else "") + " ✅")
+                failed = applied[applied["status"] == "failed"]
+                if not failed.empty:
+                    st.warning(f"{len(failed)} synonyms could not be remapped; they already exist with the new standard value in another case.")
+                    st.dataframe(failed, hide_index=True)
+
+    st.markdown("### Export synonyms")
+    # the table is only read when a download is clicked
+    st.download_button(
+        label=f"📥 Download {table_display_name} synonyms (CSV)",
+        data=lambda: export_synonyms(database, table_name, "csv"),
+        file_name=f"{table_name}.csv",
+        mime="text/csv"
+    )
+    st.download_button(
+        label=f"📥 Download {table_display_name} synonyms (Excel)",
+        data=lambda: export_synonyms(database, table_name, "xlsx"),
+        file_name=f"{table_name}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
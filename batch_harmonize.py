@@ -0,0 +1,200 @@
+"""Headless batch harmonization of a directory of raw files.
+
+Every raw file in the input directory is harmonized with one saved mapping
+configuration (the JSON downloaded from the app's "Download mapping
+configuration" button). A raw file ``<name>.xlsx`` is paired with the shipping
+manifest ``<name>_manifest.xlsx`` when one exists. Files are processed in a
+process pool; mapping tables are loaded once here and handed to the workers.
+Outputs are validated against the template's allowed values; violations are
+highlighted in XLSX outputs and summarized in ``<output>.validation.csv``.
+
+    python batch_harmonize.py config.json raw_dir/ --template template.xlsx --output-dir out/
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from db import MAPPING_TABLES, get_database
+from harmonization import BiomarkerExtractor, build_transformations, make_cleaner
+from manifest_join import ManifestIndex
+from mapping_store import get_mapping_store
+from profiling import StageProfiler
+from streaming import DEFAULT_CHUNKSIZE, harmonize_chunks, iter_raw_chunks, write_chunks
+from validation import Validator
+
+RAW_EXTENSIONS = (".xlsx", ".csv")
+
+# settings the app collects; anything missing from a saved config falls back to these
+CONFIG_DEFAULTS = {
+    "column_mapping": {},
+    "fixed_values": {},
+    "calculation_functions": {},
+    "biomarker_cols": [],
+    "height_truth": "cm",
+    "weight_truth": "kg",
+    "extract_menopause_from_biomarker": True,
+    "raw_col_merge": None,
+    "ship_col_merge": None,
+    "sheet_name_raw": 0,
+    "raw_header": 0,
+    "sheet_name_shipping": 0,
+    "shipping_header": 0,
+    "review_comments": {},
+}
+
+
+def mapping_config(**settings):
+    """A JSON-serializable mapping configuration with every known key filled in."""
+    config = dict(CONFIG_DEFAULTS)
+    config.update({key: val for key, val in settings.items() if key in CONFIG_DEFAULTS})
+    return config
+
+
+def load_config(path):
+    with open(path) as f:
+        return mapping_config(**json.load(f))
+
+
+def find_jobs(input_dir, output_dir, manifest_suffix="_manifest", output_format="xlsx"):
+    jobs = []
+    for name in sorted(os.listdir(input_dir)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() not in RAW_EXTENSIONS or stem.endswith(manifest_suffix) or name.startswith("~$"):
+            continue
+        manifest = None
+        for manifest_ext in RAW_EXTENSIONS:
+            candidate = os.path.join(input_dir, f"{stem}{manifest_suffix}{manifest_ext}")
+            if os.path.exists(candidate):
+                manifest = candidate
+                break
+        output = os.path.join(output_dir, f"{stem}_formatted_auto.{output_format}")
+        jobs.append((os.path.join(input_dir, name), manifest, output))
+    return jobs
+
+
+def read_table(path, sheet_name, header):
+    if path.lower().endswith(".csv"):
+        return pd.read_csv(path, header=header)
+    return pd.read_excel(path, sheet_name=sheet_name, header=header)
+
+
+_worker = {}
+
+
+def init_worker(mappings, template, config, chunksize, profile=False):
+    """Build the cleaners and biomarker extractor once per worker process."""
+    _worker["config"] = config
+    _worker["profile"] = profile
+    _worker["template"] = template
+    _worker["chunksize"] = chunksize
+    _worker["mappings"] = mappings
+    _worker["transformations"] = build_transformations(None, cleaner_for=lambda table_name: make_cleaner(mappings[table_name]))
+    _worker["extractor"] = BiomarkerExtractor(
+        mappings["biomarker_mappings"], mappings["pos_neg_mappings"], mappings["her2_ihc_mappings"]
+    )
+
+
+def harmonize_file(raw_path, manifest_path, output_path):
+    config = _worker["config"]
+    mappings = _worker["mappings"]
+    start = time.perf_counter()
+    result = {"file": os.path.basename(raw_path), "manifest": manifest_path and os.path.basename(manifest_path),
+              "output": output_path, "rows": 0, "join_issues": 0, "invalid_values": 0, "seconds": 0.0, "error": ""}
+    profiler = StageProfiler() if _worker.get("profile") else None
+    try:
+        manifest_index = None
+        if manifest_path and config["raw_col_merge"] and config["ship_col_merge"]:
+            shipping = read_table(manifest_path, config["sheet_name_shipping"], config["shipping_header"])
+            manifest_index = ManifestIndex(shipping, config["ship_col_merge"])
+        chunks = iter_raw_chunks(raw_path, config["sheet_name_raw"], config["raw_header"], _worker["chunksize"])
+        harmonized = harmonize_chunks(
+            chunks,
+            _worker["template"],
+            raw_col_merge=config["raw_col_merge"],
+            manifest_index=manifest_index,
+            column_mapping=config["column_mapping"],
+            fixed_values=config["fixed_values"],
+            biomarker_cols=config["biomarker_cols"],
+            calculation_functions=config["calculation_functions"],
+            extract_menopause_from_biomarker=config["extract_menopause_from_biomarker"],
+            biomarker_mapping=mappings["biomarker_mappings"],
+            pos_neg_mapping=mappings["pos_neg_mappings"],
+            her2_ihc_mapping=mappings["her2_ihc_mappings"],
+            menopause_mapping=mappings["menopause_mappings"],
+            transformations=_worker["transformations"],
+            height_truth=config["height_truth"],
+            weight_truth=config["weight_truth"],
+            biomarker_extractor=_worker["extractor"],
+            profiler=profiler,
+        )
+        validator = Validator()
+        result["rows"] = write_chunks(harmonized, output_path, config["review_comments"], validator)
+        result["invalid_values"] = validator.total()
+        if result["invalid_values"]:
+            validator.summary().to_csv(f"{output_path}.validation.csv", index=False)
+        if profiler is not None:
+            with open(f"{output_path}.profile.json", "w") as f:
+                f.write(profiler.to_json(file=result["file"], rows=result["rows"]))
+        if manifest_index is not None:
+            result["join_issues"] = len(manifest_index.report())
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def run_batch(jobs, mappings, template, config, workers=None, chunksize=DEFAULT_CHUNKSIZE, out=sys.stderr, profile=False):
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(mappings, template, config, chunksize, profile)) as pool:
+        futures = {pool.submit(harmonize_file, *job): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            status = f"FAILED {result['error']}" if result["error"] else f"{result['rows']} rows"
+            print(f"[{done}/{len(jobs)}] {result['file']}: {status} ({result['seconds']}s)", file=out, flush=True)
+    return pd.DataFrame(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harmonize every raw file in a directory with a saved mapping configuration.")
+    parser.add_argument("config", help="mapping configuration JSON saved from the app")
+    parser.add_argument("input_dir", help="directory of raw files and their shipping manifests")
+    parser.add_argument("--template", required=True, help="template workbook (.xlsx)")
+    parser.add_argument("--template-header", type=int, default=1)
+    parser.add_argument("--output-dir", default="harmonized")
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet"], default="xlsx")
+    parser.add_argument("--manifest-suffix", default="_manifest")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--summary", help="also write the per-file summary to this CSV")
+    parser.add_argument("--profile", action="store_true", help="write per-stage timings to <output>.profile.json")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    template = pd.read_excel(args.template, header=args.template_header, nrows=0)
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = find_jobs(args.input_dir, args.output_dir, args.manifest_suffix, args.format)
+    if not jobs:
+        print(f"No raw files found in {args.input_dir}", file=sys.stderr)
+        return 1
+
+    store = get_mapping_store().refresh(get_database())
+    mappings = {table_name: store.mapping(table_name) for table_name in MAPPING_TABLES}
+
+    start = time.perf_counter()
+    summary = run_batch(jobs, mappings, template, config, args.workers, args.chunksize, profile=args.profile)
+    print(summary[["file", "rows", "join_issues", "invalid_values", "seconds", "error"]].to_string(index=False))
+    print(f"{len(summary)} files in {time.perf_counter() - start:.1f}s, {int((summary['error'] != '').sum())} failed")
+    if args.summary:
+        summary.to_csv(args.summary, index=False)
+    return int((summary["error"] != "").any())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
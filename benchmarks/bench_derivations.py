@@ -0,0 +1,90 @@
+"""Row-wise vs vectorized AgeAtCollection, unit conversion and BMI.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_derivations --rows 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from harmonization import (
+    calculate_bmi,
+    calculate_bmi_column,
+    convert_units_column,
+    height_weight_conversion,
+    height_weight_factors,
+    parse_age_column,
+    parse_age_smart,
+)
+
+
+def synthetic_rows(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    collection = pd.Series(pd.date_range("2015-01-01", periods=365 * 8, freq="D").strftime("%Y-%m-%d"))
+    collection = collection.sample(n_rows, replace=True, random_state=seed).reset_index(drop=True)
+    ages = rng.integers(18, 90, n_rows).astype(str)
+    birth_years = rng.integers(1930, 2005, n_rows).astype(str)
+    birth_dates = pd.Series(pd.to_datetime(birth_years, format="%Y")).dt.strftime("%m/%d/%Y")
+    age_kind = rng.integers(0, 3, n_rows)
+    age = np.where(age_kind == 0, ages, np.where(age_kind == 1, birth_years, birth_dates))
+    age = pd.Series(age, dtype=object)
+    age[rng.random(n_rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "Age": age,
+        "Collection Date": collection,
+        "Height": rng.normal(65, 4, n_rows).round(1),
+        "Weight": rng.normal(170, 30, n_rows).round(1),
+    })
+
+
+def rowwise(raw):
+    convert_weight, convert_height = height_weight_conversion("inches", "lbs")
+    height = raw["Height"].apply(convert_height)
+    weight = raw["Weight"].apply(convert_weight)
+    age = raw.apply(lambda row: parse_age_smart(row["Age"], row["Collection Date"]), axis=1)
+    frame = pd.DataFrame({"Weight": weight, "Height": height})
+    bmi = frame.apply(lambda row: calculate_bmi(row["Weight"], row["Height"]), axis=1)
+    return age, bmi
+
+
+def vectorized(raw):
+    weight_factor, height_factor = height_weight_factors("inches", "lbs")
+    height = convert_units_column(raw["Height"], height_factor)
+    weight = convert_units_column(raw["Weight"], weight_factor)
+    age = parse_age_column(raw["Age"], raw["Collection Date"])
+    bmi = calculate_bmi_column(weight, height)
+    return age, bmi
+
+
+def timed(func, raw):
+    start = time.perf_counter()
+    result = func(raw)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    raw = synthetic_rows(args.rows)
+    (old_age, old_bmi), old_secs = timed(rowwise, raw)
+    (new_age, new_bmi), new_secs = timed(vectorized, raw)
+
+    pd.testing.assert_series_equal(
+        pd.Series(old_age, dtype="Int64"), new_age, check_names=False
+    )
+    pd.testing.assert_series_equal(
+        pd.to_numeric(old_bmi, errors="coerce").astype("Float64"), new_bmi, check_names=False
+    )
+    print(f"rows:       {args.rows}")
+    print(f"row-wise:   {old_secs:.2f}s")
+    print(f"vectorized: {new_secs:.2f}s")
+    print(f"speedup:    {old_secs / new_secs:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Notebook-style cross-validation vs train_mapper's cached, parallel folds.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_model_selection --columns 3000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+from sklearn.pipeline import Pipeline
+
+from predictor import clean_text
+from train_mapper import FEATURES, VARIANTS, cross_validate, summarize
+
+FIELD_HEADERS = {
+    "gender": (["sex", "gender", "patient sex", "sex at birth"], ["M", "F", "Male", "Female", "U"]),
+    "ageatcollection": (["age", "age at draw", "patient age", "age years"], [str(a) for a in range(18, 90)]),
+    "stage": (["stage", "clinical stage", "ajcc stage", "path stage"], ["I", "IIA", "IIB", "III", "IV", "IVB"]),
+    "height": (["height", "ht", "height cm", "height in"], [str(h) for h in range(140, 200)]),
+    "weight": (["weight", "wt", "weight kg", "body weight"], [str(w) for w in range(45, 140)]),
+    "smokinghistory": (["smoking", "tobacco use", "cigarette", "smoker"], ["Never", "Former", "Current", "Previous smoker"]),
+    "race": (["race", "ethnicity", "race ethnicity"], ["White", "Asian", "Black or African American", "Other"]),
+    "tubebarcode": (["barcode", "tube id", "tube barcode", "sample barcode"], [f"PB{n:06d}" for n in range(500)]),
+}
+
+
+def synthetic_columns(n_columns, seed=0):
+    """Labelled ``header + sample_values`` texts resembling the training CSV."""
+    rng = np.random.default_rng(seed)
+    fields = list(FIELD_HEADERS)
+    texts, labels = [], []
+    for _ in range(n_columns):
+        field = fields[rng.integers(len(fields))]
+        headers, values = FIELD_HEADERS[field]
+        header = headers[rng.integers(len(headers))]
+        if rng.random() < 0.3:
+            header = f"{header} {rng.integers(1, 5)}"
+        sample = rng.choice(values, size=min(10, len(values)))
+        texts.append(clean_text(f"{header} [" + ",".join(f"'{v}'" for v in sample) + "]"))
+        labels.append(field)
+    return texts, labels
+
+
+def notebook_style(texts, labels, variants, folds, seed):
+    """One full pipeline refit per variant and fold, folds run serially, as in the notebook."""
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    scores = {}
+    for name in variants:
+        features, classifier = VARIANTS[name]
+        pipeline = Pipeline([("features", FEATURES[features]()), ("clf", classifier())])
+        scores[name] = cross_val_score(pipeline, texts, labels, cv=cv).mean()
+    return scores
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", type=int, default=3000)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    texts, labels = synthetic_columns(args.columns)
+    variants = list(VARIANTS)
+    old_scores, old_secs = timed(notebook_style, texts, labels, variants, args.folds, 0)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold, cold_secs = timed(cross_validate, texts, labels, variants, args.folds, 0, args.jobs, cache_dir)
+        _, warm_secs = timed(cross_validate, texts, labels, variants, args.folds, 0, args.jobs, cache_dir)
+
+    summary = summarize(cold)
+    for name in variants:
+        assert np.isclose(old_scores[name], summary.loc[name, "accuracy"]), name
+    print(summary.round(4).to_string())
+    print(f"columns:              {args.columns}, variants: {len(variants)}, folds: {args.folds}")
+    print(f"notebook style:       {old_secs:.2f}s")
+    print(f"harness (cold cache): {cold_secs:.2f}s")
+    print(f"harness (warm cache): {warm_secs:.2f}s")
+    print(f"speedup:              {old_secs / cold_secs:.1f}x cold, {old_secs / warm_secs:.1f}x warm")
+
+
+if __name__ == "__main__":
+    main()
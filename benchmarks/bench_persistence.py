@@ -0,0 +1,79 @@
+"""Load throughput of saving harmonized samples to the database.
+
+Harmonized output is synthetic (benchmarks.synthetic) and the database is
+the SQLite stand-in for the mappings database, in a fresh file per
+measurement. Compared at every size:
+
+- ``export_xlsx``: the XLSX export, the only output before samples were saved;
+- ``row_by_row``: one upsert statement per sample, in one transaction;
+- ``batched``: sample_store.save_harmonized (executemany batches);
+- ``batched_rerun``: the same save into a table that already holds every
+  sample, so every row is an update.
+
+    python -m benchmarks.bench_persistence --sizes 1000 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_pipeline import Workload
+from db import sqlite_database
+from export import xlsx_bytes
+from sample_store import SAMPLE_COLUMNS, SAMPLE_KEYS, sample_rows, save_harmonized
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def row_by_row(db, final_df, dataset):
+    rows, _ = sample_rows(final_df, dataset, 0)
+    with db.cursor() as cursor:
+        for row in rows:
+            db.upsert_many(cursor, "harmonized_samples", SAMPLE_COLUMNS, list(SAMPLE_KEYS), [row])
+
+
+def timed(method, final_df, directory, repeat):
+    """Best time of ``repeat`` runs of ``method``, each against a new database file."""
+    times = []
+    for attempt in range(repeat):
+        db = sqlite_database(os.path.join(directory, f"{method}-{len(final_df)}-{attempt}.db"))
+        if method == "batched_rerun":
+            save_harmonized(db, final_df, "bench")
+        start = time.perf_counter()
+        if method == "export_xlsx":
+            xlsx_bytes(final_df, constant_memory=True)
+        elif method == "row_by_row":
+            row_by_row(db, final_df, "bench")
+        else:
+            save_harmonized(db, final_df, "bench")
+        times.append(time.perf_counter() - start)
+        db.close()
+    return min(times)
+
+
+def run(sizes, repeat=3, seed=0, out=sys.stderr):
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in sizes:
+            final_df = Workload(n_rows, seed).pipeline()
+            for method in ["export_xlsx", "row_by_row", "batched", "batched_rerun"]:
+                seconds = timed(method, final_df, directory, repeat)
+                rows.append({"rows": n_rows, "method": method, "seconds": seconds, "rows_per_second": n_rows / seconds})
+                print(f"{n_rows:>8} {method:<14} {seconds:.3f}s", file=out, flush=True)
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(run(args.sizes, args.repeat).round(3).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Per-stage timings and peak memory of the harmonization pipeline on synthetic data.
+
+Each stage of process_raw_to_template (manifest merge, biomarker extraction,
+synonym/date transforms, age and BMI, "not received" fill), the validation
+against the template, the XLSX and Parquet exports and the whole pipeline are
+timed at every size (best of ``--repeat``), then run once more under
+tracemalloc for their peak memory.
+Save a run as a baseline and compare later runs against it to catch
+regressions:
+
+    python -m benchmarks.bench_pipeline --save baseline.json
+    python -m benchmarks.bench_pipeline --compare baseline.json
+
+The same stages run under pytest-benchmark in benchmarks/bench_stages.py.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import mapping_tables, raw_sheet, shipping_manifest, synthetic_config, template_frame
+from export import parquet_bytes, xlsx_bytes
+from harmonization import (
+    BiomarkerExtractor,
+    apply_transformation,
+    apply_unique,
+    build_transformations,
+    calculate_bmi_column,
+    convert_units_column,
+    fill_not_received,
+    height_weight_factors,
+    make_cleaner,
+    mapping_from_frame,
+    parse_age_column,
+    process_raw_to_template,
+)
+from manifest_join import ManifestIndex
+from validation import Validator, compile_rules
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+class Workload:
+    """Synthetic inputs for one size, plus what each stage needs from the stage before it."""
+
+    def __init__(self, n_rows, seed=0, units=("inches", "lbs")):
+        self.config = synthetic_config(units)
+        self.raw = raw_sheet(n_rows, seed, units)
+        self.manifest = shipping_manifest(self.raw, seed)
+        self.template = template_frame()
+        self.mappings = {table_name: mapping_from_frame(frame, std_col) for table_name, (frame, std_col) in mapping_tables(seed=seed).items()}
+        self.rules = compile_rules()
+        self.transformations = build_transformations(None, cleaner_for=lambda table_name: make_cleaner(self.mappings[table_name]))
+        self.extractor = BiomarkerExtractor(
+            self.mappings["biomarker_mappings"], self.mappings["pos_neg_mappings"], self.mappings["her2_ihc_mappings"]
+        )
+        self.merged = self.merge()
+        self.unfilled_final = self.unfilled()
+        self.final = fill_not_received(self.unfilled_final.copy())
+
+    def merge(self):
+        index = ManifestIndex(self.manifest, self.config["ship_col_merge"])
+        return index.join(self.raw, self.config["raw_col_merge"])
+
+    def biomarkers(self):
+        blob = self.raw[self.config["biomarker_cols"]].fillna("").astype(str).agg(" ".join, axis=1)
+        blob = blob.str.replace(r"\s+", " ", regex=True).str.strip()
+        results = apply_unique(blob, self.extractor)
+        return pd.DataFrame.from_records(results.tolist(), index=results.index)
+
+    def transforms(self):
+        mapping = self.config["column_mapping"]
+        return {
+            field: apply_transformation(transform, self.merged[mapping[field]])
+            for field, transform in self.transformations.items() if mapping.get(field) in self.merged.columns
+        }
+
+    def age_bmi(self):
+        mapping = self.config["column_mapping"]
+        weight_factor, height_factor = height_weight_factors(self.config["height_truth"], self.config["weight_truth"])
+        age = parse_age_column(self.raw[mapping["AgeAtCollection"]], self.raw[mapping["Date of Blood Draw/Cell Collection"]])
+        height = convert_units_column(self.raw[mapping["Height"]], height_factor)
+        weight = convert_units_column(self.raw[mapping["Weight"]], weight_factor)
+        return age, calculate_bmi_column(weight, height)
+
+    def unfilled(self):
+        """Template-shaped output of the earlier stages, before the fill."""
+        final = pd.DataFrame(index=self.raw.index, columns=self.template.columns)
+        for col, values in self.biomarkers().items():
+            final[col] = values
+        for field, values in self.transforms().items():
+            final[field] = values
+        final["AgeAtCollection"], final["BMI"] = self.age_bmi()
+        return final
+
+    def pipeline(self):
+        config = self.config
+        return process_raw_to_template(
+            template=self.template, raw=self.raw.copy(), shipping_manifest=self.manifest,
+            column_mapping=config["column_mapping"], fixed_values=config["fixed_values"],
+            biomarker_cols=config["biomarker_cols"], calculation_functions=config["calculation_functions"],
+            biomarker_mapping=self.mappings["biomarker_mappings"], pos_neg_mapping=self.mappings["pos_neg_mappings"],
+            her2_ihc_mapping=self.mappings["her2_ihc_mappings"], menopause_mapping=self.mappings["menopause_mappings"],
+            transformations=self.transformations, height_truth=config["height_truth"], weight_truth=config["weight_truth"],
+            raw_col_merge=config["raw_col_merge"], ship_col_merge=config["ship_col_merge"], biomarker_extractor=self.extractor,
+        )
+
+    def stages(self):
+        """Stage name -> zero-argument callable; every call starts from the same inputs."""
+        return {
+            "merge": self.merge,
+            "biomarkers": self.biomarkers,
+            "transforms": self.transforms,
+            "age_bmi": self.age_bmi,
+            # the fill works in place, so it gets a copy (the copy is part of the timing)
+            "fill": lambda: fill_not_received(self.unfilled_final.copy()),
+            "validate": lambda: Validator(self.rules).check(self.final),
+            "export_xlsx": lambda: xlsx_bytes(self.final, constant_memory=True),
+            "export_parquet": lambda: parquet_bytes(self.final),
+            "pipeline": self.pipeline,
+        }
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, repeat=3, memory=True, stages=None, seed=0, out=sys.stderr):
+    rows = []
+    for n_rows in sizes:
+        workload = Workload(n_rows, seed)
+        for stage, func in workload.stages().items():
+            if stages and stage not in stages:
+                continue
+            row = {"rows": n_rows, "stage": stage, "seconds": best_time(func, repeat)}
+            if memory:
+                row["peak_mb"] = peak_memory(func) / 2**20
+            rows.append(row)
+            print(f"{n_rows:>8} {stage:<15} {row['seconds']:.3f}s", file=out, flush=True)
+    return pd.DataFrame(rows)
+
+
+def compare(results, baseline, tolerance=1.25, min_delta=0.01):
+    """Results joined with the baseline; ``regression`` marks stages slower by more than ``tolerance``."""
+    merged = results.merge(baseline, on=["rows", "stage"], how="left", suffixes=("", "_baseline"))
+    merged["ratio"] = merged["seconds"] / merged["seconds_baseline"]
+    merged["regression"] = (merged["ratio"] > tolerance) & (merged["seconds"] - merged["seconds_baseline"] > min_delta)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", help="only these stages (default: all)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, not args.no_memory, args.stages)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+                "results": results.to_dict(orient="records"),
+            }, f, indent=2)
+
+    if not args.compare:
+        print(results.round(4).to_string(index=False))
+        return 0
+    with open(args.compare) as f:
+        baseline = pd.DataFrame(json.load(f)["results"])
+    report = compare(results, baseline[["rows", "stage", "seconds"]], args.tolerance)
+    print(report.round(4).to_string(index=False))
+    regressions = report[report["regression"]]
+    if not regressions.empty:
+        print(f"{len(regressions)} stage(s) slower than {args.tolerance}x the baseline", file=sys.stderr)
+    return int(not regressions.empty)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
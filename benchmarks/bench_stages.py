@@ -0,0 +1,32 @@
+"""pytest-benchmark suite over the stages of benchmarks.bench_pipeline.
+
+Every stage (manifest merge, biomarker extraction, transforms, age and BMI,
+fill, validation, XLSX and Parquet export, the whole pipeline) is benchmarked
+at each size in ``BENCH_SIZES`` (default 1000,10000,100000), with
+``BENCH_ROUNDS`` rounds (default 3). Unless ``BENCH_MEMORY=0``, the stage's
+tracemalloc peak is stored in the benchmark's extra_info. The file is not
+named test_*, so the regular test run leaves it out; run it explicitly:
+
+    python -m pytest benchmarks/bench_stages.py --benchmark-autosave
+    python -m pytest benchmarks/bench_stages.py --benchmark-compare --benchmark-compare-fail=min:25%
+"""
+import os
+
+import pytest
+
+from benchmarks.bench_pipeline import peak_memory
+
+pytest.importorskip("pytest_benchmark")
+
+STAGES = ["merge", "biomarkers", "transforms", "age_bmi", "fill", "validate", "export_xlsx", "export_parquet", "pipeline"]
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", "3"))
+MEMORY = os.environ.get("BENCH_MEMORY", "1") != "0"
+
+
+@pytest.mark.parametrize("stage", STAGES)
+def test_stage(benchmark, workload, stage):
+    func = workload.stages()[stage]
+    benchmark.group = stage
+    if MEMORY:
+        benchmark.extra_info["peak_mb"] = round(peak_memory(func) / 2**20, 2)
+    benchmark.pedantic(func, rounds=ROUNDS, iterations=1, warmup_rounds=0)
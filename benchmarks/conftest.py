@@ -0,0 +1,18 @@
+"""Fixtures for the pytest-benchmark suite in bench_stages.py."""
+import os
+import sys
+
+import pytest
+
+# the modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_pipeline import Workload  # noqa: E402
+
+SIZES = [int(size) for size in os.environ.get("BENCH_SIZES", "1000,10000,100000").split(",")]
+
+
+@pytest.fixture(scope="session", params=SIZES, ids=lambda size: f"{size}rows")
+def workload(request):
+    """Synthetic inputs for one size, built once per session."""
+    return Workload(request.param)
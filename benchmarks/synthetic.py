@@ -0,0 +1,276 @@
+"""Synthetic raw clinical sheets, shipping manifests and mapping tables.
+
+The data imitates what sites send us: biomarker results spread over free-text
+columns ("ER=Positive PR = 2+ HER2=2+ FISH=positive ..."), dates in several
+formats, ages given as ages, birth years or birth dates, height and weight in
+one of the supported units, synonyms in mixed case with typos, blanks, and manifest
+barcodes with zero padding, trailing ".0", duplicates and misses. Everything
+is drawn from a seeded generator, so a (rows, seed) pair always gives the same
+frames.
+
+    python -m benchmarks.synthetic --rows 10000 --output-dir synthetic/
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from batch_harmonize import mapping_config
+from harmonization import required_columns
+
+# (table, standard column) -> {standard: [synonyms]}, in the shape of database.sql
+MAPPING_TABLES = {
+    ("biomarker_mappings", "standard_name"): {
+        "HER2": ["her2"], "ER": ["er", "estrogen receptor"], "PR": ["pr", "progesterone receptor"],
+        "HER2 FISH": ["fish"], "PDL1": ["pdl1", "pd-l1"], "ALK": ["alk"], "ROS": ["ros"], "EGFR": ["egfr"],
+        "KRAS": ["kras"], "PIK3CA": ["pik3ca"], "ESR1": ["esr1"], "AR": ["ar"], "BRCA1": ["brca1"], "BRCA2": ["brca2"],
+    },
+    ("pos_neg_mappings", "standard_value"): {
+        "positive": ["positive", "strong positive", "weak positive", "moderately positive", "2+", "3+", "1", "5", "10"],
+        "negative": ["negative", "0", "none", "not detected", "1+"],
+        "mutated": ["mutated", "mutation detected", "mutation", "mut"],
+        "not mutated": ["not mutated", "no mutation detected", "wild type", "wt", "no mutation", "no mut"],
+    },
+    ("her2_ihc_mappings", "standard_value"): {
+        "3+": ["3+", "3+ (strong)"], "2+/ISH-": ["2+ (negative fish/cish)"], "2+/ISH+": ["2+ (positive fish/cish)"],
+        "1+": ["1+", "1+ (weak)"], "0": ["0", "no expression"],
+    },
+    ("menopause_mappings", "standard_term"): {
+        "premenopause": ["pre menopause"], "postmenopause": ["post menopause"],
+        "perimenopause": ["peri menopause"], "menopause": ["menopause"],
+    },
+    ("stabilizer_mappings", "standard_value"): {
+        "Streck": ["Streck Cell-Free DNA BCT", "streck"], "EDTA": ["K2 EDTA", "edta"],
+    },
+    ("gender_mappings", "standard_value"): {"Male": ["m", "male"], "Female": ["f", "female"]},
+    ("single_double_mappings", "standard_value"): {"Single": ["single", "1"], "Double": ["double", "2"]},
+    ("sample_timepoint_mappings", "standard_value"): {
+        "treatment-naïve": ["Initial-0", "baseline"], "progression": ["progression", "PD"],
+    },
+    ("stage_mappings", "standard_value"): {
+        stage: [stage] + [stage + sub for sub in "AB"] for stage in ["I", "II", "III", "IV"]
+    },
+    ("hemolysis_mappings", "standard_value"): {
+        "no hemolysis": ["No"], "light hemolysis": ["Light Hemolysis"], "strong hemolysis": ["Strong Hemolysis"],
+    },
+}
+
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%d-%b-%Y", "%B %d, %Y"]
+# unit -> (height, weight) mean and spread in that unit
+UNITS = {("cm", "kg"): ((168, 10), (75, 15)), ("inches", "lbs"): ((66, 4), (165, 33)), ("meters", "kg"): ((1.68, 0.1), (75, 15))}
+BIOMARKER_RESULTS = {
+    "er": "pos_neg", "pr": "pos_neg", "her2": "her2", "pdl1": "pos_neg",
+    "egfr": "mutation", "kras": "mutation", "pik3ca": "mutation", "brca1": "mutation", "esr1": "mutation",
+}
+MENOPAUSE_TEXT = ["pre menopause", "post menopause", "peri menopause", "menopause"]
+
+
+def mapping_tables(extra_synonyms=0, seed=0):
+    """The synonym tables as ``{table_name: (frame, std_col)}``.
+
+    ``extra_synonyms`` pads every table with that many made-up synonyms per
+    standard value, to benchmark lookups against large production tables.
+    """
+    rng = np.random.default_rng(seed)
+    tables = {}
+    for (table_name, std_col), mapping in MAPPING_TABLES.items():
+        rows = []
+        for standard, synonyms in mapping.items():
+            padding = [f"{standard.lower()} {rng.integers(1e9):09d}" for _ in range(extra_synonyms)]
+            rows.extend((standard, synonym) for synonym in synonyms + padding)
+        tables[table_name] = (pd.DataFrame(rows, columns=[std_col, "synonym"]), std_col)
+    return tables
+
+
+def mixed_case(rng, values):
+    values = pd.Series(values, dtype=object)
+    style = rng.integers(0, 4, len(values))
+    values[style == 1] = values[style == 1].str.upper()
+    values[style == 2] = values[style == 2].str.title()
+    values[style == 3] = values[style == 3] + " "
+    return values
+
+
+def with_blanks(rng, values, rate):
+    values = pd.Series(values, dtype=object)
+    values[rng.random(len(values)) < rate] = np.nan
+    return values
+
+
+def with_typos(rng, values, rate):
+    """Drop, double or swap one character in a ``rate`` share of the values, like hand-typed entries."""
+    values = pd.Series(values, dtype=object)
+    for idx in values.index[rng.random(len(values)) < rate]:
+        val = values[idx]
+        if not isinstance(val, str) or len(val) < 4:
+            continue
+        pos = int(rng.integers(1, len(val) - 1))
+        kind = rng.integers(0, 3)
+        if kind == 0:
+            val = val[:pos] + val[pos + 1:]
+        elif kind == 1:
+            val = val[:pos] + val[pos] + val[pos:]
+        else:
+            val = val[:pos - 1] + val[pos] + val[pos - 1] + val[pos + 1:]
+        values[idx] = val
+    return values
+
+
+def choose(rng, options, size):
+    return np.asarray(options, dtype=object)[rng.integers(0, len(options), size)]
+
+
+def messy_dates(rng, dates):
+    """Each date formatted with one of DATE_FORMATS; most sheets stick to one format, so the first dominates."""
+    formats = rng.choice(len(DATE_FORMATS), len(dates), p=[0.7, 0.1, 0.1, 0.1])
+    out = pd.Series(index=range(len(dates)), dtype=object)
+    for code, fmt in enumerate(DATE_FORMATS):
+        mask = formats == code
+        out[mask] = dates[mask].strftime(fmt)
+    return out
+
+
+def biomarker_value(rng, kind):
+    if kind == "her2":
+        return choose(rng, ["0", "1+", "2+", "3+", "3+ (strong)", "2+ (positive fish/cish)"], 1)[0]
+    if kind == "mutation":
+        return choose(rng, ["mutated", "wild type", "not mutated", "mutation detected", "wt", "G12C"], 1)[0]
+    return choose(rng, ["Positive", "negative", "weak positive", "2+", "not detected", "90%"], 1)[0]
+
+
+def biomarker_blobs(rng, n_rows, n_columns=3):
+    """Free-text biomarker columns; each row's results are spread over ``n_columns`` cells."""
+    # a few hundred distinct report texts, as in real loads where panels repeat
+    n_distinct = max(1, min(n_rows, 500))
+    markers = list(BIOMARKER_RESULTS)
+    reports = []
+    for _ in range(n_distinct):
+        chosen = rng.choice(markers, rng.integers(1, 5), replace=False)
+        parts = [f"{marker}{choose(rng, ['=', ' = ', ': =', '= '], 1)[0]}{biomarker_value(rng, BIOMARKER_RESULTS[marker])}" for marker in chosen]
+        if "her2" in chosen and rng.random() < 0.5:
+            parts.append(f"FISH={choose(rng, ['positive', 'negative'], 1)[0]}")
+        if rng.random() < 0.3:
+            parts.append(f"menopause status = {choose(rng, MENOPAUSE_TEXT, 1)[0]}")
+        reports.append(parts)
+    picked = rng.integers(0, n_distinct, n_rows)
+    columns = {f"Biomarker {i + 1}": [] for i in range(n_columns)}
+    for idx in picked:
+        parts = reports[idx]
+        for i, name in enumerate(columns):
+            cell = " ".join(parts[i::n_columns])
+            columns[name].append((cell.upper() if idx % 7 == 0 else cell) or np.nan)
+    return pd.DataFrame(columns)
+
+
+def raw_sheet(n_rows, seed=0, units=("inches", "lbs")):
+    """A raw site sheet with ``n_rows`` samples."""
+    rng = np.random.default_rng(seed)
+    (height_mean, height_sd), (weight_mean, weight_sd) = UNITS[tuple(units)]
+    collection = pd.to_datetime("2016-01-01") + pd.to_timedelta(rng.integers(0, 365 * 8, n_rows), unit="D")
+    diagnosis = collection - pd.to_timedelta(rng.integers(-30, 2000, n_rows), unit="D")
+    birth = collection - pd.to_timedelta(rng.integers(18 * 365, 90 * 365, n_rows), unit="D")
+
+    age_kind = rng.integers(0, 3, n_rows)
+    age = np.where(
+        age_kind == 0, ((collection - birth).days // 365).astype(str),
+        np.where(age_kind == 1, birth.year.astype(str), birth.strftime("%m/%d/%Y"))
+    )
+    times = pd.to_datetime("2000-01-01 07:00") + pd.to_timedelta(rng.integers(0, 11 * 60, n_rows), unit="min")
+
+    raw = pd.DataFrame({
+        "Patient ID": [f"PT-{i:06d}" for i in rng.integers(0, max(1, n_rows // 3), n_rows)],
+        "Tube Barcode": [f"{i:08d}" for i in rng.permutation(n_rows) + 10_000],
+        "Sex": with_blanks(rng, with_typos(rng, mixed_case(rng, choose(rng, ["m", "f", "male", "female", "unknown"], n_rows)), 0.03), 0.02),
+        "Age": with_blanks(rng, age, 0.05),
+        "Collection Date": with_blanks(rng, messy_dates(rng, collection), 0.01),
+        "Draw Time": with_blanks(rng, np.where(rng.random(n_rows) < 0.8, times.strftime("%H:%M"), times.strftime("%I:%M %p")), 0.05),
+        "Diagnosis Date": with_blanks(rng, messy_dates(rng, diagnosis), 0.1),
+        "Height": pd.Series(rng.normal(height_mean, height_sd, n_rows).round(2)).where(rng.random(n_rows) > 0.05),
+        "Weight": pd.Series(rng.normal(weight_mean, weight_sd, n_rows).round(1)).where(rng.random(n_rows) > 0.05),
+        "Stage": with_blanks(rng, choose(rng, ["I", "IA", "IIB", "III", "IIIA", "IV", "IVB", "Stage 4", "unknown"], n_rows), 0.1),
+        "Timepoint": with_blanks(rng, with_typos(rng, choose(rng, ["Initial-0", "baseline", "PD", "C2D1"], n_rows), 0.03), 0.1),
+        "Hemolysis": with_blanks(rng, with_typos(rng, choose(rng, ["No", "Light Hemolysis", "Strong Hemolysis", "moderate"], n_rows), 0.03), 0.2),
+        "Diagnosis": choose(rng, ["Breast Cancer", "NSCLC", "colorectal ca", "Ovarian"], n_rows),
+    })
+    return pd.concat([raw, biomarker_blobs(rng, n_rows)], axis=1)
+
+
+def shipping_manifest(raw, seed=0, missing_rate=0.02, duplicate_rate=0.01):
+    """A manifest for ``raw`` keyed on "Barcode", with the key formats and faults real manifests have."""
+    rng = np.random.default_rng(seed + 1)
+    keys = raw["Tube Barcode"]
+    keys = keys[rng.random(len(keys)) >= missing_rate].reset_index(drop=True)
+    style = rng.integers(0, 3, len(keys))
+    barcodes = np.where(style == 0, keys, np.where(style == 1, keys.str.lstrip("0"), keys.str.lstrip("0") + ".0"))
+    manifest = pd.DataFrame({
+        "Barcode": barcodes,
+        "Volume (uL)": rng.choice([500, 1000, 1500, 2000], len(keys)),
+        "Stabilizer": with_typos(rng, mixed_case(rng, choose(rng, ["Streck Cell-Free DNA BCT", "streck", "K2 EDTA", "edta"], len(keys))), 0.03),
+        "Spun": choose(rng, ["single", "Double", "1", "2"], len(keys)),
+        "Received": messy_dates(rng, pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, len(keys)), unit="D")),
+    })
+    duplicates = manifest.sample(frac=duplicate_rate, random_state=seed)
+    return pd.concat([manifest, duplicates], ignore_index=True)
+
+
+def template_frame():
+    """An empty frame with the template's columns, as the app reads it from the template workbook."""
+    columns = list(dict.fromkeys([
+        "ExternalId", "Received Date", "Volume_uL", "Stabilizer", "Date of Blood Draw/Cell Collection", "Time of Draw",
+        "Height", "Weight", "BMI", "AgeAtCollection", "Hemolysis", "Diagnostic Condition",
+        "Duration between Cancer Diagnosis and Blood Draw (days)", *required_columns,
+    ]))
+    return pd.DataFrame(columns=columns)
+
+
+def synthetic_config(units=("inches", "lbs")):
+    """The mapping configuration (as saved by the app) for sheets from ``raw_sheet``."""
+    return mapping_config(
+        column_mapping={
+            "ExternalId": "Patient ID", "Tube Barcode": "Tube Barcode", "Gender": "Sex", "AgeAtCollection": "Age",
+            "Date of Blood Draw/Cell Collection": "Collection Date", "Time of Draw": "Draw Time", "Height": "Height",
+            "Weight": "Weight", "Stage": "Stage", "Sample Timepoint": "Timepoint", "Hemolysis": "Hemolysis",
+            "Diagnostic Condition": "Diagnosis", "Volume_uL": "Volume (uL)", "Stabilizer": "Stabilizer",
+            "Single or Double Spun": "Spun", "Received Date": "Received",
+        },
+        fixed_values={"Project": "Synthetic", "Country": "USA"},
+        calculation_functions={"Duration between Cancer Diagnosis and Blood Draw (days)": ["Diagnosis Date", "Collection Date"]},
+        biomarker_cols=["Biomarker 1", "Biomarker 2", "Biomarker 3"],
+        height_truth=units[0],
+        weight_truth=units[1],
+        raw_col_merge="Tube Barcode",
+        ship_col_merge="Barcode",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic raw sheet, its shipping manifest, mapping tables and config.")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--units", choices=[f"{h}/{w}" for h, w in UNITS], default="inches/lbs")
+    parser.add_argument("--extra-synonyms", type=int, default=0)
+    parser.add_argument("--output-dir", default="synthetic")
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    args = parser.parse_args(argv)
+
+    units = tuple(args.units.split("/"))
+    os.makedirs(args.output_dir, exist_ok=True)
+    raw = raw_sheet(args.rows, args.seed, units)
+    manifest = shipping_manifest(raw, args.seed)
+    for name, frame in [("raw", raw), ("raw_manifest", manifest)]:
+        path = os.path.join(args.output_dir, f"{name}.{args.format}")
+        if args.format == "csv":
+            frame.to_csv(path, index=False)
+        else:
+            frame.to_excel(path, index=False)
+    for table_name, (frame, _) in mapping_tables(args.extra_synonyms, args.seed).items():
+        frame.to_csv(os.path.join(args.output_dir, f"{table_name}.csv"), index=False)
+    with open(os.path.join(args.output_dir, "config.json"), "w") as f:
+        json.dump(synthetic_config(units), f, indent=2)
+    print(f"{len(raw)} raw rows, {len(manifest)} manifest rows -> {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
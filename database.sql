@@ -1,58 +1,68 @@
 CREATE DATABASE IF NOT EXISTS mappings_db;
 USE mappings_db;
 
+-- every mapping table is unique on (synonym, standard); the index also serves lookups and deletes by synonym
 CREATE TABLE IF NOT EXISTS biomarker_mappings(
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_name VARCHAR(255) NOT NULL,
-    synonym VARCHAR(255) NOT NULL
+    synonym VARCHAR(255) NOT NULL,
+    UNIQUE (synonym, standard_name)
 );
 
 CREATE TABLE IF NOT EXISTS pos_neg_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS her2_ihc_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS menopause_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_term VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_term)
 );
 
 CREATE TABLE IF NOT EXISTS stabilizer_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS gender_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS single_double_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS sample_timepoint_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS stage_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 
@@ -60,27 +70,105 @@ CREATE TABLE IF NOT EXISTS stage_mappings (
 CREATE TABLE IF NOT EXISTS hemolysis_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS diagnostic_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS race_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
 CREATE TABLE IF NOT EXISTS smoking_history_mappings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     standard_value VARCHAR(255),
-    synonym VARCHAR(255)
+    synonym VARCHAR(255),
+    UNIQUE (synonym, standard_value)
 );
 
+/*
+Mapping tables created before the unique constraints keep working but are not
+indexed. To add the constraints, remove duplicate (synonym, standard) rows and run:
+
+ALTER TABLE biomarker_mappings ADD UNIQUE (synonym, standard_name);
+ALTER TABLE pos_neg_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE her2_ihc_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE menopause_mappings ADD UNIQUE (synonym, standard_term);
+ALTER TABLE stabilizer_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE gender_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE single_double_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE sample_timepoint_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE stage_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE hemolysis_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE diagnostic_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE race_mappings ADD UNIQUE (synonym, standard_value);
+ALTER TABLE smoking_history_mappings ADD UNIQUE (synonym, standard_value);
+*/
+
+-- bumped by the synonym editor on every insert/delete so cached mappings can be invalidated
+CREATE TABLE IF NOT EXISTS mapping_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO mapping_versions (table_name, version) VALUES
+('biomarker_mappings', 0),
+('pos_neg_mappings', 0),
+('her2_ihc_mappings', 0),
+('menopause_mappings', 0),
+('stabilizer_mappings', 0),
+('gender_mappings', 0),
+('single_double_mappings', 0),
+('sample_timepoint_mappings', 0),
+('stage_mappings', 0),
+('hemolysis_mappings', 0),
+('diagnostic_mappings', 0),
+('race_mappings', 0),
+('smoking_history_mappings', 0);
+
+-- saved column-mapping configurations, matched to new files by their header signature
+CREATE TABLE IF NOT EXISTS mapping_profiles (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    header_signature CHAR(64) NOT NULL,
+    headers TEXT NOT NULL,
+    config TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- one row per harmonized dataset written to the database, with what produced it
+CREATE TABLE IF NOT EXISTS harmonization_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    dataset VARCHAR(255) NOT NULL,
+    mapping_profile VARCHAR(255),
+    mapping_versions TEXT NOT NULL,
+    timings TEXT,
+    row_count INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- harmonized samples keyed by tube barcode and external id; writing a sample again updates it in place
+CREATE TABLE IF NOT EXISTS harmonized_samples (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    tube_barcode VARCHAR(255) NOT NULL,
+    external_id VARCHAR(255) NOT NULL,
+    dataset VARCHAR(255) NOT NULL,
+    run_id INT NOT NULL,
+    fields TEXT NOT NULL,
+    UNIQUE (tube_barcode, external_id)
+);
+
+-- seed synonyms; the unique keys compare case-insensitively (MySQL's default collation),
+-- as SynonymCleaner does, so each synonym is listed once
 /*
 INSERT INTO biomarker_mappings (standard_name, synonym) VALUES
 ('HER2', 'her2'),
@@ -102,7 +190,6 @@ INSERT INTO biomarker_mappings (standard_name, synonym) VALUES
 ('Menopausal Status', 'menopause status');
 
 INSERT INTO pos_neg_mappings (standard_value, synonym) VALUES
-('positive', 'Positive'),
 ('positive', 'positive'),
 ('positive', 'strong positive'),
 ('positive', 'weak positive'),
@@ -121,7 +208,6 @@ INSERT INTO pos_neg_mappings (standard_value, synonym) VALUES
 ('positive', '10'),
 ('positive', '11'),
 ('positive', '12'),
-('negative', 'Negative'),
 ('negative', 'negative'),
 ('negative', '0'),
 ('negative', 'none'),
@@ -171,19 +257,13 @@ INSERT INTO stabilizer_mappings (standard_value, synonym) VALUES
 INSERT INTO gender_mappings (standard_value, synonym) VALUES
 ('Male', 'm'),
 ('Male', 'male'),
-('Male', 'M'),
-('Male', 'Male'),
 ('Female', 'f'),
-('Female', 'female'),
-('Female', 'F'),
-('Female', 'Female');
+('Female', 'female');
 
 INSERT INTO single_double_mappings (standard_value, synonym) VALUES
 ('Single', 'single'),
-('Single', 'Single'),
 ('Single', '1'),
 ('Double', 'double'),
-('Double', 'Double'),
 ('Double', '2');
 
 INSERT INTO sample_timepoint_mappings (standard_value, synonym) VALUES
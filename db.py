@@ -0,0 +1,188 @@
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database.sql")
+
+MYSQL_CONFIG = {
+    "host": os.environ.get("MAPPINGS_DB_HOST", "localhost"),
+    "user": os.environ.get("MAPPINGS_DB_USER", "root"),
+    "password": os.environ.get("MAPPINGS_DB_PASSWORD", "your_new_password"),
+    "database": os.environ.get("MAPPINGS_DB_NAME", "mappings_db"),
+}
+POOL_SIZE = int(os.environ.get("MAPPINGS_DB_POOL_SIZE", "5"))
+
+# every synonym table in database.sql and the column holding its standard value
+MAPPING_TABLES = {
+    "biomarker_mappings": "standard_name",
+    "pos_neg_mappings": "standard_value",
+    "her2_ihc_mappings": "standard_value",
+    "menopause_mappings": "standard_term",
+    "stabilizer_mappings": "standard_value",
+    "gender_mappings": "standard_value",
+    "single_double_mappings": "standard_value",
+    "sample_timepoint_mappings": "standard_value",
+    "stage_mappings": "standard_value",
+    "hemolysis_mappings": "standard_value",
+    "diagnostic_mappings": "standard_value",
+    "race_mappings": "standard_value",
+    "smoking_history_mappings": "standard_value",
+}
+
+
+def check_table(table_name, std_col=None):
+    """Table and column names can't be query parameters, so only known ones are allowed."""
+    if table_name not in MAPPING_TABLES:
+        raise ValueError(f"Unknown mapping table: {table_name}")
+    if std_col is not None and std_col != MAPPING_TABLES[table_name]:
+        raise ValueError(f"Unknown standard column for {table_name}: {std_col}")
+    return MAPPING_TABLES[table_name]
+
+
+class Database:
+    """A bounded pool of connections with context-managed cursors.
+
+    Queries are written with ``%s`` placeholders (the MySQL style) and are
+    rewritten for SQLite, which lets the same code run against the local
+    stand-in returned by ``sqlite_database``. ``integrity_error`` is the
+    driver's exception for constraint violations, for callers that handle them.
+    """
+
+    def __init__(self, connect, dialect="mysql", pool_size=POOL_SIZE, integrity_error=()):
+        self.connect = connect
+        self.dialect = dialect
+        self.integrity_error = integrity_error
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(pool_size)
+
+    def sql(self, query):
+        if self.dialect == "sqlite":
+            return query.replace("%s", "?")
+        return query
+
+    def checkout(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            return self.connect()
+        if self.dialect == "mysql":
+            conn.ping(reconnect=True)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        # blocks once pool_size connections are in use instead of opening more
+        self.slots.acquire()
+        conn = None
+        try:
+            conn = self.checkout()
+            yield conn
+        finally:
+            if conn is not None:
+                self.checkin(conn)
+            self.slots.release()
+
+    def checkin(self, conn):
+        # ends whatever the last user left open, including the snapshot of a plain read
+        # (MySQL is REPEATABLE READ with autocommit off), so the next user sees current data
+        try:
+            conn.rollback()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        self.idle.put(conn)
+
+    @contextmanager
+    def cursor(self):
+        """A cursor inside a transaction that commits on success and rolls back on error."""
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+                conn.commit()
+            finally:
+                cur.close()
+
+    def execute(self, cursor, query, params=()):
+        cursor.execute(self.sql(query), params)
+        return cursor
+
+    def executemany(self, cursor, query, rows):
+        cursor.executemany(self.sql(query), rows)
+        return cursor
+
+    def upsert_many(self, cursor, table, columns, keys, rows):
+        """Insert ``rows``, updating the other columns of rows whose ``keys`` already exist.
+
+        ``table`` and ``columns`` go into the statement as they are; callers pass known names only.
+        """
+        updates = [col for col in columns if col not in keys]
+        if self.dialect == "sqlite":
+            conflict = f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET " + ", ".join(f"{col} = excluded.{col}" for col in updates)
+        else:
+            conflict = "ON DUPLICATE KEY UPDATE " + ", ".join(f"{col} = VALUES({col})" for col in updates)
+        placeholders = ", ".join(["%s"] * len(columns))
+        return self.executemany(cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) {conflict}", rows)
+
+    def read_sql(self, query, params=None):
+        with self.connection() as conn:
+            return pd.read_sql(self.sql(query), conn, params=params)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def mysql_database(config=None, pool_size=POOL_SIZE):
+    import mysql.connector
+
+    config = config or MYSQL_CONFIG
+    return Database(lambda: mysql.connector.connect(**config), dialect="mysql", pool_size=pool_size,
+                    integrity_error=mysql.connector.IntegrityError)
+
+
+def sqlite_schema(path=SCHEMA_PATH):
+    """database.sql rewritten into the SQLite dialect."""
+    with open(path) as f:
+        schema = f.read()
+    schema = re.sub(r"/\*.*?\*/", "", schema, flags=re.S)
+    schema = re.sub(r"^(CREATE DATABASE|USE) .*?;", "", schema, flags=re.M)
+    schema = schema.replace("INT AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT")
+    schema = schema.replace("INSERT IGNORE", "INSERT OR IGNORE")
+    return schema
+
+
+def sqlite_database(path=":memory:"):
+    """A stand-in for the MySQL mappings database, created from database.sql."""
+    if path == ":memory:":
+        # every connection to :memory: is a separate database, so share one
+        shared = sqlite3.connect(path, check_same_thread=False)
+        shared.executescript(sqlite_schema())
+        return Database(lambda: shared, dialect="sqlite", pool_size=1, integrity_error=sqlite3.IntegrityError)
+    with sqlite3.connect(path) as conn:
+        conn.executescript(sqlite_schema())
+    return Database(lambda: sqlite3.connect(path, check_same_thread=False), dialect="sqlite", integrity_error=sqlite3.IntegrityError)
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    """The process-wide MySQL database, created on first use."""
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = mysql_database()
+        return _database
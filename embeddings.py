@@ -0,0 +1,199 @@
+"""Embedding cache and nearest-neighbour index for column prediction.
+
+Sentence-transformer encoding runs on CPU and dominates the cost of the
+semantic column mapper. Embeddings are kept in a persistent store keyed by a
+hash of the (cleaned) text, one file per embedding model, so every text is
+encoded once: across notebook runs, cross-validation folds and app reruns.
+Labelled training columns are indexed once; new columns are matched to them
+with cosine kNN or centroid search.
+
+    python embeddings.py training_data_v2_noblanks.csv --output column_index.npz
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from training_data import load_training_texts
+
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "embedding_cache")
+
+
+def text_key(text):
+    return hashlib.sha256(str(text).encode()).hexdigest()
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingStore:
+    """Embeddings by text hash, persisted to an .npz file when ``path`` is set."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.vectors = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        if path and os.path.exists(path):
+            with np.load(path) as data:
+                self.vectors = dict(zip(data["keys"].tolist(), data["vectors"]))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def encode(self, texts, embedder, **kwargs):
+        """Embeddings for ``texts``; only texts not in the store are passed to ``embedder.encode``."""
+        keys = [text_key(text) for text in texts]
+        with self.lock:
+            missing = {key: text for key, text in zip(keys, texts) if key not in self.vectors}
+        if missing:
+            encoded = np.asarray(embedder.encode(list(missing.values()), **kwargs), dtype=np.float32)
+            with self.lock:
+                self.vectors.update(zip(missing, encoded))
+                self.dirty = True
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([self.vectors[key] for key in keys])
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        with self.lock:
+            keys = list(self.vectors)
+            vectors = np.vstack([self.vectors[key] for key in keys])
+            self.dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, keys=np.array(keys), vectors=vectors)
+        os.replace(tmp_path, self.path)
+
+
+@lru_cache(maxsize=None)
+def embedding_store(model_name=EMBEDDING_MODEL, cache_dir=EMBEDDING_CACHE_DIR):
+    """The process-wide store for one embedding model."""
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    return EmbeddingStore(os.path.join(cache_dir, f"{safe_name}.npz"))
+
+
+class CachedEmbedder:
+    """Drop-in for a SentenceTransformer whose ``encode`` only encodes unseen texts."""
+
+    def __init__(self, embedder, store, autosave=True):
+        self.embedder = embedder
+        self.store = store
+        self.autosave = autosave
+
+    def encode(self, texts, **kwargs):
+        vectors = self.store.encode(list(texts), self.embedder, **kwargs)
+        if self.autosave:
+            self.store.save()
+        return vectors
+
+
+@lru_cache(maxsize=None)
+def load_embedder(model_name=EMBEDDING_MODEL):
+    """The sentence-transformer for ``model_name`` behind the persistent embedding cache."""
+    from sentence_transformers import SentenceTransformer
+
+    return CachedEmbedder(SentenceTransformer(model_name), embedding_store(model_name))
+
+
+class NeighbourIndex:
+    """Cosine-similarity index over labelled column embeddings.
+
+    ``predict_proba`` follows the scikit-learn classifier interface, so the
+    index can stand in for the classifier in predictor.ColumnPredictor.
+    ``method="knn"`` votes with the similarities of the ``k`` nearest training
+    columns; ``method="centroid"`` compares against each field's mean embedding.
+    """
+
+    def __init__(self, vectors, labels, k=5, method="knn", model_name=EMBEDDING_MODEL, temperature=0.05):
+        if method not in ("knn", "centroid"):
+            raise ValueError(f"Unknown method: {method}")
+        self.vectors = normalize_rows(vectors)
+        self.labels = np.asarray(labels, dtype=object)
+        self.classes_, self.label_codes = np.unique(self.labels.astype(str), return_inverse=True)
+        self.k = k
+        self.method = method
+        self.model_name = model_name
+        self.temperature = temperature
+        sums = np.zeros((len(self.classes_), self.vectors.shape[1]), dtype=np.float32)
+        np.add.at(sums, self.label_codes, self.vectors)
+        self.centroids = normalize_rows(sums)
+
+    def kneighbors(self, queries, k=None):
+        """Similarities and training-row positions of the ``k`` nearest neighbours, best first."""
+        k = min(k or self.k, len(self.vectors))
+        sims = normalize_rows(queries) @ self.vectors.T
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        return np.take_along_axis(top_sims, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def predict_proba(self, queries):
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.method == "centroid":
+            sims = normalize_rows(queries) @ self.centroids.T
+            scores = np.exp((sims - sims.max(axis=1, keepdims=True)) / self.temperature)
+        else:
+            sims, positions = self.kneighbors(queries)
+            scores = np.zeros((len(queries), len(self.classes_)))
+            rows = np.repeat(np.arange(len(queries)), positions.shape[1])
+            np.add.at(scores, (rows, self.label_codes[positions].ravel()), np.clip(sims, 0, None).ravel())
+        totals = scores.sum(axis=1, keepdims=True)
+        return np.where(totals > 0, scores / np.where(totals == 0, 1, totals), 1 / len(self.classes_))
+
+    def predict(self, queries):
+        return self.classes_[self.predict_proba(queries).argmax(axis=1)]
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(
+                f, vectors=self.vectors, labels=self.labels.astype(str), k=self.k, method=self.method,
+                model_name=self.model_name, temperature=self.temperature
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data["vectors"], data["labels"], k=int(data["k"]), method=str(data["method"]),
+                model_name=str(data["model_name"]), temperature=float(data["temperature"])
+            )
+
+
+def build_index(texts, labels, embedder, **index_options):
+    return NeighbourIndex(embedder.encode(texts), labels, **index_options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the nearest-neighbour column index from labelled training columns.")
+    parser.add_argument("training_csv", help="CSV with raw_header, sample_values and target_template_field columns")
+    parser.add_argument("--output", default="column_index.npz")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="sentence-transformer model name")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--method", choices=["knn", "centroid"], default="knn")
+    args = parser.parse_args(argv)
+
+    texts, labels = load_training_texts(args.training_csv)
+    embedder = load_embedder(args.model)
+    cached_before = len(embedder.store)
+    index = build_index(texts, labels, embedder, k=args.k, method=args.method, model_name=args.model)
+    index.save(args.output)
+    print(f"Indexed {len(texts)} columns over {len(index.classes_)} fields "
+          f"({len(embedder.store) - cached_before} newly encoded) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Output formats for a harmonized frame.
+
+Besides the reviewed XLSX, the frame can be exported as Parquet or persisted as
+an Arrow IPC file under its dataset name. Columns flagged for review carry the
+flag and comment as Arrow field metadata, so the information survives outside
+Excel. Persisted datasets are written uncompressed so downstream jobs can
+memory-map them instead of re-parsing a workbook.
+"""
+import io
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+HARMONIZED_DIR = os.environ.get("HARMONIZED_DIR", "harmonized_datasets")
+HIGHLIGHT_COLOR = "#FFF2CC"
+INVALID_COLOR = "#F4CCCC"
+
+
+def arrow_array(series):
+    import pyarrow as pa
+
+    try:
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # mixed object columns (e.g. numbers and "not received") are stored as text
+        values = series.astype(object).where(series.notna(), None)
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def review_metadata(col, review_comments):
+    if col not in review_comments:
+        return None
+    return {b"review_flag": b"true", b"review_comment": str(review_comments[col]).encode()}
+
+
+def to_arrow_table(final_df, review_comments=None, dataset=None):
+    import pyarrow as pa
+
+    review_comments = review_comments or {}
+    fields, arrays = [], []
+    for col in final_df.columns:
+        array = arrow_array(final_df[col])
+        fields.append(pa.field(str(col), array.type, metadata=review_metadata(col, review_comments)))
+        arrays.append(array)
+    metadata = {b"created": datetime.now().isoformat(timespec="seconds").encode()}
+    if dataset:
+        metadata[b"dataset"] = str(dataset).encode()
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=metadata))
+
+
+def review_flags(table):
+    """The ``{column: comment}`` review flags stored in an Arrow table's field metadata."""
+    flags = {}
+    for field in table.schema:
+        if field.metadata and field.metadata.get(b"review_flag") == b"true":
+            flags[field.name] = field.metadata.get(b"review_comment", b"").decode()
+    return flags
+
+
+def parquet_bytes(final_df, review_comments=None, dataset=None):
+    import pyarrow.parquet as pq
+
+    output = io.BytesIO()
+    pq.write_table(to_arrow_table(final_df, review_comments, dataset), output)
+    return output.getvalue()
+
+
+def xlsx_bytes(final_df, review_comments=None, constant_memory=False, invalid=None, validation_summary=None):
+    """The harmonized workbook with review columns highlighted and commented.
+
+    ``constant_memory`` streams rows through xlsxwriter's constant-memory mode
+    instead of building the sheet in memory with ``DataFrame.to_excel``.
+    ``invalid`` and ``validation_summary`` come from validation.Validator: the
+    invalid cells are highlighted and the summary is added as a second sheet.
+    """
+    from streaming import XlsxChunkWriter
+
+    review_comments = review_comments or {}
+    output = io.BytesIO()
+    if constant_memory:
+        writer = XlsxChunkWriter(output, review_comments)
+        writer.write(final_df, invalid)
+        if validation_summary is not None:
+            writer.write_validation(validation_summary)
+        writer.close()
+        return output.getvalue()
+
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        final_df.to_excel(writer, index=False)
+
+        workbook  = writer.book
+        worksheet = writer.sheets['Sheet1']
+        highlight_format = workbook.add_format({'bg_color': HIGHLIGHT_COLOR})
+
+        for col_idx, col_name in enumerate(final_df.columns):
+            if col_name in review_comments:
+                worksheet.set_column(col_idx, col_idx, None, highlight_format)
+                worksheet.write_comment(0, col_idx, review_comments[col_name])
+
+        invalid_format = workbook.add_format({'bg_color': INVALID_COLOR})
+        for col_name, mask in (invalid or {}).items():
+            col_idx = final_df.columns.get_loc(col_name)
+            rows = np.flatnonzero(mask)
+            for row, val in zip(rows, final_df[col_name].iloc[rows].astype(object)):
+                worksheet.write(row + 1, col_idx, val, invalid_format)
+        if validation_summary is not None and not validation_summary.empty:
+            validation_summary.to_excel(writer, sheet_name='Validation', index=False)
+    return output.getvalue()
+
+
+def safe_name(dataset):
+    """The dataset name reduced to characters that are safe in a file name (no separators or leading dots)."""
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(dataset)).strip("._")
+    if not name:
+        raise ValueError(f"Invalid dataset name: {dataset!r}")
+    return name
+
+
+def dataset_path(dataset, store_dir=HARMONIZED_DIR):
+    return os.path.join(store_dir, f"{safe_name(dataset)}.arrow")
+
+
+def persist_dataset(final_df, dataset, review_comments=None, store_dir=HARMONIZED_DIR):
+    """Write the frame as an uncompressed Arrow IPC file named after the dataset; returns the path."""
+    import pyarrow as pa
+
+    path = dataset_path(dataset, store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    table = to_arrow_table(final_df, review_comments, dataset)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_dataset(dataset, store_dir=HARMONIZED_DIR):
+    """Memory-map a persisted dataset as an Arrow table without copying it."""
+    import pyarrow as pa
+
+    source = pa.memory_map(dataset_path(dataset, store_dir), "r")
+    return pa.ipc.open_file(source).read_all()
@@ -0,0 +1,169 @@
+"""Fuzzy resolution of raw values that are not exact synonyms.
+
+A raw value missing from a synonym table used to become pd.NA and then
+"not received". FuzzyCleaner looks such values up in a character n-gram index
+over the table's synonyms: only synonyms sharing an n-gram with the value are
+considered, so the cost of a lookup depends on how many synonyms look alike,
+not on the size of the table. The closest candidates are ranked by edit
+similarity (difflib). A match scoring at least ``threshold`` is applied;
+every candidate above ``min_score`` goes into the suggestions report so the
+analyst can add it as a synonym.
+
+Cleaners only see each distinct value once (SynonymCleaner.transform), and
+resolved values are memoized on the cleaner, least recently used first out once
+``MEMO_SIZE`` values are held. MappingStore keeps the cleaner until its table
+changes, so the memo carries over between runs.
+"""
+import difflib
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from harmonization import SynonymCleaner, cleaned_fields
+
+NGRAM = 3
+DEFAULT_THRESHOLD = 0.85
+MIN_SUGGESTION_SCORE = 0.6
+MAX_CANDIDATES = 20
+MEMO_SIZE = 65536
+SUGGESTION_COLUMNS = ["field", "table_name", "raw_value", "occurrences", "rank", "standard_value", "matched_synonym", "score", "applied"]
+
+
+def normalize(val):
+    return re.sub(r"\s+", " ", str(val).strip().lower())
+
+
+def ngrams(text, n=NGRAM):
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class NgramIndex:
+    """Inverted index from character n-grams to the synonyms containing them."""
+
+    def __init__(self, lookup, n=NGRAM):
+        self.n = n
+        self.synonyms = list(lookup)
+        self.standards = [lookup[synonym] for synonym in self.synonyms]
+        sizes = []
+        postings = defaultdict(list)
+        for pos, synonym in enumerate(self.synonyms):
+            grams = ngrams(normalize(synonym), n)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(pos)
+        self.sizes = np.array(sizes)
+        self.postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    def candidates(self, text, limit=MAX_CANDIDATES):
+        """Positions of the ``limit`` synonyms with the highest n-gram (Dice) overlap with ``text``."""
+        grams = ngrams(text, self.n)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return []
+        positions, shared = np.unique(np.concatenate(hits), return_counts=True)
+        dice = 2 * shared / (len(grams) + self.sizes[positions])
+        top = np.argsort(-dice, kind="stable")[:limit]
+        return positions[top].tolist()
+
+    def search(self, text, k=3, min_score=0.0):
+        """Up to ``k`` (synonym, standard, score) matches for ``text``, best first."""
+        text = normalize(text)
+        matches = []
+        for pos in self.candidates(text):
+            score = difflib.SequenceMatcher(None, text, normalize(self.synonyms[pos])).ratio()
+            if score >= min_score:
+                matches.append((self.synonyms[pos], self.standards[pos], round(score, 4)))
+        matches.sort(key=lambda match: match[2], reverse=True)
+        return matches[:k]
+
+
+class FuzzyCleaner(SynonymCleaner):
+    """SynonymCleaner that falls back to the closest synonym when there is no exact match."""
+
+    def __init__(self, mapping_dict, threshold=DEFAULT_THRESHOLD, min_score=MIN_SUGGESTION_SCORE, memo_size=MEMO_SIZE):
+        super().__init__(mapping_dict)
+        self.threshold = threshold
+        self.min_score = min_score
+        self.index = NgramIndex(self.lookup)
+        self.memo = OrderedDict()
+        self.memo_size = memo_size
+        self.lock = threading.Lock()
+        self.cache_key = (self.lookup, threshold)
+
+    def matches(self, val_str):
+        """Ranked fuzzy matches for a value that is not an exact synonym, memoized."""
+        with self.lock:
+            if val_str in self.memo:
+                self.memo.move_to_end(val_str)
+                return self.memo[val_str]
+        found = self.index.search(val_str, k=3, min_score=self.min_score)
+        with self.lock:
+            self.memo[val_str] = found
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        return found
+
+    def __call__(self, val):
+        if pd.isna(val):
+            return pd.NA
+        val_str = str(val).strip().lower()
+        if val_str in self.lookup:
+            return self.lookup[val_str]
+        found = self.matches(val_str)
+        if found and found[0][2] >= self.threshold:
+            return found[0][1]
+        return pd.NA
+
+    def suggestions(self, series):
+        """Ranked matches for every distinct value of ``series`` that is not an exact synonym."""
+        # counted the way __call__ normalizes, so "FEMALLE" and "femalle" are one suggestion
+        counts = series.dropna().map(lambda val: str(val).strip().lower()).value_counts()
+        rows = []
+        for val_str, occurrences in counts.items():
+            if not val_str or val_str in self.lookup:
+                continue
+            for rank, (synonym, standard, score) in enumerate(self.matches(val_str), start=1):
+                rows.append({
+                    "raw_value": val_str,
+                    "occurrences": int(occurrences),
+                    "rank": rank,
+                    "standard_value": standard,
+                    "matched_synonym": synonym,
+                    "score": score,
+                    "applied": rank == 1 and score >= self.threshold,
+                })
+        return pd.DataFrame(rows, columns=SUGGESTION_COLUMNS[2:])
+
+
+def make_fuzzy_cleaner(mapping_dict, threshold=DEFAULT_THRESHOLD):
+    return FuzzyCleaner(mapping_dict, threshold)
+
+
+def suggestion_report(frames, column_mapping, transformations):
+    """Suggested synonyms for the unmatched values of every fuzzily cleaned, mapped field.
+
+    ``frames`` are the raw sheet and shipping manifest; a mapped column is read
+    from the first frame that has it.
+    """
+    reports = []
+    for field, table_name in cleaned_fields.items():
+        cleaner = transformations.get(field)
+        raw_col = column_mapping.get(field)
+        source = next((frame for frame in frames if raw_col in frame.columns), None)
+        if not isinstance(cleaner, FuzzyCleaner) or source is None:
+            continue
+        report = cleaner.suggestions(source[raw_col])
+        report.insert(0, "table_name", table_name)
+        report.insert(0, "field", field)
+        reports.append(report)
+    if not reports:
+        return pd.DataFrame(columns=SUGGESTION_COLUMNS)
+    report = pd.concat(reports, ignore_index=True)
+    # most frequent unmatched values first, each with its candidates in rank order
+    return report.sort_values(["occurrences", "raw_value", "rank"], ascending=[False, True, True], ignore_index=True)
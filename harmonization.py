@@ -1,9 +1,16 @@
 from typing import final
 import streamlit as st
 import pandas as pd
+import numpy as np
 import re
+import bisect
+from functools import lru_cache
 from datetime import datetime
-import mysql.connector
+from pandas.tseries.api import guess_datetime_format
+from db import check_table, get_database
+from manifest_join import ManifestIndex
+from column_cache import ColumnCache, transform_key
+from profiling import stage
 
 required_columns = [
     "Tube Barcode", "Concentration Units", "Single or Double Spun", "Processing Method", "Freeze Thaw Status", "Project",
@@ -17,42 +24,203 @@ required_columns = [
     "Gender", "Race", "SmokingHistory"
 ]
 
-def load_mapping(conn, table_name, std_col="standard_value"):
-    query = f"SELECT {std_col}, synonym FROM {table_name}"
-    df = pd.read_sql(query, conn)
-    mapping = {}
-    for _, row in df.iterrows():
-        mapping.setdefault(row[std_col], []).append(str(row["synonym"]).lower())
-    return mapping
+def load_mapping(db, table_name, std_col="standard_value"):
+    check_table(table_name, std_col)
+    query = f"SELECT {std_col}, synonym FROM {table_name} ORDER BY id"
+    df = db.read_sql(query)
+    return mapping_from_frame(df, std_col)
+
+def mapping_from_frame(df, std_col):
+    return MappingTable.from_frame(df, std_col)
+
+class MappingTable(dict):
+    """A synonym table as ``{standard: [synonyms]}`` with prebuilt lookups.
+
+    ``standard_for`` maps a synonym back to the first standard value listing it,
+    which is what the ordered ``raw_val in values`` scans used to return, and
+    ``matcher`` is one compiled alternation over every synonym for substring
+    searches.
+    """
+
+    def __init__(self, mapping=()):
+        super().__init__(mapping)
+        self.standard_for = {}
+        for standard, synonyms in self.items():
+            for synonym in synonyms:
+                self.standard_for.setdefault(synonym, standard)
+        self.synonym_sets = {standard: set(synonyms) for standard, synonyms in self.items()}
+        patterns = sorted({re.escape(synonym) for synonym in self.standard_for}, key=len, reverse=True)
+        self.matcher = re.compile("|".join(patterns)) if patterns else None
+
+    @classmethod
+    def from_frame(cls, df, std_col):
+        synonyms = df["synonym"].map(str).str.lower()
+        grouped = synonyms.groupby(df[std_col], sort=False, dropna=False).agg(list)
+        return cls(grouped.to_dict())
+
+    def standard(self, synonym, default=None):
+        return self.standard_for.get(synonym, default)
+
+    def has_synonym(self, standard, synonym):
+        return synonym in self.synonym_sets.get(standard, ())
+
+    def find_standard(self, text):
+        # the compiled matcher rejects text containing no synonym in one scan;
+        # otherwise standard values are checked in table order, as before
+        if self.matcher is None or not self.matcher.search(text):
+            return pd.NA
+        for standard, synonyms in self.items():
+            for synonym in synonyms:
+                if synonym in text:
+                    return standard
+        return pd.NA
 
-def make_cleaner(mapping_dict):
-    lookup = {}
-    for standard_val, raw_options in mapping_dict.items():
-        for raw_val in raw_options:
-            lookup[str(raw_val).strip().lower()] = standard_val
+def as_mapping_table(mapping):
+    if isinstance(mapping, MappingTable):
+        return mapping
+    return MappingTable(mapping)
+
+class SynonymCleaner:
+    """Maps raw values to their standard value through a synonym table.
+
+    ``transform(series)`` normalizes each distinct raw value once and returns
+    a Categorical column whose categories are the standard values.
+    """
 
-    def cleaner(val):
+    def __init__(self, mapping_dict):
+        self.lookup = {}
+        for standard_val, raw_options in mapping_dict.items():
+            for raw_val in raw_options:
+                self.lookup[str(raw_val).strip().lower()] = standard_val
+        self.categories = pd.Index([v for v in mapping_dict if pd.notna(v)], dtype=object)
+        self.cache_key = self.lookup
+
+    def __call__(self, val):
         if pd.isna(val):
             return pd.NA
         val_str = str(val).strip().lower()
-        return lookup.get(val_str, pd.NA)
+        return self.lookup.get(val_str, pd.NA)
+
+    def transform(self, series):
+        keys = series
+        if series.dtype == object:
+            # factorize treats 1, 1.0 and True as one value; the lookup sees "1", "1.0" and "True"
+            keys = series.astype(str).where(series.notna())
+        codes, uniques = pd.factorize(keys)
+        cleaned = pd.Index([self(val) for val in uniques], dtype=object)
+        unique_codes = np.append(self.categories.get_indexer(cleaned), -1)
+        categorical = pd.Categorical.from_codes(unique_codes[codes], categories=self.categories)
+        return pd.Series(categorical, index=series.index, name=series.name)
 
-    return cleaner
+
+def make_cleaner(mapping_dict):
+    return SynonymCleaner(mapping_dict)
 
 def extract_menopause_status(val_str, menopause_mapping):
-    val_str = val_str.lower()
-    for clean_val, options in menopause_mapping.items():
-        for opt in options:
-            if opt in val_str:
-                return clean_val
-    return pd.NA
+    return as_mapping_table(menopause_mapping).find_standard(val_str.lower())
+
+PARSE_ERRORS = (ValueError, TypeError, OverflowError)
+
+
+class ColumnTransform:
+    """A per-cell transformation paired with an equivalent whole-column version.
+
+    Calling the object transforms one value; ``transform(series)`` transforms
+    a column at once and is what process_raw_to_template uses.
+    """
+
+    def __init__(self, cell_func, column_func):
+        self.cell_func = cell_func
+        self.column_func = column_func
+        self.cache_key = (cell_func, column_func)
+
+    def __call__(self, val):
+        return self.cell_func(val)
+
+    def transform(self, series):
+        return self.column_func(series)
+
+
+def apply_unique(series, func):
+    codes, uniques = pd.factorize(series)
+    results = pd.Series([func(val) for val in uniques] + [pd.NA], dtype=object)
+    return pd.Series(results.to_numpy()[codes], index=series.index, name=series.name)
+
+
+def apply_transformation(transform, series):
+    if hasattr(transform, "transform"):
+        return transform.transform(series)
+    return series.apply(transform)
+
+
+@lru_cache(maxsize=65536)
+def parse_date_string(val):
+    try:
+        return pd.to_datetime(val)
+    except PARSE_ERRORS:
+        return pd.NaT
+
+
+def to_datetime_or_nat(val):
+    if isinstance(val, str):
+        return parse_date_string(val)
+    try:
+        return pd.to_datetime(val)
+    except PARSE_ERRORS:
+        return pd.NaT
+
+
+def is_day_first(fmt):
+    return "%d" in fmt and "%m" in fmt and fmt.index("%d") < fmt.index("%m")
+
+
+def parse_unique_datetimes(uniques):
+    values = pd.Series(uniques, dtype=object)
+    parsed = [pd.NaT] * len(values)
+    is_str = values.map(lambda v: isinstance(v, str)).astype(bool)
+    strings = values[is_str].str.strip()
+    if len(strings):
+        # one vectorized parse when the first value's format reproduces every value; a day-first
+        # guess would also read 05/06 as 5 June where the per-value parse reads 6 May
+        fmt = guess_datetime_format(strings.iloc[0])
+        if fmt and not is_day_first(fmt):
+            fast = pd.to_datetime(strings, format=fmt, errors="coerce")
+            # compared as object arrays: strftime gives str dtype and Series.equals would fail on dtype alone
+            round_trip = fast.dt.strftime(fmt).str.lower().to_numpy(dtype=object) == strings.str.lower().to_numpy(dtype=object)
+            if fast.notna().all() and round_trip.all():
+                for pos, ts in zip(strings.index, fast):
+                    parsed[pos] = ts
+    for pos, val in enumerate(values):
+        if pd.isna(parsed[pos]):
+            parsed[pos] = to_datetime_or_nat(val)
+    # an offset-bearing value keeps its wall time, as clean_date does, so it can sit with naive ones
+    return pd.DatetimeIndex([
+        (ts.tz_localize(None) if ts.tzinfo is not None else ts) if isinstance(ts, pd.Timestamp) else pd.NaT
+        for ts in parsed
+    ])
+
+
+def parse_datetime_column(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        return pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+    parsed = parse_unique_datetimes(uniques).take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(parsed, index=series.index)
+
+
+def format_datetime_column(series, fmt):
+    parsed = parse_datetime_column(series)
+    return parsed.dt.strftime(fmt).astype(object).where(parsed.notna(), pd.NA)
+
 
 def clean_date(val):
     if pd.isna(val):
         return pd.NA
     try:
         return pd.to_datetime(val).strftime("%Y-%B-%d")
-    except:
+    except PARSE_ERRORS:
         return pd.NA
 
 def clean_time(val):
@@ -60,9 +228,15 @@ def clean_time(val):
         return pd.NA
     try:
         return pd.to_datetime(val).strftime("%I:%M:%S %p")
-    except:
+    except PARSE_ERRORS:
         return pd.NA
 
+def clean_date_column(series):
+    return format_datetime_column(series, "%Y-%B-%d")
+
+def clean_time_column(series):
+    return format_datetime_column(series, "%I:%M:%S %p")
+
 def calculate_age(birth_val, collection_date):
     if pd.isna(birth_val) or pd.isna(collection_date):
         return pd.NA
@@ -74,7 +248,7 @@ def calculate_age(birth_val, collection_date):
             birth_date = pd.to_datetime(birth_str, errors="coerce")
         collection_dt = pd.to_datetime(collection_date, errors="coerce")
         return (collection_dt - birth_date).days // 365
-    except:
+    except PARSE_ERRORS:
         return pd.NA
 
 def calculate_elapsed_days(row, start_col, end_col):
@@ -89,9 +263,17 @@ def calculate_elapsed_days(row, start_col, end_col):
             return pd.NA
         delta = (end_date - start_date).days
         return delta if delta >= 0 else pd.NA
-    except:
+    except PARSE_ERRORS:
         return pd.NA
 
+def calculate_elapsed_days_column(raw_df, start_col, end_col):
+    if start_col not in raw_df.columns or end_col not in raw_df.columns:
+        return pd.Series(pd.NA, index=raw_df.index, dtype="Int64")
+    start_dates = parse_datetime_column(raw_df[start_col])
+    end_dates = parse_datetime_column(raw_df[end_col])
+    delta = (end_dates - start_dates).dt.days.astype("Int64")
+    return delta.where(delta >= 0, pd.NA)
+
 def calculate_bmi(weight, height):
     weight = pd.to_numeric(weight, errors="coerce")
     height = pd.to_numeric(height, errors="coerce")
@@ -101,7 +283,7 @@ def calculate_bmi(weight, height):
         height_m = height / 100
         bmi = weight / (height_m ** 2)
         return round(bmi, 2)
-    except:
+    except PARSE_ERRORS:
         return pd.NA
     
 def parse_age_smart(val, collection_date):
@@ -126,77 +308,152 @@ def parse_age_smart(val, collection_date):
         if not pd.isna(birth_date) and not pd.isna(collection_dt):
             return int((collection_dt - birth_date).days // 365)
 
-    except:
+    except PARSE_ERRORS:
         pass
 
     return pd.NA
 
-
-
-def extract_biomarkers_from_blob(blob, biomarker_lookup, pos_neg_mapping, her2_ihc_mapping):
-    results = {}
-    blob = blob.replace("=", " = ")
-    blob = re.sub(r'\s+', ' ', blob).strip().lower()
-    biomarker_keys = sorted(
-        [re.escape(v.lower()) for variants in biomarker_lookup.values() for v in variants],
-        key=len, reverse=True
-    )
-    lookahead_pattern = r'(?=\s+\b(?:' + '|'.join(biomarker_keys) + r')\b\s*=|$)'
-    fish_match = re.search(r'\bfish\b\s*=\s*([^\s=]+)', blob)
-    fish_val = fish_match.group(1).strip() if fish_match else None
-    for template_col, variants in biomarker_lookup.items():
-        for variant in variants:
-            variant = variant.lower()
-            pattern = rf'\b{re.escape(variant)}\b\s*=\s*(.*?){lookahead_pattern}'
-            match = re.search(pattern, blob)
-            if match:
-                raw_val = match.group(1).strip()
+def calculate_bmi_column(weight_series, height_series):
+    weight = pd.to_numeric(weight_series, errors="coerce")
+    height = pd.to_numeric(height_series, errors="coerce")
+    height_m = height.where(height != 0) / 100
+    # nullable floats, so a missing or zero height gives pd.NA as calculate_bmi does, not NaN
+    return (weight / height_m ** 2).round(2).astype("Float64")
+
+def parse_age_column(age_series, collection_series):
+    age_str = age_series.astype(str).str.strip()
+    present = age_series.notna() & (age_str != "")
+    numeric = pd.to_numeric(age_str.where(present), errors="coerce")
+    collection_dates = parse_datetime_column(collection_series)
+
+    # the three branches of parse_age_smart, as masks over the whole column
+    is_birth_year = numeric.between(1000, 2100)
+    is_literal_age = numeric.between(0, 120)
+    is_birth_date = present & ~is_birth_year & ~is_literal_age
+
+    age = pd.Series(pd.NA, index=age_series.index, dtype="Int64")
+    birth_year_age = np.trunc(collection_dates.dt.year - numeric)
+    age[is_birth_year] = birth_year_age[is_birth_year]
+    age[is_literal_age] = np.trunc(numeric[is_literal_age])
+    birth_dates = parse_datetime_column(age_str.where(is_birth_date))
+    birth_date_age = (collection_dates - birth_dates).dt.days // 365
+    age[is_birth_date] = birth_date_age[is_birth_date]
+    return age
+
+def column_or_na(df, col):
+    if col in df.columns:
+        return df[col]
+    return pd.Series(pd.NA, index=df.index, dtype=object)
+
+
+
+HER2_SCORE_PATTERN = re.compile(r'(0|1\+|2\+|3\+)')
+FISH_PATTERN = re.compile(r'\bfish\b\s*=\s*([^\s=]+)')
+
+
+class BiomarkerExtractor:
+    """Single-pass biomarker extraction compiled once from the mapping tables.
+
+    All synonyms are folded into one alternation that is scanned over the blob
+    once to find every "<synonym> =" position. The value of a synonym runs up to
+    the next such position, which is what the per-variant lookahead regex in the
+    original implementation computed.
+    """
+
+    def __init__(self, biomarker_lookup, pos_neg_mapping, her2_ihc_mapping):
+        self.biomarker_lookup = [
+            (template_col, [v.lower() for v in variants])
+            for template_col, variants in biomarker_lookup.items()
+        ]
+        biomarker_keys = sorted(
+            {re.escape(v) for _, variants in self.biomarker_lookup for v in variants},
+            key=len, reverse=True
+        )
+        self.key_pattern = re.compile(r'(?=(\b(' + '|'.join(biomarker_keys) + r')\b\s*=\s*))')
+
+        self.pos_neg = as_mapping_table(pos_neg_mapping)
+        self.her2_ihc = as_mapping_table(her2_ihc_mapping)
+        self.cache_key = (biomarker_lookup, pos_neg_mapping, her2_ihc_mapping)
+
+    @staticmethod
+    def normalize(blob):
+        blob = blob.replace("=", " = ")
+        return re.sub(r'\s+', ' ', blob).strip().lower()
+
+    def map_her2(self, raw_val, fish_val, results):
+        her2_match = HER2_SCORE_PATTERN.search(raw_val)
+        if not her2_match:
+            return raw_val
+        her2_score = her2_match.group(1)
+        if her2_score in ["0", "1+"]:
+            mapped = "negative"
+        elif her2_score == "3+":
+            mapped = "positive"
+        elif self.pos_neg.has_synonym("positive", fish_val):
+            mapped = "positive"
+        elif self.pos_neg.has_synonym("negative", fish_val):
+            mapped = "negative"
+        else:
+            mapped = "HER2 2+ (FISH/ISH missing)"
+        results['HER2 IHC'] = self.her2_ihc.standard(raw_val, raw_val)
+        return mapped
+
+    def extract(self, blob):
+        results = {}
+        blob = self.normalize(blob)
+
+        first_value_start = {}
+        boundaries = []
+        for match in self.key_pattern.finditer(blob):
+            first_value_start.setdefault(match.group(2), match.end(1))
+            key_start = match.start(1)
+            if key_start > 0 and blob[key_start - 1].isspace():
+                boundaries.append(key_start)
+        if not first_value_start:
+            return results
+
+        fish_match = FISH_PATTERN.search(blob)
+        fish_val = fish_match.group(1).strip() if fish_match else None
+        for template_col, variants in self.biomarker_lookup:
+            for variant in variants:
+                value_start = first_value_start.get(variant)
+                if value_start is None:
+                    continue
+                # values end at the whitespace before the next "<synonym> =" key
+                next_key = bisect.bisect_right(boundaries, value_start)
+                value_end = boundaries[next_key] - 1 if next_key < len(boundaries) else len(blob)
+                raw_val = blob[value_start:value_end].strip()
                 if template_col == "HER2":
-                    her2_match = re.search(r'(0|1\+|2\+|3\+)', raw_val)
-                    if her2_match:
-                        her2_score = her2_match.group(1)
-                        if her2_score in ["0", "1+"]:
-                            mapped = "negative"
-                        elif her2_score == "3+":
-                            mapped = "positive"
-                        elif her2_score == "2+":
-                            if fish_val in pos_neg_mapping.get("positive", []):
-                                mapped = "positive"
-                            elif fish_val in pos_neg_mapping.get("negative", []):
-                                mapped = "negative"
-                            else:
-                                mapped = "HER2 2+ (FISH/ISH missing)"
-                        else:
-                            mapped = pd.NA
-                        for mapped_ihc, variants in her2_ihc_mapping.items():
-                            if raw_val in variants:
-                                results['HER2 IHC'] = mapped_ihc
-                                break
-                        else:
-                            results['HER2 IHC'] = raw_val
-                    else:
-                        mapped = raw_val
+                    mapped = self.map_her2(raw_val, fish_val, results)
                 else:
-                    mapped = None
-                    for label, values in pos_neg_mapping.items():
-                        if raw_val in values:
-                            mapped = label
-                            break
-                    if mapped is None:
-                        mapped = raw_val
+                    mapped = self.pos_neg.standard(raw_val, raw_val)
                 results[f"{template_col} Value"] = raw_val
                 results[template_col] = mapped
                 break
-    return results
+        return results
+
+    def __call__(self, blob):
+        return self.extract(blob)
+
+    def output_columns(self):
+        columns = []
+        for template_col, _ in self.biomarker_lookup:
+            if template_col == "HER2":
+                columns.append("HER2 IHC")
+            columns.extend([f"{template_col} Value", template_col])
+        return columns
+
+
+def extract_biomarkers_from_blob(blob, biomarker_lookup, pos_neg_mapping, her2_ihc_mapping):
+    extractor = BiomarkerExtractor(biomarker_lookup, pos_neg_mapping, her2_ihc_mapping)
+    return extractor.extract(blob)
 
 def call_calculation_functions(final_df, raw_df, mapping_dict):
     for new_col, (col1, col2) in mapping_dict.items():
-        final_df[new_col] = raw_df.apply(
-            lambda row: calculate_elapsed_days(row, col1, col2), axis=1
-        )
+        final_df[new_col] = calculate_elapsed_days_column(raw_df, col1, col2)
     return final_df
 
-def height_weight_conversion(height_truth, weight_truth):
+def height_weight_factors(height_truth, weight_truth):
     if height_truth== "cm":
         height_conversion = 1
     elif height_truth == "inches":
@@ -213,128 +470,187 @@ def height_weight_conversion(height_truth, weight_truth):
     else:
         weight_conversion = 1
 
+    return weight_conversion, height_conversion
+
+def height_weight_conversion(height_truth, weight_truth):
+    weight_conversion, height_conversion = height_weight_factors(height_truth, weight_truth)
+
     weight= lambda x: x * weight_conversion if pd.notna(x) else pd.NA
     height = lambda x: x * height_conversion if pd.notna(x) else pd.NA
 
     return weight, height
 
-def process_raw_to_template(template, raw, shipping_manifest, column_mapping, fixed_values, biomarker_cols, calculation_functions, biomarker_mapping, pos_neg_mapping, her2_ihc_mapping, menopause_mapping, extract_menopause_from_biomarker=True, transformations=None, height_truth="cm", weight_truth="kg", raw_col_merge=None, ship_col_merge=None):
+def convert_units_column(series, factor):
+    if pd.api.types.is_numeric_dtype(series):
+        return series * factor
+    return series.apply(lambda x: x * factor if pd.notna(x) else pd.NA)
+
+def process_raw_to_template(template, raw, shipping_manifest, column_mapping, fixed_values, biomarker_cols, calculation_functions, biomarker_mapping, pos_neg_mapping, her2_ihc_mapping, menopause_mapping, extract_menopause_from_biomarker=True, transformations=None, height_truth="cm", weight_truth="kg", raw_col_merge=None, ship_col_merge=None, biomarker_extractor=None, manifest_index=None, column_cache=None, profiler=None):
+    """Harmonize ``raw`` into the template's columns.
+
+    Pass a ColumnCache (reset for this raw file) as ``column_cache`` to reuse
+    every column whose inputs did not change since the previous run. Pass a
+    profiling.StageProfiler as ``profiler`` to record the time, rows, cache
+    hits and (optionally) peak memory of each stage.
+    """
+    transformations = transformations or {}
+    if column_cache is None:
+        column_cache = ColumnCache()
     final = pd.DataFrame(index=raw.index, columns=template.columns)
-    raw['biomarker_blob'] = raw[biomarker_cols].astype(str).replace('nan', '').agg(' '.join, axis=1).str.replace(r'\s+', ' ', regex=True).str.strip()
-
+    n_rows = len(raw)
+    blob_key = tuple(biomarker_cols)
+    with stage(profiler, "biomarker_blob", n_rows, column_cache):
+        raw['biomarker_blob'] = column_cache.compute(
+            "biomarker_blob", blob_key,
+            lambda: raw[biomarker_cols].fillna('').astype(str).replace('nan', '').agg(' '.join, axis=1).str.replace(r'\s+', ' ', regex=True).str.strip()
+        )
 
-    if shipping_manifest is not None and raw_col_merge and ship_col_merge:
-        raw= pd.merge(raw,shipping_manifest, left_on=raw_col_merge, right_on=ship_col_merge, how="left")
-    biomarker_data = raw['biomarker_blob'].apply(
-        lambda row: extract_biomarkers_from_blob(row, biomarker_mapping, pos_neg_mapping, her2_ihc_mapping)).to_dict()
-    for idx, result in biomarker_data.items():
-        for biomarker, val in result.items():
-            final.at[idx, biomarker] = val
+    with stage(profiler, "manifest_merge", n_rows):
+        if manifest_index is None and shipping_manifest is not None and raw_col_merge and ship_col_merge:
+            manifest_index = ManifestIndex(shipping_manifest, ship_col_merge)
+        if manifest_index is not None and raw_col_merge:
+            raw = manifest_index.join(raw, raw_col_merge)
+    extract_biomarkers = biomarker_extractor or BiomarkerExtractor(biomarker_mapping, pos_neg_mapping, her2_ihc_mapping)
+
+    def extract_biomarker_frame():
+        results = apply_unique(raw['biomarker_blob'], extract_biomarkers)
+        # columns appear in the order biomarkers are first found, rows without results stay NaN
+        return pd.DataFrame.from_records(results.tolist(), index=results.index)
+
+    with stage(profiler, "biomarkers", n_rows, column_cache):
+        biomarker_frame = column_cache.compute("biomarkers", (blob_key, transform_key(extract_biomarkers)), extract_biomarker_frame)
+        for biomarker in biomarker_frame.columns:
+            values = biomarker_frame[biomarker]
+            final[biomarker] = values.astype(object) if biomarker in final.columns else values
     if extract_menopause_from_biomarker:
-        final['Menopausal Status'] = raw['biomarker_blob'].apply(lambda val: extract_menopause_status(val, menopause_mapping))
-    call_calculation_functions(final, raw, calculation_functions)
+        with stage(profiler, "menopause", n_rows, column_cache):
+            menopause_mapping = as_mapping_table(menopause_mapping)
+            final['Menopausal Status'] = column_cache.compute(
+                "Menopausal Status", (blob_key, menopause_mapping),
+                lambda: apply_unique(raw['biomarker_blob'], lambda val: extract_menopause_status(val, menopause_mapping))
+            )
 
     age_col = column_mapping.get("AgeAtCollection")
     collection_col = column_mapping.get("Date of Blood Draw/Cell Collection")
-
-    final["AgeAtCollection"] = raw.apply(
-        lambda row: parse_age_smart(
-            row.get(age_col) if age_col else None,
-            row.get(collection_col) if collection_col else None
-        ),
-        axis=1
-    )
-
-    special_fields = {"AgeAtCollection"}
-    
     height_col = column_mapping.get("Height")
     weight_col = column_mapping.get("Weight")
+    weight_factor, height_factor = height_weight_factors(height_truth, weight_truth)
+    body_key = (height_col, weight_col, height_factor, weight_factor)
+
+    def source_key(*cols):
+        # raw columns rewritten in place below are keyed by how they were rewritten
+        return tuple(
+            (col, body_key if col in (height_col, weight_col) else blob_key if col == 'biomarker_blob' else None)
+            for col in cols
+        )
 
+    with stage(profiler, "calculations", n_rows, column_cache):
+        for new_col, (col1, col2) in calculation_functions.items():
+            final[new_col] = column_cache.compute(
+                ("calculation", new_col), source_key(col1, col2),
+                lambda: calculate_elapsed_days_column(raw, col1, col2)
+            )
+
+    with stage(profiler, "age", n_rows, column_cache):
+        final["AgeAtCollection"] = column_cache.compute(
+            "AgeAtCollection", source_key(age_col, collection_col),
+            lambda: parse_age_column(column_or_na(raw, age_col), column_or_na(raw, collection_col))
+        )
 
-    convert_weight, convert_height = height_weight_conversion(height_truth, weight_truth)
-
-    if height_col in raw.columns:
-        raw[height_col] = raw[height_col].apply(convert_height)
-
-    if weight_col in raw.columns:
-        raw[weight_col] = raw[weight_col].apply(convert_weight)
-
-    final["Height"] = raw[height_col] if height_col in raw.columns else pd.NA
-    final["Weight"] = raw[weight_col] if weight_col in raw.columns else pd.NA
-
+    special_fields = {"AgeAtCollection"}
 
-    if weight_col in raw.columns and height_col in raw.columns:
-        final["BMI"] = raw.apply(
-            lambda row: calculate_bmi(row.get(weight_col), row.get(height_col)), axis=1
-        )
-    else:
-        final["BMI"] = pd.NA
+    def convert_body_columns():
+        height = convert_units_column(raw[height_col], height_factor) if height_col in raw.columns else pd.NA
+        weight = convert_units_column(raw[weight_col], weight_factor) if weight_col in raw.columns else pd.NA
+        if weight_col in raw.columns and height_col in raw.columns:
+            bmi = calculate_bmi_column(weight, height)
+        else:
+            bmi = pd.NA
+        return height, weight, bmi
+
+    with stage(profiler, "height_weight_bmi", n_rows, column_cache):
+        height, weight, bmi = column_cache.compute("Height/Weight/BMI", body_key, convert_body_columns)
+
+        if height_col in raw.columns:
+            raw[height_col] = height
+
+        if weight_col in raw.columns:
+            raw[weight_col] = weight
+
+        final["Height"] = height
+        final["Weight"] = weight
+        final["BMI"] = bmi
+
+    with stage(profiler, "mapped_columns", n_rows, column_cache):
+        for col, val in fixed_values.items():
+            if col in final.columns:
+                final[col] = val
+        for template_col in column_mapping:
+            if template_col in special_fields:
+                continue
+            raw_col = column_mapping[template_col]
+            if raw_col in raw.columns:
+                if template_col in transformations:
+                    transform = transformations[template_col]
+                    final[template_col] = column_cache.compute(
+                        ("column", template_col), (source_key(raw_col), transform_key(transform)),
+                        lambda: apply_transformation(transform, raw[raw_col])
+                    )
+                else:
+                    final[template_col] = raw[raw_col]
 
-    
+        for col in template.columns:
+            if column_mapping.get(col) == "fixed" and col in fixed_values:
+                final[col] = fixed_values[col]
 
-    
-    for col, val in fixed_values.items():
-        if col in final.columns:
-            final[col] = val
-    for template_col in column_mapping:
-        if template_col in special_fields:
-            continue
-        raw_col = column_mapping[template_col]
-        if raw_col in raw.columns:
-            if template_col in transformations:
-                final[template_col] = raw[raw_col].apply(transformations[template_col])
-            else:
-                final[template_col] = raw[raw_col]
-    
-    for col in template.columns:
-        if column_mapping.get(col) == "fixed" and col in fixed_values:
-            final[col] = fixed_values[col]
+    with stage(profiler, "fill_not_received", n_rows):
+        return fill_not_received(final)
 
-    # Fill required columns with "not received" if missing
+def fill_not_received(final):
+    """Fill blanks in the required columns with "not received"."""
     for col in final.columns:
         if col in required_columns:
+            if isinstance(final[col].dtype, pd.CategoricalDtype) and "not received" not in final[col].cat.categories:
+                final[col] = final[col].cat.add_categories("not received")
             final[col] = final[col].fillna("not received")
     return final
 
-def build_transformations(conn):
-    clean_stabilizer = make_cleaner(load_mapping(conn, "stabilizer_mappings"))
-    clean_gender = make_cleaner(load_mapping(conn, "gender_mappings"))
-    clean_single_double = make_cleaner(load_mapping(conn, "single_double_mappings"))
-    clean_sample_timepoint = make_cleaner(load_mapping(conn, "sample_timepoint_mappings"))
-    clean_stage = make_cleaner(load_mapping(conn, "stage_mappings"))
-    clean_hemolysis = make_cleaner(load_mapping(conn, "hemolysis_mappings"))
-
-    return {
-        "Date of Blood Draw/Cell Collection": clean_date,
-        "Time of Draw": clean_time,
-        "Stabilizer": clean_stabilizer,
-        "Gender": clean_gender,
-        "Single or Double Spun": clean_single_double,
-        "Sample Timepoint": clean_sample_timepoint,
-        "Stage": clean_stage,
-        "Hemolysis": clean_hemolysis
+cleaned_fields = {
+    "Stabilizer": "stabilizer_mappings",
+    "Gender": "gender_mappings",
+    "Single or Double Spun": "single_double_mappings",
+    "Sample Timepoint": "sample_timepoint_mappings",
+    "Stage": "stage_mappings",
+    "Hemolysis": "hemolysis_mappings"
+}
+
+def build_transformations(db, cleaner_for=None):
+    if cleaner_for is None:
+        cleaner_for = lambda table_name: make_cleaner(load_mapping(db, table_name))
+
+    transformations = {
+        "Date of Blood Draw/Cell Collection": ColumnTransform(clean_date, clean_date_column),
+        "Time of Draw": ColumnTransform(clean_time, clean_time_column),
     }
+    for field, table_name in cleaned_fields.items():
+        transformations[field] = cleaner_for(table_name)
+    return transformations
 
 
 
 if __name__ == "__main__":
-    conn = mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='your_new_password',
-        database='mappings_db'
-    )
-
-    menopause_mapping = load_mapping(conn, "menopause_mappings", std_col="standard_term")
-    biomarker_mapping = load_mapping(conn, "biomarker_mappings", std_col="standard_name")
-    pos_neg_mapping = load_mapping(conn, "pos_neg_mappings")
-    her2_ihc_mapping = load_mapping(conn, "her2_ihc_mappings")
-    stabilizer_mapping = load_mapping(conn, "stabilizer_mappings")
-    gender_mapping = load_mapping(conn, "gender_mappings")
-    stage_mapping = load_mapping(conn, "stage_mappings")
-    single_double_mapping = load_mapping(conn, "single_double_mappings")
-    sample_timepoint_mapping = load_mapping(conn, "sample_timepoint_mappings")
-    hemolysis_mapping = load_mapping(conn, "hemolysis_mappings")
+    db = get_database()
+
+    menopause_mapping = load_mapping(db, "menopause_mappings", std_col="standard_term")
+    biomarker_mapping = load_mapping(db, "biomarker_mappings", std_col="standard_name")
+    pos_neg_mapping = load_mapping(db, "pos_neg_mappings")
+    her2_ihc_mapping = load_mapping(db, "her2_ihc_mappings")
+    stabilizer_mapping = load_mapping(db, "stabilizer_mappings")
+    gender_mapping = load_mapping(db, "gender_mappings")
+    stage_mapping = load_mapping(db, "stage_mappings")
+    single_double_mapping = load_mapping(db, "single_double_mappings")
+    sample_timepoint_mapping = load_mapping(db, "sample_timepoint_mappings")
+    hemolysis_mapping = load_mapping(db, "hemolysis_mappings")
     clean_biomarker = make_cleaner(biomarker_mapping)
     clean_gender = make_cleaner(gender_mapping)
     clean_stage = make_cleaner(stage_mapping)
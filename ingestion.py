@@ -0,0 +1,137 @@
+"""Parse-once ingestion of uploaded workbooks.
+
+Streamlit reruns the script on every widget change, and each rerun used to parse
+the raw file, the manifest and the template from scratch. Parsed frames are kept
+in a process-wide LRU keyed by the file's content hash plus sheet, header row and
+row limit, bounded by entry count and by the frames' approximate memory size
+(``INGEST_CACHE_MB``), and optionally pickled to ``INGEST_CACHE_DIR`` so they
+survive restarts. The calamine reader is used when python-calamine is installed.
+"""
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+PREVIEW_ROWS = 5
+CACHE_MAX_BYTES = int(float(os.environ.get("INGEST_CACHE_MB", "512")) * 2**20)
+
+
+def excel_engine():
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return None
+    return "calamine"
+
+
+class WorkbookCache:
+    def __init__(self, max_entries=16, cache_dir=None, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.frames = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.digests = {}
+        self.lock = threading.Lock()
+        self.engine = excel_engine()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, data, file_id=None):
+        if file_id is not None and file_id in self.digests:
+            return self.digests[file_id]
+        digest = hashlib.sha256(data).hexdigest()
+        if file_id is not None:
+            self.digests[file_id] = digest
+        return digest
+
+    def disk_path(self, key):
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.pkl")
+
+    def get(self, key):
+        with self.lock:
+            if key in self.frames:
+                self.frames.move_to_end(key)
+                return self.frames[key]
+        if self.cache_dir and os.path.exists(self.disk_path(key)):
+            with open(self.disk_path(key), "rb") as f:
+                frame = pickle.load(f)
+            self.put(key, frame, persist=False)
+            return frame
+        return None
+
+    def put(self, key, frame, persist=True):
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        with self.lock:
+            self.total_bytes += size - self.sizes.get(key, 0)
+            self.frames[key] = frame
+            self.sizes[key] = size
+            self.frames.move_to_end(key)
+            # the newest frame stays even when it alone is over the byte limit
+            while len(self.frames) > 1 and (len(self.frames) > self.max_entries or self.total_bytes > self.max_bytes):
+                old_key, _ = self.frames.popitem(last=False)
+                self.total_bytes -= self.sizes.pop(old_key)
+        if persist and self.cache_dir:
+            self.write_disk(key, frame)
+
+    def write_disk(self, key, frame):
+        # a crash mid-write leaves a stray temp file rather than a truncated pickle under the real name
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.disk_path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def read(self, data, sheet_name=0, header=0, nrows=None, file_id=None):
+        """Parsed sheet for workbook bytes ``data``; the returned frame is the caller's to modify."""
+        digest = self.digest(data, file_id)
+        full_key = (digest, sheet_name, int(header), None)
+        key = (digest, sheet_name, int(header), nrows)
+
+        cached = self.get(key)
+        if cached is None and nrows is not None:
+            full = self.get(full_key)
+            cached = full.head(nrows) if full is not None else None
+        if cached is not None:
+            self.hits += 1
+            return cached.copy()
+
+        self.misses += 1
+        frame = pd.read_excel(io.BytesIO(data), sheet_name=sheet_name, header=header, nrows=nrows, engine=self.engine)
+        self.put(key, frame)
+        return frame.copy()
+
+
+_cache = WorkbookCache(cache_dir=os.environ.get("INGEST_CACHE_DIR"))
+
+
+def get_workbook_cache():
+    return _cache
+
+
+def read_uploaded(uploaded_file, sheet_name=0, header=0, nrows=None):
+    """Read a Streamlit upload (or any object with getvalue()) through the process-wide cache."""
+    return _cache.read(
+        uploaded_file.getvalue(), sheet_name=sheet_name, header=header, nrows=nrows,
+        file_id=getattr(uploaded_file, "file_id", None)
+    )
+
+
+def upload_digest(uploaded_file):
+    """Content hash of an upload, memoized per Streamlit file id."""
+    return _cache.digest(uploaded_file.getvalue(), getattr(uploaded_file, "file_id", None))
+
+
+def preview_uploaded(uploaded_file, sheet_name=0, header=0, rows=PREVIEW_ROWS):
+    return read_uploaded(uploaded_file, sheet_name=sheet_name, header=header, nrows=rows)
@@ -0,0 +1,271 @@
+"""Background harmonization jobs shared by every session of the app.
+
+"Run Harmonization" used to read the workbooks, harmonize and build the XLSX
+inside the Streamlit script, so a long file blocked the session and any widget
+change restarted it. JobRunner runs jobs in a bounded process pool instead:
+jobs beyond ``max_workers`` wait in FIFO order rather than competing for the
+CPU, and the Streamlit thread only polls. Each job gets a directory under
+JOBS_DIR holding its progress (the stage it is in, written by the worker),
+its outputs and its run diagnostics, so results can be downloaded after any
+number of reruns.
+"""
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from profiling import StageProfiler
+
+JOBS_DIR = os.environ.get("HARMONIZE_JOBS_DIR", "harmonization_jobs")
+JOB_WORKERS = int(os.environ.get("HARMONIZE_JOB_WORKERS", "2"))
+JOB_COLUMNS = ["job_id", "label", "status", "stage", "submitted", "seconds", "rows", "invalid_values", "error"]
+
+
+def write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class ProgressProfiler(StageProfiler):
+    """StageProfiler that also records the running stage in a file the app polls."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    @contextmanager
+    def stage(self, name, rows=None, cache=None):
+        write_json(self.path, {"stage": name, "done": list(self.stages), "updated": datetime.now()})
+        with super().stage(name, rows, cache):
+            yield
+
+
+def read_input(source):
+    """DataFrame from an uploaded workbook passed as (bytes, sheet_name, header)."""
+    from ingestion import excel_engine
+
+    data, sheet_name, header = source
+    return pd.read_excel(io.BytesIO(data), sheet_name=sheet_name, header=header, engine=excel_engine())
+
+
+def run_job(job_dir, inputs, settings, mappings):
+    """Harmonize one job in a worker process and write its outputs to ``job_dir``.
+
+    ``inputs`` maps "raw", "template" and optionally "shipping" to
+    (bytes, sheet_name, header). ``settings`` holds the process_raw_to_template
+    arguments that are plain data, plus "dataset", "review_comments",
+    "stream_xlsx", "fuzzy_threshold" and, for saving the samples to the
+    database, "save_to_database", "mapping_profile" and "mapping_versions".
+    Cleaners and the biomarker extractor are built here from ``mappings``.
+    """
+    from export import parquet_bytes, safe_name, xlsx_bytes
+    from fuzzy import make_fuzzy_cleaner
+    from harmonization import BiomarkerExtractor, build_transformations, make_cleaner, process_raw_to_template
+    from manifest_join import ManifestIndex
+    from validation import Validator
+
+    settings = dict(settings)
+    dataset = settings.pop("dataset")
+    # the dataset name is user input; only its sanitized form goes into file names
+    file_stem = safe_name(dataset)
+    review_comments = settings.pop("review_comments", {})
+    stream_xlsx = settings.pop("stream_xlsx", False)
+    fuzzy_threshold = settings.pop("fuzzy_threshold", None)
+    save_to_database = settings.pop("save_to_database", False)
+    mapping_profile = settings.pop("mapping_profile", None)
+    mapping_versions = settings.pop("mapping_versions", None)
+    profiler = ProgressProfiler(os.path.join(job_dir, "progress.json"))
+    start = time.perf_counter()
+    with profiler.stage("read_files"):
+        raw = read_input(inputs["raw"])
+        template = read_input(inputs["template"])
+        shipping = read_input(inputs["shipping"]) if inputs.get("shipping") else pd.DataFrame()
+
+    if fuzzy_threshold is None:
+        cleaner_for = lambda table_name: make_cleaner(mappings[table_name])
+    else:
+        cleaner_for = lambda table_name: make_fuzzy_cleaner(mappings[table_name], fuzzy_threshold)
+    raw_col_merge, ship_col_merge = settings.get("raw_col_merge"), settings.get("ship_col_merge")
+    manifest_index = ManifestIndex(shipping, ship_col_merge) if inputs.get("shipping") and raw_col_merge and ship_col_merge else None
+    final = process_raw_to_template(
+        template=template,
+        raw=raw,
+        shipping_manifest=shipping,
+        biomarker_mapping=mappings["biomarker_mappings"],
+        pos_neg_mapping=mappings["pos_neg_mappings"],
+        her2_ihc_mapping=mappings["her2_ihc_mappings"],
+        menopause_mapping=mappings["menopause_mappings"],
+        transformations=build_transformations(None, cleaner_for=cleaner_for),
+        biomarker_extractor=BiomarkerExtractor(
+            mappings["biomarker_mappings"], mappings["pos_neg_mappings"], mappings["her2_ihc_mappings"]
+        ),
+        manifest_index=manifest_index,
+        profiler=profiler,
+        **settings,
+    )
+
+    with profiler.stage("validate", len(final)):
+        validator = Validator()
+        invalid = validator.check(final)
+        validation_summary = validator.summary()
+
+    outputs = {
+        "xlsx": f"{file_stem}_formatted_auto.xlsx",
+        "parquet": f"{file_stem}_formatted_auto.parquet",
+        "diagnostics": f"{file_stem}_run_diagnostics.json",
+    }
+    with profiler.stage("export_xlsx", len(final)):
+        with open(os.path.join(job_dir, outputs["xlsx"]), "wb") as f:
+            f.write(xlsx_bytes(final, review_comments, stream_xlsx, invalid, validation_summary))
+    with profiler.stage("export_parquet", len(final)):
+        with open(os.path.join(job_dir, outputs["parquet"]), "wb") as f:
+            f.write(parquet_bytes(final, review_comments, dataset))
+    if manifest_index is not None and not manifest_index.report().empty:
+        outputs["join_report"] = "join_report.csv"
+        manifest_index.report().to_csv(os.path.join(job_dir, outputs["join_report"]), index=False)
+    if not validation_summary.empty:
+        outputs["validation"] = "validation.csv"
+        validation_summary.to_csv(os.path.join(job_dir, outputs["validation"]), index=False)
+    saved = None
+    if save_to_database:
+        from db import get_database
+        from sample_store import save_harmonized
+
+        with profiler.stage("save_database", len(final)):
+            saved = save_harmonized(get_database(), final, dataset, mapping_profile, mapping_versions, profiler.report())
+    with open(os.path.join(job_dir, outputs["diagnostics"]), "w") as f:
+        f.write(profiler.to_json(dataset=dataset, rows=len(final)))
+    return {
+        "rows": len(final), "invalid_values": validator.total(), "saved": saved,
+        "seconds": round(time.perf_counter() - start, 2), "outputs": outputs
+    }
+
+
+def run_job_safely(job_dir, inputs, settings, mappings):
+    """run_job, with the outcome (or the failure) written to result.json."""
+    try:
+        result = run_job(job_dir, inputs, settings, mappings)
+        result["error"] = ""
+    except Exception as e:
+        result = {"rows": 0, "invalid_values": 0, "outputs": {}, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+    write_json(os.path.join(job_dir, "result.json"), result)
+    return result
+
+
+class JobRunner:
+    """Bounded process pool plus the table of submitted jobs.
+
+    Job state lives in the job directories, so ``status`` works for any job
+    submitted in this process or listed on disk by an earlier one.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, jobs_dir=JOBS_DIR):
+        self.max_workers = max_workers
+        self.jobs_dir = jobs_dir
+        self.lock = threading.Lock()
+        self.pool = None
+        self.futures = {}
+
+    def executor(self):
+        if self.pool is None:
+            # spawned workers don't inherit the Streamlit server's threads and locks
+            self.pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.pool
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, label, inputs, settings, mappings):
+        """Queue a job and return its id; see run_job for the arguments."""
+        job_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        job_dir = self.job_dir(job_id)
+        os.makedirs(job_dir)
+        write_json(os.path.join(job_dir, "job.json"), {"job_id": job_id, "label": label, "submitted": datetime.now()})
+        with self.lock:
+            try:
+                future = self.executor().submit(run_job_safely, job_dir, inputs, settings, mappings)
+            except BrokenProcessPool:
+                # a worker died (e.g. out of memory); start a fresh pool for new jobs
+                self.pool = None
+                future = self.executor().submit(run_job_safely, job_dir, inputs, settings, mappings)
+            self.futures[job_id] = future
+        return job_id
+
+    def status(self, job_id):
+        job_dir = self.job_dir(job_id)
+        job = read_json(os.path.join(job_dir, "job.json")) or {"job_id": job_id, "label": "", "submitted": None}
+        result = read_json(os.path.join(job_dir, "result.json"))
+        progress = read_json(os.path.join(job_dir, "progress.json"))
+        future = self.futures.get(job_id)
+        status = {**job, "stage": "", "seconds": None, "rows": None, "invalid_values": None, "error": "", "outputs": {}, "done_stages": []}
+        if result is not None:
+            status.update(
+                status="cancelled" if result["error"] == "cancelled" else "failed" if result["error"] else "done",
+                seconds=result.get("seconds"), rows=result["rows"], invalid_values=result.get("invalid_values"),
+                error=result["error"], outputs=result["outputs"]
+            )
+        elif future is not None and future.done() and future.exception() is not None:
+            status.update(status="failed", error=f"{type(future.exception()).__name__}: {future.exception()}")
+        elif progress is not None:
+            status.update(status="running", stage=progress["stage"], done_stages=progress["done"])
+        elif future is None:
+            # submitted by a process that is gone and never started
+            status.update(status="lost")
+        else:
+            status.update(status="queued")
+        return status
+
+    def jobs(self, job_ids=None):
+        """Table of the given jobs (default: every job on disk), newest first."""
+        if job_ids is None:
+            job_ids = sorted(os.listdir(self.jobs_dir)) if os.path.isdir(self.jobs_dir) else []
+        rows = [self.status(job_id) for job_id in job_ids]
+        table = pd.DataFrame(rows, columns=JOB_COLUMNS)
+        table["submitted"] = pd.to_datetime(table["submitted"])
+        return table.sort_values(["submitted", "job_id"], ascending=False, ignore_index=True)
+
+    def output_path(self, job_id, kind):
+        """Path of a finished job's output ("xlsx", "parquet", "diagnostics", "join_report" or "validation")."""
+        name = self.status(job_id)["outputs"].get(kind)
+        return os.path.join(self.job_dir(job_id), name) if name else None
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started yet; returns whether it was cancelled."""
+        future = self.futures.get(job_id)
+        if future is None or not future.cancel():
+            return False
+        write_json(os.path.join(self.job_dir(job_id), "result.json"), {"rows": 0, "outputs": {}, "error": "cancelled"})
+        return True
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """The process-wide job runner, created on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
@@ -0,0 +1,68 @@
+"""Raw-to-shipping-manifest join with a prebuilt key index.
+
+The manifest is indexed once on its normalized key. Every raw row then looks
+up at most one manifest row, so duplicate manifest keys can no longer multiply
+raw rows. Unmatched raw keys and duplicated manifest keys are collected into a
+report instead of disappearing silently.
+"""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+REPORT_COLUMNS = ["key", "issue", "occurrences"]
+
+
+def normalize_keys(keys):
+    """Strip, upper-case and drop zero padding / trailing ".0" from numeric barcodes."""
+    normalized = keys.astype(object).where(keys.notna()).astype("string").str.strip().str.upper()
+    normalized = normalized.str.replace(r"^(\d+)\.0+$", r"\1", regex=True)
+    numeric = normalized.str.fullmatch(r"\d+").fillna(False).astype(bool)
+    normalized[numeric] = normalized[numeric].str.lstrip("0").replace("", "0")
+    return normalized.replace("", pd.NA)
+
+
+class ManifestIndex:
+    """Hash index over a shipping manifest's merge key, built once per manifest."""
+
+    def __init__(self, manifest, key_col):
+        self.key_col = key_col
+        self.rows = manifest.reset_index(drop=True)
+        keys = normalize_keys(self.rows[key_col])
+        present = keys.notna()
+
+        counts = keys[present].value_counts(sort=False)
+        self.duplicate_counts = counts[counts > 1]
+        # the first manifest row wins for a duplicated key
+        first = present & ~keys.duplicated(keep="first")
+        self.index = pd.Index(keys[first].to_numpy(dtype=object))
+        self.positions = np.flatnonzero(first.to_numpy())
+        self.unmatched = Counter()
+
+    def lookup(self, raw_keys):
+        """Manifest row position for every raw key, -1 where there is no match."""
+        codes = self.index.get_indexer(normalize_keys(raw_keys).to_numpy(dtype=object))
+        return np.where(codes >= 0, self.positions[codes], -1)
+
+    def join(self, raw, raw_col):
+        """Left join of ``raw`` against the manifest, keeping ``raw.index`` and row count."""
+        positions = self.lookup(raw[raw_col])
+        missing = (positions < 0) & raw[raw_col].notna().to_numpy()
+        self.unmatched.update(raw[raw_col][missing].astype(str))
+
+        manifest_part = self.rows.reindex(positions)
+        if self.key_col == raw_col:
+            manifest_part = manifest_part.drop(columns=[self.key_col])
+        manifest_part.index = raw.index
+
+        # same suffixes pd.merge would add to overlapping column names
+        overlap = raw.columns.intersection(manifest_part.columns)
+        raw = raw.rename(columns={col: f"{col}_x" for col in overlap})
+        manifest_part = manifest_part.rename(columns={col: f"{col}_y" for col in overlap})
+        return pd.concat([raw, manifest_part], axis=1)
+
+    def report(self):
+        """Unmatched raw keys seen by ``join`` and duplicated manifest keys, one row per key."""
+        rows = [(key, "raw key not in manifest", count) for key, count in self.unmatched.items()]
+        rows += [(key, "duplicate manifest key", int(count)) for key, count in self.duplicate_counts.items()]
+        return pd.DataFrame(rows, columns=REPORT_COLUMNS)
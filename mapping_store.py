@@ -0,0 +1,133 @@
+import threading
+
+from db import MAPPING_TABLES, check_table
+from fuzzy import make_fuzzy_cleaner
+from harmonization import BiomarkerExtractor, build_transformations, make_cleaner, mapping_from_frame
+
+def load_mappings(db, table_names):
+    """Load several mapping tables with one UNION ALL query."""
+    selects = [
+        f"SELECT '{table_name}' AS source_table, id, {check_table(table_name)} AS standard, synonym FROM {table_name}"
+        for table_name in table_names
+    ]
+    query = " UNION ALL ".join(selects) + " ORDER BY source_table, id"
+    df = db.read_sql(query)
+    mappings = {table_name: {} for table_name in table_names}
+    for table_name, rows in df.groupby("source_table", sort=False):
+        mappings[table_name] = mapping_from_frame(rows, "standard")
+    return mappings
+
+
+def fetch_versions(db):
+    df = db.read_sql("SELECT table_name, version FROM mapping_versions")
+    versions = dict(zip(df["table_name"], df["version"]))
+    return {table_name: int(versions.get(table_name, 0)) for table_name in MAPPING_TABLES}
+
+
+def bump_version(db, cursor, table_name):
+    db.execute(cursor, "UPDATE mapping_versions SET version = version + 1 WHERE table_name = %s", (table_name,))
+    if cursor.rowcount == 0:
+        db.execute(cursor, "INSERT INTO mapping_versions (table_name, version) VALUES (%s, 1)", (table_name,))
+
+
+class MappingStore:
+    """Process-wide cache of mapping tables and the cleaners compiled from them.
+
+    ``refresh`` reads the mapping_versions counters and reloads only the tables
+    whose version moved since the last load. The synonym editor bumps the counter
+    in the same transaction as the insert or delete.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = {}
+        self.mappings = {}
+        self.cleaners = {}
+        self.fuzzy_cleaners = {}
+        self.extractor = None
+
+    def refresh(self, db):
+        versions = fetch_versions(db)
+        with self.lock:
+            stale = [
+                table_name for table_name in MAPPING_TABLES
+                if table_name not in self.mappings or self.versions.get(table_name) != versions[table_name]
+            ]
+            if stale:
+                self.mappings.update(load_mappings(db, stale))
+                self.versions.update({table_name: versions[table_name] for table_name in stale})
+                for table_name in stale:
+                    self.cleaners.pop(table_name, None)
+                    self.fuzzy_cleaners = {key: val for key, val in self.fuzzy_cleaners.items() if key[0] != table_name}
+                self.extractor = None
+        return self
+
+    def mapping(self, table_name):
+        return self.mappings[table_name]
+
+    def cleaner(self, table_name):
+        with self.lock:
+            if table_name not in self.cleaners:
+                self.cleaners[table_name] = make_cleaner(self.mappings[table_name])
+            return self.cleaners[table_name]
+
+    def fuzzy_cleaner(self, table_name, threshold):
+        """Kept until the table changes, so values resolved in one run are memoized for the next."""
+        with self.lock:
+            key = (table_name, threshold)
+            if key not in self.fuzzy_cleaners:
+                self.fuzzy_cleaners[key] = make_fuzzy_cleaner(self.mappings[table_name], threshold)
+            return self.fuzzy_cleaners[key]
+
+    def biomarker_extractor(self):
+        with self.lock:
+            if self.extractor is None:
+                self.extractor = BiomarkerExtractor(
+                    self.mappings["biomarker_mappings"],
+                    self.mappings["pos_neg_mappings"],
+                    self.mappings["her2_ihc_mappings"]
+                )
+            return self.extractor
+
+    def transformations(self, fuzzy_threshold=None):
+        """Date/time transforms and synonym cleaners; fuzzy cleaners when ``fuzzy_threshold`` is set."""
+        if fuzzy_threshold is None:
+            return build_transformations(None, cleaner_for=self.cleaner)
+        return build_transformations(None, cleaner_for=lambda table_name: self.fuzzy_cleaner(table_name, fuzzy_threshold))
+
+
+_store = MappingStore()
+
+
+def get_mapping_store():
+    return _store
+
+
+def add_synonym(db, table_name, standard_value, synonym):
+    std_col = check_table(table_name)
+    with db.cursor() as cursor:
+        db.execute(
+            cursor,
+            f"INSERT INTO {table_name} ({std_col}, synonym) VALUES (%s, %s)",
+            (standard_value, synonym)
+        )
+        bump_version(db, cursor, table_name)
+
+
+def add_synonyms(db, table_name, pairs):
+    """Insert many (standard_value, synonym) pairs in one transaction."""
+    std_col = check_table(table_name)
+    pairs = list(pairs)
+    if not pairs:
+        return 0
+    with db.cursor() as cursor:
+        db.executemany(cursor, f"INSERT INTO {table_name} ({std_col}, synonym) VALUES (%s, %s)", pairs)
+        bump_version(db, cursor, table_name)
+    return len(pairs)
+
+
+def remove_synonym(db, table_name, synonym):
+    check_table(table_name)
+    with db.cursor() as cursor:
+        db.execute(cursor, f"DELETE FROM {table_name} WHERE synonym = %s", (synonym,))
+        bump_version(db, cursor, table_name)
@@ -0,0 +1,145 @@
+"""Template-field suggestions from the column-mapping model trained in template_col_predict.ipynb.
+
+Each raw or manifest column is described the way the notebook built its
+training data: the header followed by up to ten sampled values, cleaned with
+the same ``clean_text``. All columns of a file are scored in one batched
+predict_proba call. The saved artifacts are supported: the TF-IDF pipeline
+(column_mapper_improved.pkl), the {"embedder", "classifier"} dict
+(column_mapper_semantic.pkl), the nearest-neighbour index built by
+embeddings.py and the versioned artifact exported by train_mapper.py. Each
+version of the model file is loaded once per process.
+"""
+import os
+import random
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+MODEL_PATH = os.environ.get("COLUMN_MAPPER_MODEL", "column_mapper_improved.pkl")
+SAMPLE_ROWS = 500
+SAMPLE_VALUES = 10
+MIN_CONFIDENCE = 0.3
+JUNK_VALUES = {"-", "--", ".", "", "na", "NA", "NaN"}
+
+
+def clean_text(s):
+    s = str(s).lower()
+    s = re.sub(r"[^a-z0-9\s]", " ", s)
+    s = re.sub(r"\s+", " ", s)
+    return s.strip()
+
+
+def sample_values(values, seed=0):
+    """Up to SAMPLE_VALUES non-blank values formatted like the training data, e.g. "['a','b']"."""
+    values = values.dropna().astype(str).str.strip()
+    values = [v for v in values if v not in JUNK_VALUES]
+    sample = random.Random(seed).sample(values, min(SAMPLE_VALUES, len(values)))
+    return "[" + ",".join(f"'{v}'" for v in sample) + "]"
+
+
+def column_text(header, values, seed=0):
+    """``header + sample_values`` text for one column, sampled reproducibly."""
+    return clean_text(f"{header} {sample_values(values, seed)}")
+
+
+def column_texts(frames):
+    """Column names and their texts for every column of ``frames``."""
+    names, texts = [], []
+    for frame in frames:
+        for col in frame.columns:
+            names.append(col)
+            texts.append(column_text(col, frame[col]))
+    return names, texts
+
+
+class ColumnPredictor:
+    def __init__(self, model, max_memo=32, metadata=None):
+        self.metadata = metadata or {}
+        if isinstance(model, dict):
+            self.embedder = model["embedder"]
+            self.classifier = model["classifier"]
+        else:
+            self.embedder = None
+            self.classifier = model
+        self.classes = [str(c) for c in self.classifier.classes_]
+        self.memo = OrderedDict()
+        self.max_memo = max_memo
+        self.lock = threading.Lock()
+
+    def predict_proba(self, texts):
+        """Probability of every class for every text, computed in one batch."""
+        key = tuple(texts)
+        with self.lock:
+            if key in self.memo:
+                self.memo.move_to_end(key)
+                return self.memo[key]
+        if not texts:
+            return np.zeros((0, len(self.classes)))
+        features = self.embedder.encode(list(texts)) if self.embedder is not None else list(texts)
+        probs = self.classifier.predict_proba(features)
+        with self.lock:
+            self.memo[key] = probs
+            while len(self.memo) > self.max_memo:
+                self.memo.popitem(last=False)
+        return probs
+
+    def suggest(self, frames, fields, k=3):
+        """Top ``k`` (column, confidence) candidates for each template field.
+
+        The model's classes are lower-cased template field names; classes that
+        are not in ``fields`` are ignored.
+        """
+        names, texts = column_texts(frames)
+        probs = self.predict_proba(texts)
+        field_for_class = {field.strip().lower(): field for field in fields}
+        suggestions = {}
+        for class_idx, label in enumerate(self.classes):
+            field = field_for_class.get(label.strip().lower())
+            if field is None or not names:
+                continue
+            ranked = np.argsort(-probs[:, class_idx])[:k]
+            suggestions[field] = [(names[i], float(probs[i, class_idx])) for i in ranked]
+        return suggestions
+
+
+def load_predictor(path=MODEL_PATH):
+    """The predictor for the model at ``path``, or None when the file or its libraries are missing.
+
+    ``path`` may also be a nearest-neighbour index built by embeddings.py (.npz).
+    Sentence-transformer embeddings go through the persistent embedding cache.
+    A missing file is checked again on every call, and a retrained file (new
+    modification time) is loaded again.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _load_predictor(path, mtime)
+
+
+@lru_cache(maxsize=4)
+def _load_predictor(path, mtime):
+    try:
+        if path.endswith(".npz"):
+            from embeddings import NeighbourIndex, load_embedder
+
+            index = NeighbourIndex.load(path)
+            return ColumnPredictor({"embedder": load_embedder(index.model_name), "classifier": index})
+
+        import joblib
+
+        model = joblib.load(path)
+    except ImportError:
+        return None
+    metadata = None
+    if isinstance(model, dict) and "model" in model:
+        # artifact exported by train_mapper.py
+        model, metadata = model["model"], model["metadata"]
+    if isinstance(model, dict):
+        from embeddings import EMBEDDING_MODEL, CachedEmbedder, embedding_store
+
+        model = dict(model, embedder=CachedEmbedder(model["embedder"], embedding_store(model.get("model_name", EMBEDDING_MODEL))))
+    return ColumnPredictor(model, metadata=metadata)
@@ -0,0 +1,139 @@
+"""Named mapping profiles stored in the mappings database.
+
+A profile is the configuration collected by the app's mapping form (the same
+JSON as batch_harmonize.mapping_config) saved together with the headers of the
+file it was built for. When a new file arrives from a repeat vendor, the
+profile whose headers match is applied automatically and only the fields it
+does not cover need to be filled in.
+"""
+import hashlib
+import json
+
+from batch_harmonize import mapping_config
+
+# column_mapping values that are not raw column names
+PLACEHOLDERS = {"", "fixed", "calculated", "not received"}
+
+
+def normalize_header(col):
+    return " ".join(str(col).split()).lower()
+
+
+def header_signature(columns):
+    """Order-insensitive hash of a file's headers, ignoring case and extra whitespace."""
+    names = sorted({normalize_header(col) for col in columns})
+    return hashlib.sha256("\x1f".join(names).encode()).hexdigest()
+
+
+def referenced_columns(config):
+    """Raw and manifest columns the configuration reads."""
+    cols = {val for val in config["column_mapping"].values() if val and val not in PLACEHOLDERS}
+    for start_col, end_col in config["calculation_functions"].values():
+        cols.update((start_col, end_col))
+    cols.update(col for col in (config["raw_col_merge"], config["ship_col_merge"]) if col)
+    return cols
+
+
+def save_profile(db, name, columns, config):
+    config = mapping_config(**config)
+    values = (header_signature(columns), json.dumps([str(col) for col in columns]), json.dumps(config))
+    with db.cursor() as cursor:
+        db.execute(cursor, "SELECT id FROM mapping_profiles WHERE name = %s", (name,))
+        if cursor.fetchone():
+            db.execute(
+                cursor,
+                "UPDATE mapping_profiles SET header_signature = %s, headers = %s, config = %s, updated_at = CURRENT_TIMESTAMP WHERE name = %s",
+                values + (name,)
+            )
+        else:
+            db.execute(
+                cursor,
+                "INSERT INTO mapping_profiles (name, header_signature, headers, config) VALUES (%s, %s, %s, %s)",
+                (name,) + values
+            )
+
+
+def delete_profile(db, name):
+    with db.cursor() as cursor:
+        db.execute(cursor, "DELETE FROM mapping_profiles WHERE name = %s", (name,))
+
+
+def list_profiles(db):
+    return db.read_sql("SELECT name, header_signature, config, updated_at FROM mapping_profiles ORDER BY updated_at DESC, id DESC")
+
+
+def load_profile(db, name):
+    df = db.read_sql("SELECT config FROM mapping_profiles WHERE name = %s", params=(name,))
+    if df.empty:
+        return None
+    return mapping_config(**json.loads(df["config"].iloc[0]))
+
+
+def match_profile(db, columns, profiles=None):
+    """Name of the saved profile to apply to a file with these headers, or None.
+
+    A profile saved for the same set of headers wins. Otherwise the profile that
+    reads the most columns, all of which exist in the file, is used.
+    """
+    profiles = list_profiles(db) if profiles is None else profiles
+    if profiles.empty:
+        return None
+    exact = profiles[profiles["header_signature"] == header_signature(columns)]
+    if not exact.empty:
+        return exact["name"].iloc[0]
+
+    available = {str(col) for col in columns}
+    best_name, best_count = None, 0
+    for name, config in zip(profiles["name"], profiles["config"]):
+        used = referenced_columns(mapping_config(**json.loads(config)))
+        if used and used <= available and len(used) > best_count:
+            best_name, best_count = name, len(used)
+    return best_name
+
+
+def covered_fields(config, fields, options):
+    """Template fields the profile fills in without any input for a file with columns ``options``.
+
+    Fields the profile deliberately left unmapped count as filled; fields new to
+    the template or mapped to a column this file lacks do not.
+    """
+    covered = set()
+    for field in fields:
+        if field not in config["column_mapping"]:
+            continue
+        mapped = config["column_mapping"][field]
+        if mapped in ("", "not received") or mapped in options:
+            covered.add(field)
+        elif mapped == "fixed" and config["fixed_values"].get(field):
+            covered.add(field)
+        elif mapped == "calculated" and set(config["calculation_functions"].get(field, ())) <= set(options):
+            covered.add(field)
+    return covered
+
+
+def widget_state(config, fields, options, calculated_fields=(), merge_options=None):
+    """Session-state values that make the app's mapping widgets show the profile.
+
+    ``merge_options`` maps the merge selectbox keys to the columns they offer.
+    """
+    state = {
+        "unit_height": config["height_truth"],
+        "unit_weight": config["weight_truth"],
+    }
+    for merge_key, merge_cols in (merge_options or {}).items():
+        if config[merge_key] in merge_cols:
+            state[merge_key] = config[merge_key]
+    for field in fields:
+        mapped = config["column_mapping"].get(field, "")
+        state[f"not_received_{field}"] = mapped == "not received"
+        state[f"use_fixed_value_{field}"] = mapped == "fixed"
+        state[f"fixed_value_{field}"] = config["fixed_values"].get(field, "")
+        if field in calculated_fields:
+            state[f"use_calculated_{field}"] = mapped == "calculated"
+            calc_cols = config["calculation_functions"].get(field)
+            if calc_cols and set(calc_cols) <= set(options):
+                state[f"calc_start_{field}"], state[f"calc_end_{field}"] = calc_cols
+        state[f"map_{field}"] = mapped if mapped in options else ""
+        state[f"flag_review_{field}"] = field in config["review_comments"]
+        state[f"comment_{field}"] = config["review_comments"].get(field, "")
+    return state
@@ -0,0 +1,89 @@
+"""Opt-in per-stage instrumentation for process_raw_to_template.
+
+Pass a StageProfiler as ``profiler`` and read ``report()`` afterwards. Each
+stage records wall time and rows processed, and, when a ColumnCache is in
+use, the column-cache hits and misses during the stage. With
+``memory=True`` the peak traced memory of each stage is recorded too;
+tracemalloc slows the run down noticeably, so it is off by default. A stage
+entered several times (one per chunk in streaming runs) is accumulated, and a
+stage nested in another counts towards the enclosing stage's peak as well.
+"""
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+
+REPORT_COLUMNS = ["stage", "calls", "seconds", "rows", "peak_mb", "cache_hits", "cache_misses"]
+
+
+class StageProfiler:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = {}
+        self.started = datetime.now()
+        # highest traced memory seen by each open stage before a nested stage reset the peak
+        self.open_peaks = []
+
+    @contextmanager
+    def stage(self, name, rows=None, cache=None):
+        """Time the enclosed block as stage ``name``; ``cache`` is the ColumnCache it reads."""
+        hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+        owns_tracing = False
+        if self.memory:
+            if tracemalloc.is_tracing():
+                if self.open_peaks:
+                    self.open_peaks[-1] = max(self.open_peaks[-1], tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                owns_tracing = True
+            base = tracemalloc.get_traced_memory()[0]
+            self.open_peaks.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if self.memory:
+                highest = max(tracemalloc.get_traced_memory()[1], self.open_peaks.pop())
+                peak = (highest - base) / 2**20
+                if self.open_peaks:
+                    self.open_peaks[-1] = max(self.open_peaks[-1], highest)
+                if owns_tracing:
+                    tracemalloc.stop()
+            entry = self.stages.setdefault(name, dict.fromkeys(REPORT_COLUMNS[1:], 0))
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["rows"] += rows or 0
+            entry["peak_mb"] = max(entry["peak_mb"], peak) if peak is not None else None
+            if cache is not None:
+                entry["cache_hits"] += cache.hits - hits
+                entry["cache_misses"] += cache.misses - misses
+
+    def report(self):
+        """One row per stage, in the order the stages first ran."""
+        rows = [{"stage": name, **entry} for name, entry in self.stages.items()]
+        return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+    def total_seconds(self):
+        return sum(entry["seconds"] for entry in self.stages.values())
+
+    def to_json(self, **metadata):
+        """The report as JSON, with the run's start time and any ``metadata``."""
+        return json.dumps({
+            "started": self.started.isoformat(timespec="seconds"),
+            "total_seconds": round(self.total_seconds(), 4),
+            **metadata,
+            "stages": self.report().round(4).to_dict(orient="records"),
+        }, indent=2, default=str)
+
+
+def stage(profiler, name, rows=None, cache=None):
+    """``profiler.stage(...)``, or a no-op when profiling is off."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name, rows, cache)
@@ -0,0 +1,85 @@
+"""Harmonized samples written to the mappings database.
+
+Each save records a row in harmonization_runs (dataset, mapping profile,
+mapping-table versions, stage timings) and upserts the samples into
+harmonized_samples, keyed by tube barcode and external id, so saving the same
+dataset twice updates the samples instead of duplicating them. A sample's
+template columns are stored as one JSON document.
+
+Rows go in with ``executemany`` in batches of ``batch_size`` inside a single
+transaction; MySQL Connector sends each batch as one multi-row INSERT. A
+missing key is stored as an empty string; a sample with neither key cannot be
+matched on a later save and is skipped.
+"""
+import json
+
+import pandas as pd
+
+from mapping_store import fetch_versions
+
+BATCH_SIZE = 1000
+# key column -> its name in the harmonized frame (the template workbook spells it "Tube Barcode")
+SAMPLE_KEYS = {"tube_barcode": ("TubeBarcode", "Tube Barcode"), "external_id": ("ExternalId",)}
+SAMPLE_COLUMNS = ["tube_barcode", "external_id", "dataset", "run_id", "fields"]
+MISSING_KEYS = {"", "not received", "nan", "none"}
+
+
+def key_column(final_df, names):
+    col = next((name for name in names if name in final_df.columns), None)
+    if col is None:
+        return pd.Series("", index=final_df.index)
+    keys = final_df[col].astype(str).str.strip()
+    return keys.where(final_df[col].notna() & ~keys.str.lower().isin(MISSING_KEYS), "")
+
+
+def sample_rows(final_df, dataset, run_id):
+    """Parameter tuples for harmonized_samples and the number of rows skipped for missing keys."""
+    barcodes = key_column(final_df, SAMPLE_KEYS["tube_barcode"])
+    external_ids = key_column(final_df, SAMPLE_KEYS["external_id"])
+    keyed = (barcodes != "") | (external_ids != "")
+    # one C-level pass over the frame instead of a json.dumps per row
+    documents = final_df[keyed].to_json(orient="records", lines=True, date_format="iso").splitlines()
+    rows = [
+        (barcode, external_id, dataset, run_id, document)
+        for barcode, external_id, document in zip(barcodes[keyed], external_ids[keyed], documents)
+    ]
+    return rows, int((~keyed).sum())
+
+
+def save_harmonized(db, final_df, dataset, mapping_profile=None, mapping_versions=None, timings=None, batch_size=BATCH_SIZE):
+    """Record the run and upsert its samples in one transaction; returns the run id and row counts.
+
+    ``mapping_versions`` defaults to the current mapping_versions counters;
+    ``timings`` is a StageProfiler report.
+    """
+    if mapping_versions is None:
+        mapping_versions = fetch_versions(db)
+    timings_json = timings.round(4).to_json(orient="records") if timings is not None else None
+    with db.cursor() as cursor:
+        db.execute(
+            cursor,
+            "INSERT INTO harmonization_runs (dataset, mapping_profile, mapping_versions, timings, row_count) VALUES (%s, %s, %s, %s, %s)",
+            (dataset, mapping_profile, json.dumps(mapping_versions), timings_json, len(final_df))
+        )
+        run_id = cursor.lastrowid
+        rows, skipped = sample_rows(final_df, dataset, run_id)
+        for start in range(0, len(rows), batch_size):
+            db.upsert_many(cursor, "harmonized_samples", SAMPLE_COLUMNS, list(SAMPLE_KEYS), rows[start:start + batch_size])
+    return {"run_id": run_id, "saved": len(rows), "skipped": skipped}
+
+
+def load_samples(db, dataset=None):
+    """Stored samples (of one dataset, or all) as a frame of their template columns."""
+    query = "SELECT fields FROM harmonized_samples"
+    params = None
+    if dataset is not None:
+        query += " WHERE dataset = %s"
+        params = (dataset,)
+    stored = db.read_sql(query + " ORDER BY id", params=params)
+    return pd.DataFrame.from_records([json.loads(document) for document in stored["fields"]])
+
+
+def list_runs(db):
+    return db.read_sql(
+        "SELECT id, dataset, mapping_profile, row_count, created_at FROM harmonization_runs ORDER BY id DESC"
+    )
@@ -0,0 +1,232 @@
+"""Chunked harmonization for raw exports too large to hold in memory.
+
+The raw file is read ``chunksize`` rows at a time, each chunk is joined against
+a shipping manifest that was indexed once up front (see manifest_join) and run
+through process_raw_to_template with the same configuration, and the harmonized
+chunks are appended to the output file as they are produced.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from harmonization import BiomarkerExtractor, process_raw_to_template, required_columns
+from manifest_join import ManifestIndex
+
+DEFAULT_CHUNKSIZE = 10_000
+
+
+def iter_raw_chunks(path, sheet_name=0, header=0, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield the raw file as DataFrames of at most ``chunksize`` rows."""
+    if str(path).lower().endswith(".csv"):
+        yield from pd.read_csv(path, header=header, chunksize=chunksize)
+        return
+    yield from iter_excel_chunks(path, sheet_name, header, chunksize)
+
+
+def iter_excel_chunks(path, sheet_name=0, header=0, chunksize=DEFAULT_CHUNKSIZE):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        for _ in range(header):
+            next(rows, None)
+        header_row = next(rows, None) or ()
+        columns = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header_row)]
+
+        start = 0
+        batch = []
+        for row in rows:
+            if all(val is None for val in row):
+                continue
+            batch.append(row[:len(columns)])
+            if len(batch) == chunksize:
+                yield excel_rows_to_frame(batch, columns, start)
+                start += len(batch)
+                batch = []
+        if batch:
+            yield excel_rows_to_frame(batch, columns, start)
+    finally:
+        workbook.close()
+
+
+def excel_rows_to_frame(rows, columns, start):
+    index = pd.RangeIndex(start, start + len(rows))
+    return pd.DataFrame.from_records(rows, columns=columns, index=index).infer_objects()
+
+
+def harmonize_chunks(raw_chunks, template, shipping_manifest=None, raw_col_merge=None, ship_col_merge=None, manifest_index=None, **config):
+    """Harmonize each raw chunk and yield the results with a fixed set of columns.
+
+    ``config`` takes the remaining process_raw_to_template arguments. The
+    biomarker extractor and manifest index are built once and reused for every
+    chunk; pass ``manifest_index`` to read its join report afterwards.
+    """
+    if config.get("biomarker_extractor") is None:
+        config["biomarker_extractor"] = BiomarkerExtractor(
+            config["biomarker_mapping"], config["pos_neg_mapping"], config["her2_ihc_mapping"]
+        )
+    if manifest_index is None and shipping_manifest is not None and raw_col_merge and ship_col_merge:
+        manifest_index = ManifestIndex(shipping_manifest, ship_col_merge)
+
+    columns = None
+    for raw_chunk in raw_chunks:
+        final = process_raw_to_template(
+            template=template, raw=raw_chunk, shipping_manifest=None, raw_col_merge=raw_col_merge,
+            manifest_index=manifest_index, **config
+        )
+        if columns is None:
+            # biomarker columns outside the template only appear in chunks whose blobs
+            # mention them, so reserve all of them up front
+            extra = [c for c in config["biomarker_extractor"].output_columns() if c not in final.columns]
+            columns = list(final.columns) + extra
+        missing = [col for col in columns if col not in final.columns and col in required_columns]
+        final = final.reindex(columns=columns)
+        final[missing] = final[missing].fillna("not received")
+        yield final
+
+
+class CsvChunkWriter:
+    def __init__(self, path, review_comments=None):
+        self.path = path
+        self.header = True
+
+    def write(self, chunk, invalid=None):
+        chunk.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def write_validation(self, summary):
+        pass
+
+    def close(self):
+        pass
+
+
+class ParquetChunkWriter:
+    """Appends chunks as row groups of one Parquet file.
+
+    Every column is written as a nullable string so that all chunks share one
+    schema no matter which values a given chunk happens to contain. Review flags
+    are stored as field metadata.
+    """
+
+    def __init__(self, path, review_comments=None):
+        self.path = path
+        self.review_comments = review_comments or {}
+        self.writer = None
+
+    def write(self, chunk, invalid=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        from export import review_metadata
+
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        arrays = [pa.array([None if v is None else str(v) for v in chunk[col]], type=pa.string()) for col in chunk.columns]
+        schema = pa.schema([
+            pa.field(str(col), pa.string(), metadata=review_metadata(col, self.review_comments)) for col in chunk.columns
+        ])
+        table = pa.Table.from_arrays(arrays, schema=schema)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def write_validation(self, summary):
+        pass
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class XlsxChunkWriter:
+    """Streams rows into a workbook with xlsxwriter's constant_memory mode.
+
+    ``path`` may also be a file-like object. Columns with a review comment are
+    highlighted and get the comment on their header cell; cells that failed
+    validation are highlighted as they are written.
+    """
+
+    def __init__(self, path, review_comments=None):
+        import xlsxwriter
+
+        from export import INVALID_COLOR
+
+        self.workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        self.worksheet = self.workbook.add_worksheet("Sheet1")
+        self.invalid_format = self.workbook.add_format({"bg_color": INVALID_COLOR})
+        self.review_comments = review_comments or {}
+        self.row = 0
+
+    def write_header(self, columns):
+        from export import HIGHLIGHT_COLOR
+
+        highlight_format = self.workbook.add_format({"bg_color": HIGHLIGHT_COLOR})
+        for col_idx, col_name in enumerate(columns):
+            if col_name in self.review_comments:
+                self.worksheet.set_column(col_idx, col_idx, None, highlight_format)
+        self.worksheet.write_row(0, 0, [str(col) for col in columns])
+        for col_idx, col_name in enumerate(columns):
+            if col_name in self.review_comments:
+                self.worksheet.write_comment(0, col_idx, self.review_comments[col_name])
+        self.row = 1
+
+    def write(self, chunk, invalid=None):
+        """Append ``chunk``; ``invalid`` is its ``{column: boolean row mask}`` from validation."""
+        if self.row == 0:
+            self.write_header(chunk.columns)
+        invalid_cells = {}
+        for col_name, mask in (invalid or {}).items():
+            col_idx = chunk.columns.get_loc(col_name)
+            for pos in np.flatnonzero(mask):
+                invalid_cells.setdefault(pos, []).append(col_idx)
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for pos, record in enumerate(values.itertuples(index=False, name=None)):
+            self.worksheet.write_row(self.row, 0, record)
+            # constant_memory only allows writing to the current row, so highlights go in now
+            for col_idx in invalid_cells.get(pos, ()):
+                self.worksheet.write(self.row, col_idx, record[col_idx], self.invalid_format)
+            self.row += 1
+
+    def write_validation(self, summary):
+        """Add the validation summary as a "Validation" sheet."""
+        if summary.empty:
+            return
+        sheet = self.workbook.add_worksheet("Validation")
+        sheet.write_row(0, 0, list(summary.columns))
+        for row, record in enumerate(summary.astype(object).itertuples(index=False, name=None), start=1):
+            sheet.write_row(row, 0, record)
+
+    def close(self):
+        self.workbook.close()
+
+
+CHUNK_WRITERS = {
+    ".csv": CsvChunkWriter,
+    ".parquet": ParquetChunkWriter,
+    ".xlsx": XlsxChunkWriter,
+}
+
+
+def write_chunks(chunks, path, review_comments=None, validator=None):
+    """Write harmonized chunks to CSV, Parquet or XLSX (picked by extension); returns the row count.
+
+    With a validation.Validator, every chunk is checked before it is written;
+    XLSX output highlights the invalid cells and gets the summary sheet.
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension not in CHUNK_WRITERS:
+        raise ValueError(f"Unsupported output format: {extension}")
+    writer = CHUNK_WRITERS[extension](path, review_comments)
+    rows = 0
+    try:
+        for chunk in chunks:
+            writer.write(chunk, validator.check(chunk) if validator is not None else None)
+            rows += len(chunk)
+        if validator is not None:
+            writer.write_validation(validator.summary())
+    finally:
+        writer.close()
+    return rows
@@ -0,0 +1,143 @@
+"""Bulk import and export of synonym tables, and paged reads for the editor.
+
+A synonym file is a CSV or XLSX with a ``synonym`` column and a standard
+value column, named either like the table's column (``standard_value``,
+``standard_name``, ``standard_term``) or just ``standard``. Every row of an
+import is classified against the table and the rest of the file before
+anything is written:
+
+- ``new``: inserted;
+- ``duplicate``: the table or an earlier row already maps the synonym to the
+  same standard value;
+- ``conflict``: the synonym already maps to another standard value;
+- ``ambiguous``: the file maps the synonym to more than one standard value;
+- ``invalid``: the standard value or the synonym is blank.
+
+Applied conflicts become ``replaced``, or ``failed`` when the database rejects
+the remap (the synonym already exists with the new standard value in another
+case, which MySQL's case-insensitive unique key counts as the same row).
+
+Synonyms are compared the way SynonymCleaner looks them up (trimmed,
+lowercased). The classification is repeated inside the import transaction,
+so concurrent edits cannot slip in between.
+"""
+import io
+
+import pandas as pd
+
+from db import check_table
+from mapping_store import bump_version
+
+IMPORT_COLUMNS = ["standard", "synonym", "status", "existing_standard"]
+STANDARD_ALIASES = ("standard_value", "standard_name", "standard_term", "standard")
+DEFAULT_PAGE_SIZE = 50
+
+
+def synonym_key(val):
+    return str(val).strip().lower()
+
+
+def read_synonym_file(data, filename):
+    """(standard, synonym) frame from the bytes of an uploaded CSV or XLSX file."""
+    if filename.lower().endswith(".csv"):
+        df = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(io.BytesIO(data), dtype=str, keep_default_na=False)
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    standard_col = next((col for col in STANDARD_ALIASES if col in df.columns), None)
+    if standard_col is None or "synonym" not in df.columns:
+        raise ValueError(f"Expected a 'synonym' column and one of {', '.join(STANDARD_ALIASES)}; got {', '.join(df.columns)}")
+    return pd.DataFrame({"standard": df[standard_col].str.strip(), "synonym": df["synonym"].str.strip()})
+
+
+def plan_import(existing, incoming):
+    """``incoming`` with the status each row would get against ``existing`` (standard, synonym) rows."""
+    current = {}
+    for standard, synonym in existing:
+        current.setdefault(synonym_key(synonym), standard)
+
+    plan = incoming[["standard", "synonym"]].fillna("").astype(str).apply(lambda col: col.str.strip()).reset_index(drop=True)
+    keys = plan["synonym"].map(synonym_key)
+    # a synonym the file maps to several standard values is ambiguous on every row
+    ambiguous = plan.groupby(keys)["standard"].transform("nunique") > 1
+    existing_standard = keys.map(current)
+
+    status = pd.Series("new", index=plan.index)
+    status[existing_standard.notna() & (existing_standard != plan["standard"])] = "conflict"
+    status[existing_standard.notna() & (existing_standard == plan["standard"])] = "duplicate"
+    status[(status == "new") & keys.duplicated()] = "duplicate"
+    status[ambiguous] = "ambiguous"
+    status[(plan["standard"] == "") | (plan["synonym"] == "")] = "invalid"
+    plan["status"] = status
+    plan["existing_standard"] = existing_standard.fillna("")
+    return plan.reindex(columns=IMPORT_COLUMNS)
+
+
+def import_synonyms(db, table_name, incoming, replace_conflicts=False):
+    """Insert the new synonyms of ``incoming`` in one transaction; returns the plan that was applied.
+
+    With ``replace_conflicts``, synonyms that already map to another standard
+    value are moved to the standard value from the file (applied rows get
+    status ``replaced``). Ambiguous rows are never applied.
+    """
+    std_col = check_table(table_name)
+    with db.cursor() as cursor:
+        db.execute(cursor, f"SELECT id, {std_col}, synonym FROM {table_name} ORDER BY id")
+        existing = cursor.fetchall()
+        plan = plan_import([(standard, synonym) for _, standard, synonym in existing], incoming)
+        new = plan[plan["status"] == "new"]
+        if not new.empty:
+            db.executemany(cursor, f"INSERT INTO {table_name} ({std_col}, synonym) VALUES (%s, %s)",
+                           list(zip(new["standard"], new["synonym"])))
+        replaced = 0
+        if replace_conflicts:
+            # the row the plan compared against: the first one stored under the synonym's key
+            row_ids = {}
+            for row_id, _, synonym in existing:
+                row_ids.setdefault(synonym_key(synonym), row_id)
+            for pos in plan.index[plan["status"] == "conflict"]:
+                try:
+                    db.execute(cursor, f"UPDATE {table_name} SET {std_col} = %s WHERE id = %s",
+                               (plan.at[pos, "standard"], row_ids[synonym_key(plan.at[pos, "synonym"])]))
+                except db.integrity_error:
+                    # only the failed statement is undone; the rest of the import goes ahead
+                    plan.at[pos, "status"] = "failed"
+                else:
+                    plan.at[pos, "status"] = "replaced"
+                    replaced += 1
+        if not new.empty or replaced:
+            bump_version(db, cursor, table_name)
+    return plan
+
+
+def export_synonyms(db, table_name, file_format="csv"):
+    """The whole table as CSV or XLSX bytes, in the layout read_synonym_file accepts."""
+    std_col = check_table(table_name)
+    df = db.read_sql(f"SELECT {std_col}, synonym FROM {table_name} ORDER BY {std_col}, synonym")
+    if file_format == "csv":
+        return df.to_csv(index=False).encode()
+    output = io.BytesIO()
+    df.to_excel(output, index=False, engine="xlsxwriter")
+    return output.getvalue()
+
+
+def search_filter(std_col, search):
+    if not search:
+        return "", ()
+    return f" WHERE synonym LIKE %s OR {std_col} LIKE %s", (f"%{search}%", f"%{search}%")
+
+
+def count_synonyms(db, table_name, search=""):
+    std_col = check_table(table_name)
+    where, params = search_filter(std_col, search)
+    return int(db.read_sql(f"SELECT COUNT(*) AS n FROM {table_name}{where}", params=params or None)["n"].iloc[0])
+
+
+def synonym_page(db, table_name, page=0, page_size=DEFAULT_PAGE_SIZE, search=""):
+    """Rows of page ``page`` (from 0), ordered by synonym, optionally filtered by a substring."""
+    std_col = check_table(table_name)
+    where, params = search_filter(std_col, search)
+    return db.read_sql(
+        f"SELECT id, {std_col}, synonym FROM {table_name}{where} ORDER BY synonym, {std_col} LIMIT %s OFFSET %s",
+        params=params + (int(page_size), int(page) * int(page_size))
+    )
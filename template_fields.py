@@ -0,0 +1,89 @@
+"""Fields of the harmonization template.
+
+Each field has the values it may take (``allowed``, comma separated; empty
+means free text) and a short definition shown next to it in the app. The
+validation module turns both into checks on the harmonized output.
+"""
+
+TEMPLATE_FIELDS = {
+    "ExternalId":{"allowed":"","definition":"Sample ID received from site"},
+    "Received Date":{"allowed":"","definition":"Must be in format XX-MON-YYYY (e.g. 01-JAN-2023)"},
+    "ContainerType":{"allowed":"Slide, Tube, Plate, FFPE Block","definition":""},
+    "Volume_uL":{"allowed":"","definition":""},
+    "TubeBarcode":{"allowed":"","definition":""},
+    "Concentration":{"allowed":"","definition":""},
+    "ConcentrationUnits":{"allowed":"","definition":""},
+    "Organism":{"allowed":"Human, Mouse, Mouse PDX","definition":""},
+    "Stabilizer":{"allowed":"Streck, Accucyte, EDTA, PAXgene ccfDNA","definition":""},
+    "Single or Double Spun":{"allowed":"Single, Double","definition":""},
+    "Processing Method":{"allowed":"","definition":""},
+    "Processing Time(hrs)":{"allowed":"","definition":""},
+    "Freeze Thaw Status":{"allowed":"0,1,2,3,4,4, Unknown","definition":"Number of freeze-thaw cycles the sample has undergone."},
+    "Hemolysis":{"allowed":"no hemolysis, light hemolysis, strong hemolysis, hemolysis","definition":"Documentation for quality of plasma (leave blank for non-plasma samples)"},
+    "Project":{"allowed":"","definition":""},
+    "Matched FFPE Available":{"allowed":"Yes, No","definition":"Add for plasma samples (not for FFPE samples themselves)"},
+    "Date of Blood Draw/Cell Collection":{"allowed":"","definition":"Must be in format XX-MON-YYYY (e.g. 01-JAN-2023)"},
+    "Time of Draw":{"allowed":"","definition":"Must be in format HH:MM (e.g. 14:30)"},
+    "Block Size":{"allowed":"","definition":""},
+    "Tissue Size":{"allowed":"","definition":""},
+    "Tissue Weight (mg)":{"allowed":"","definition":"(Decimal value)"},
+    "% Tumor":{"allowed":"","definition":"(Decimal value)"},
+    "% Necrosis":{"allowed":"","definition":"(Decimal value)"},
+    "Surgery Type":{"allowed":"biopsy, resection","definition":""},
+    "Tumor Tissue Type":{"allowed":"primary, metastasis","definition":""},
+    "Data Transformer":{"allowed":"","definition":"Name of person transforming the data"},
+    "Date of Transformation":{"allowed":"","definition":"Must be in format XX-MON-YYYY (e.g. 01-JAN-2023)"},
+    "Other Sample Notes":{"allowed":"","definition":""},
+    "ExSpecimenId":{"allowed":"","definition":""},
+    "Collection Site":{"allowed":"","definition":""},
+    "SpecimenType":{"allowed":"Cell Line, Blood","definition":""},
+    "Condition":{"allowed":"cancer, autoimmune, pregnancy, healthy","definition":""},
+    "Diagnostic Condition":{"allowed":"breast cancer, colorectal cancer, lung cancer, gastroesophageal cancer, multiple sclerosis, osteosarcoma, ovarian cancer","definition":""},
+    "Histology":{"allowed":"adenocarcinoma, carcinoma, epithelial tumor, endometrioid carcinoma, mucinous adenocarcinoma, infiltrating ductal carcinoma, infiltrating lobular carcinoma, large cell neuroendocrine carcinoma, large cell carcinoma, lobular carcinoma in situ, ductal carcinoma in situ, non-small cell lung cancer NOS, phylloides tumor, secretory carcinoma, small cell carcinoma, squamous cell carcinoma, signet ring cell carcinoma, neuroendocrine carcinoma, NOS, metastatic castration-resistant prostate cancer (mCRPC), invasive carcinoma NOS, acinar adenocarcinoma, pleomorphic carcinoma, lepidic adenocarcinoma, papillary adenocarcinoma,metaplastic carcinoma, serous carcinoma, not applicable, not received, SPMS, RRMS, PPMS,","definition":""},
+    "Height":{"allowed":"","definition":""},
+    "Weight":{"allowed":"","definition":""},
+    "Duration between Cancer Diagnosis and Blood Draw (days)":{"allowed":"","definition":""},
+    "Duration between Metastatic Diagnosis and Blood Draw (days)":{"allowed":"","definition":""},
+    "Sample Timepoint":{"allowed":"treatment-naïve, undergoing treatment, progression, study termination","definition":""},
+    "Sample Timepoint Description":{"allowed":"","definition":"Use this field if the sample timepoint is not one of the standard options above."},
+    "AgeAtCollection":{"allowed":"","definition":""},
+    "Detailed Anatomical Location":{"allowed":"","definition":""},
+    "Grade":{"allowed":"","definition":""},
+    "Tumor Size":{"allowed":"","definition":""},
+    "TNM":{"allowed":"","definition":""},
+    "Duration between TNM Staging and Blood Draw (days)":{"allowed":"","definition":""},
+    "Stage":{"allowed":" I, II, III, IV","definition":""},
+    "Stage Detailed":{"allowed":"","definition":""},
+    "Morphology Code":{"allowed":"","definition":""},
+    "Description of Morphology Code":{"allowed":"","definition":""},
+    "Metastatic Sites":{"allowed":"","definition":"Organs the cancer has metastasized to, e.g. liver, lung, bone, brain"},
+    "Vehicle Control":{"allowed":"","definition":""},
+    "Media Conditions":{"allowed":"","definition":""},
+    "Additional Supplements to Media":{"allowed":"","definition":""},
+    "Protocols for Harvesting Cell Lines":{"allowed":"","definition":""},
+    "Blood collection date (days from birth)":{"allowed":"","definition":""},
+    "Number of lines of metastatic therapy at time of blood draw":{"allowed":"","definition":""},
+    "Number of lines of chemotherapy at time of blood draw":{"allowed":"","definition":""},
+    "Number of lines of anti-HER2 therapy at time of blood draw":{"allowed":"","definition":""},
+    "Number of lines of endocrine therapy at time of blood draw":{"allowed":"","definition":""},
+    "Overall Survival(months)":{"allowed":"","definition":""},
+    "Treatment Data":{"allowed":"","definition":""},
+    "Progression Free Survival(months)":{"allowed":"","definition":""},
+    "Gestational Age at Collection":{"allowed":"","definition":"Only needed for pregnancy samples"},
+    "Fetus Sex":{"allowed":"Male, Female, Unknown","definition":"Only needed for pregnancy samples"},
+    "Menopausal Status":{"allowed":"premenopause, perimenopause, menopause, postmenopause","definition":""},
+    "Blood Type":{"allowed":"","definition":""},
+    "RNA-Sequencing Available":{"allowed":"Yes, No","definition":""},
+    "ExPatientId":{"allowed":"","definition":""},
+    "Source":{"allowed":"AstraZeneca, Biomedica CRO Inc., DxBio, ATCC, Biometas, Menarini, Coriell, Precision for Medicine, BMS, Discovery Life Sciences, Rarecyte, Proteo, AMSBIO, UPMC, Indivumed GmbH, Research Blood Components, Garner Biosolutions Inc, Genentech, Genentech-UCSF, MD Anderson, MT Group, MGH Klempner, Other, OHSU, DFCI, UCSF, Turku, Duke, EMD Serono, Novartis, Tyra, Duke, MD Anderson, Menarini, AstraZeneca, EMD Serono","definition":"Vendor or Academic partner where samples were sourced from"},
+    "Country":{"allowed":"","definition":""},
+    "Gender":{"allowed":"Male, Female, Unknown","definition":""},
+    "Race":{"allowed":"American Indian or Alaska Native, Asian, Black or African American, Hispanic or Latino, Native Hawaiian or Other Pacific Islander, White","definition":""},
+    "MedicalHistory":{"allowed":"","definition":""},
+    "FamilyHistory":{"allowed":"","definition":""},
+    "AlcoholHistory":{"allowed":"","definition":""},
+    "SmokingHistory":{"allowed":"Current Smoker, Former Smoker, Never Smoked, not received, not applicable, Smoking History Present","definition":""},
+    "Number of years smoked or smoking":{"allowed":"","definition":""},
+    "Smoking Notes":{"allowed":"","definition":"Number of packs, ect."},
+    "Donor Notes":{"allowed":"","definition":"Any other info not captured above"}
+}
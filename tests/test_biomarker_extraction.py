@@ -0,0 +1,112 @@
+"""BiomarkerExtractor against a frozen copy of the per-variant regex extraction it replaced."""
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import biomarker_blobs, mapping_tables
+from harmonization import BiomarkerExtractor, mapping_from_frame
+
+
+def legacy_extract(blob, biomarker_lookup, pos_neg_mapping, her2_ihc_mapping):
+    """extract_biomarkers_from_blob as it was before the single-pass extractor, unchanged."""
+    results = {}
+    blob = blob.replace("=", " = ")
+    blob = re.sub(r'\s+', ' ', blob).strip().lower()
+    biomarker_keys = sorted(
+        [re.escape(v.lower()) for variants in biomarker_lookup.values() for v in variants],
+        key=len, reverse=True
+    )
+    lookahead_pattern = r'(?=\s+\b(?:' + '|'.join(biomarker_keys) + r')\b\s*=|$)'
+    fish_match = re.search(r'\bfish\b\s*=\s*([^\s=]+)', blob)
+    fish_val = fish_match.group(1).strip() if fish_match else None
+    for template_col, variants in biomarker_lookup.items():
+        for variant in variants:
+            variant = variant.lower()
+            pattern = rf'\b{re.escape(variant)}\b\s*=\s*(.*?){lookahead_pattern}'
+            match = re.search(pattern, blob)
+            if match:
+                raw_val = match.group(1).strip()
+                if template_col == "HER2":
+                    her2_match = re.search(r'(0|1\+|2\+|3\+)', raw_val)
+                    if her2_match:
+                        her2_score = her2_match.group(1)
+                        if her2_score in ["0", "1+"]:
+                            mapped = "negative"
+                        elif her2_score == "3+":
+                            mapped = "positive"
+                        elif her2_score == "2+":
+                            if fish_val in pos_neg_mapping.get("positive", []):
+                                mapped = "positive"
+                            elif fish_val in pos_neg_mapping.get("negative", []):
+                                mapped = "negative"
+                            else:
+                                mapped = "HER2 2+ (FISH/ISH missing)"
+                        else:
+                            mapped = pd.NA
+                        for mapped_ihc, variants in her2_ihc_mapping.items():
+                            if raw_val in variants:
+                                results['HER2 IHC'] = mapped_ihc
+                                break
+                        else:
+                            results['HER2 IHC'] = raw_val
+                    else:
+                        mapped = raw_val
+                else:
+                    mapped = None
+                    for label, values in pos_neg_mapping.items():
+                        if raw_val in values:
+                            mapped = label
+                            break
+                    if mapped is None:
+                        mapped = raw_val
+                results[f"{template_col} Value"] = raw_val
+                results[template_col] = mapped
+                break
+    return results
+
+
+EDGE_CASES = [
+    "",
+    "no biomarkers reported",
+    "ER=positive PR=negative HER2=2+ FISH=positive",
+    "her2 = 2+ fish = negative",
+    "HER2=2+",
+    "HER2 = 3+ (IHC) ER = 90% PR =",
+    "ER: = weak positive PR=neg",
+    "er=pos er=neg",
+    "estrogen receptor = positive progesterone receptor = negative",
+    "PDL1=TPS 50% KRAS=G12C EGFR=wt",
+    "ER=positive, PR=positive;HER2=1+",
+    "herceptin=3+ HER2=0",
+    "HER2=1+ HER2 IHC=2+",
+    "  ER   =   POSITIVE   ",
+    "ER==positive",
+    "=ER positive",
+]
+
+
+@pytest.fixture(scope="module")
+def mappings():
+    return {table_name: mapping_from_frame(frame, std_col) for table_name, (frame, std_col) in mapping_tables().items()}
+
+
+def corpus():
+    frame = biomarker_blobs(np.random.default_rng(0), 2000)
+    blobs = frame.fillna("").astype(str).agg(" ".join, axis=1)
+    return EDGE_CASES + sorted(set(blobs))
+
+
+def comparable(results):
+    return {key: None if val is pd.NA else val for key, val in results.items()}
+
+
+def test_extractor_matches_legacy_extraction(mappings):
+    lookups = (mappings["biomarker_mappings"], mappings["pos_neg_mappings"], mappings["her2_ihc_mappings"])
+    extractor = BiomarkerExtractor(*lookups)
+    mismatches = [
+        blob for blob in corpus()
+        if comparable(extractor(blob)) != comparable(legacy_extract(blob, *lookups))
+    ]
+    assert mismatches == []
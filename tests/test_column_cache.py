@@ -0,0 +1,78 @@
+import pandas as pd
+
+from benchmarks.bench_pipeline import Workload
+from benchmarks.synthetic import mapping_tables
+from column_cache import ColumnCache
+from db import sqlite_database
+from harmonization import process_raw_to_template
+from mapping_store import MappingStore, add_synonym, add_synonyms
+
+WORKLOAD = Workload(300, seed=2)
+
+
+def run(cache, transformations, column_mapping=None, source="raw.xlsx"):
+    config = WORKLOAD.config
+    cache.reset(source)
+    return process_raw_to_template(
+        template=WORKLOAD.template, raw=WORKLOAD.raw.copy(), shipping_manifest=WORKLOAD.manifest,
+        column_mapping=column_mapping or config["column_mapping"], fixed_values=config["fixed_values"],
+        biomarker_cols=config["biomarker_cols"], calculation_functions=config["calculation_functions"],
+        biomarker_mapping=WORKLOAD.mappings["biomarker_mappings"], pos_neg_mapping=WORKLOAD.mappings["pos_neg_mappings"],
+        her2_ihc_mapping=WORKLOAD.mappings["her2_ihc_mappings"], menopause_mapping=WORKLOAD.mappings["menopause_mappings"],
+        transformations=transformations, height_truth=config["height_truth"], weight_truth=config["weight_truth"],
+        raw_col_merge=config["raw_col_merge"], ship_col_merge=config["ship_col_merge"],
+        biomarker_extractor=WORKLOAD.extractor, column_cache=cache,
+    )
+
+
+def seeded_store():
+    db = sqlite_database()
+    for table_name, (frame, std_col) in mapping_tables(seed=2).items():
+        add_synonyms(db, table_name, frame[[std_col, "synonym"]].itertuples(index=False, name=None))
+    return db, MappingStore().refresh(db)
+
+
+def test_unchanged_rerun_is_all_hits():
+    cache = ColumnCache()
+    first = run(cache, WORKLOAD.transformations)
+    assert cache.hits == 0 and cache.misses == len(cache.entries)
+
+    misses = cache.misses
+    second = run(cache, WORKLOAD.transformations)
+    assert cache.recomputed == [] and cache.misses == misses
+    assert cache.hits == len(cache.entries)
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_new_mapping_version_recomputes_only_its_column():
+    db, store = seeded_store()
+    cache = ColumnCache()
+    before = run(cache, store.transformations())
+    assert not (before["Gender"] == "Unknown").any()
+
+    add_synonym(db, "gender_mappings", "Unknown", "unknown")
+    store.refresh(db)
+    after = run(cache, store.transformations())
+    assert cache.recomputed == [("column", "Gender")]
+    assert (after["Gender"] == "Unknown").any()
+    pd.testing.assert_frame_equal(after.drop(columns="Gender"), before.drop(columns="Gender"))
+
+    # a refresh without a version change keeps the compiled cleaner, so nothing is recomputed
+    store.refresh(db)
+    run(cache, store.transformations())
+    assert cache.recomputed == []
+
+
+def test_changed_source_column_or_file_invalidates():
+    cache = ColumnCache()
+    run(cache, WORKLOAD.transformations)
+
+    column_mapping = dict(WORKLOAD.config["column_mapping"], Gender="Hemolysis")
+    remapped = run(cache, WORKLOAD.transformations, column_mapping=column_mapping)
+    assert cache.recomputed == [("column", "Gender")]
+    expected = WORKLOAD.transformations["Gender"].transform(WORKLOAD.merged["Hemolysis"])
+    assert remapped["Gender"].astype(object).fillna("not received").tolist() == \
+        pd.Series(expected).astype(object).fillna("not received").tolist()
+
+    run(cache, WORKLOAD.transformations, column_mapping=column_mapping, source="other.xlsx")
+    assert len(cache.recomputed) == len(cache.entries)
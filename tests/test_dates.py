@@ -0,0 +1,33 @@
+import pandas as pd
+
+import harmonization
+from harmonization import clean_date, clean_date_column, parse_datetime_column
+
+
+def test_day_first_first_row_does_not_reorder_ambiguous_dates():
+    values = pd.Series(["13/05/2023", "05/06/2023", "2023-May-06", "06/05/2023", None])
+    parsed = parse_datetime_column(values)
+    assert list(parsed[:4]) == [pd.Timestamp(2023, 5, 13), pd.Timestamp(2023, 5, 6),
+                                pd.Timestamp(2023, 5, 6), pd.Timestamp(2023, 6, 5)]
+    assert pd.isna(parsed[4])
+
+
+def test_column_matches_per_value_cleaning():
+    values = pd.Series(["2023-05-06", "2023-5-7", "2023-05-13", "12 Jan 2022", "JUN 3 2021", "not a date", None])
+    expected = [clean_date(val) for val in values]
+    assert [None if pd.isna(val) else val for val in clean_date_column(values)] == \
+        [None if pd.isna(val) else val for val in expected]
+
+
+def test_uniform_format_takes_the_vectorized_parse(monkeypatch):
+    calls = []
+    monkeypatch.setattr(harmonization, "to_datetime_or_nat", lambda val: calls.append(val) or pd.NaT)
+    values = pd.Series([f"2023-{month:02d}-{day:02d}" for month in range(1, 13) for day in (1, 15, 28)])
+    parsed = parse_datetime_column(values)
+    assert calls == []
+    assert parsed.iloc[0] == pd.Timestamp(2023, 1, 1) and parsed.notna().all()
+
+
+def test_offset_bearing_value_among_naive_dates():
+    values = pd.Series(["2023-05-06T10:00:00+02:00", "2023-01-01"])
+    assert clean_date_column(values).tolist() == [clean_date(val) for val in values] == ["2023-May-06", "2023-January-01"]
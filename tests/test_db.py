@@ -0,0 +1,18 @@
+from db import sqlite_database
+
+
+def test_pooled_connection_comes_back_without_an_open_transaction(tmp_path):
+    db = sqlite_database(str(tmp_path / "mappings.db"))
+    with db.connection() as conn:
+        conn.execute("INSERT INTO gender_mappings (standard_value, synonym) VALUES ('female', 'f')")
+        assert conn.in_transaction
+    with db.connection() as conn:
+        assert not conn.in_transaction
+    assert db.read_sql("SELECT COUNT(*) AS n FROM gender_mappings WHERE synonym = 'f'")["n"].iloc[0] == 0
+
+
+def test_cursor_commits(tmp_path):
+    db = sqlite_database(str(tmp_path / "mappings.db"))
+    with db.cursor() as cursor:
+        db.execute(cursor, "INSERT INTO gender_mappings (standard_value, synonym) VALUES (%s, %s)", ("female", "f"))
+    assert db.read_sql("SELECT COUNT(*) AS n FROM gender_mappings WHERE synonym = 'f'")["n"].iloc[0] == 1
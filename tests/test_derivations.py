@@ -0,0 +1,28 @@
+import pandas as pd
+
+from benchmarks.bench_derivations import rowwise, synthetic_rows, vectorized
+from harmonization import calculate_bmi, calculate_bmi_column, parse_age_column, parse_age_smart
+
+
+def cells(values):
+    return [None if pd.isna(val) else val for val in values]
+
+
+def test_columns_match_the_per_cell_helpers():
+    raw = synthetic_rows(2000, seed=3)
+    (old_age, old_bmi), (new_age, new_bmi) = rowwise(raw), vectorized(raw)
+    assert cells(new_age) == cells(old_age)
+    assert cells(new_bmi) == cells(old_bmi)
+
+
+def test_edge_cases():
+    age = pd.Series(["45", " 1970 ", "03/15/1960", "", None, "abc", "150", "0"], dtype=object)
+    collection = pd.Series(["2020-06-01"] * 6 + [None, "2020-06-01"], dtype=object)
+    assert cells(parse_age_column(age, collection)) == cells(parse_age_smart(a, c) for a, c in zip(age, collection))
+
+    weight = pd.Series([70, 70, None, "80", "x", 0], dtype=object)
+    height = pd.Series([175, 0, 175, "180", 175, 160], dtype=object)
+    bmi = calculate_bmi_column(weight, height)
+    expected = [calculate_bmi(w, h) for w, h in zip(weight, height)]
+    assert cells(bmi) == cells(expected)
+    assert bmi[1] is pd.NA and bmi[2] is pd.NA
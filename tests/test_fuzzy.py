@@ -0,0 +1,10 @@
+from fuzzy import FuzzyCleaner
+
+
+def test_memo_is_bounded():
+    cleaner = FuzzyCleaner({"positive": ["positive", "pos"], "negative": ["negative", "neg"]}, memo_size=2)
+    assert cleaner.matches("positve")[0][0] == "positive"
+    cleaner.matches("negatve")
+    cleaner.matches("positve")
+    cleaner.matches("postive")
+    assert list(cleaner.memo) == ["positve", "postive"]
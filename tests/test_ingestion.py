@@ -0,0 +1,32 @@
+import io
+import os
+
+import pandas as pd
+
+from ingestion import WorkbookCache
+
+
+def workbook(n_rows):
+    output = io.BytesIO()
+    pd.DataFrame({"id": range(n_rows), "text": [f"sample {i}" for i in range(n_rows)]}).to_excel(output, index=False)
+    return output.getvalue()
+
+
+def test_evicts_by_memory_size():
+    cache = WorkbookCache(max_entries=16, max_bytes=1)
+    first, second = workbook(50), workbook(60)
+    cache.read(first)
+    cache.read(second)
+    assert len(cache.frames) == 1
+    assert cache.total_bytes == sum(cache.sizes.values())
+    cache.read(second)
+    assert cache.hits == 1
+
+
+def test_disk_cache_round_trip_leaves_no_temp_files(tmp_path):
+    data = workbook(20)
+    expected = WorkbookCache(cache_dir=str(tmp_path)).read(data)
+    assert [name for name in os.listdir(tmp_path) if not name.endswith(".pkl")] == []
+    restarted = WorkbookCache(cache_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(restarted.read(data), expected)
+    assert (restarted.hits, restarted.misses) == (1, 0)
@@ -0,0 +1,43 @@
+import io
+import os
+
+import pytest
+
+from benchmarks.synthetic import mapping_tables, raw_sheet, shipping_manifest, synthetic_config, template_frame
+from export import safe_name
+from harmonization import mapping_from_frame
+from jobs import run_job
+
+SETTING_KEYS = ["column_mapping", "fixed_values", "biomarker_cols", "calculation_functions",
+                "height_truth", "weight_truth", "raw_col_merge", "ship_col_merge"]
+
+
+def workbook_input(frame):
+    output = io.BytesIO()
+    frame.to_excel(output, index=False)
+    return output.getvalue(), 0, 0
+
+
+def test_dataset_name_cannot_escape_the_job_directory(tmp_path):
+    raw = raw_sheet(50, seed=0)
+    inputs = {"raw": workbook_input(raw), "template": workbook_input(template_frame()),
+              "shipping": workbook_input(shipping_manifest(raw, seed=0))}
+    config = synthetic_config()
+    settings = {key: config[key] for key in SETTING_KEYS}
+    settings["dataset"] = "../../escaped/run 1"
+    mappings = {table_name: mapping_from_frame(frame, std_col) for table_name, (frame, std_col) in mapping_tables().items()}
+    job_dir = tmp_path / "jobs" / "job-1"
+    job_dir.mkdir(parents=True)
+
+    result = run_job(str(job_dir), inputs, settings, mappings)
+
+    assert result["outputs"]["xlsx"] == "escaped_run_1_formatted_auto.xlsx"
+    for name in result["outputs"].values():
+        assert os.path.isfile(job_dir / name)
+    assert sorted(os.listdir(tmp_path)) == ["jobs"]
+
+
+def test_safe_name():
+    assert safe_name("../a/b c") == "a_b_c"
+    with pytest.raises(ValueError):
+        safe_name("../")
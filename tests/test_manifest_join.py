@@ -0,0 +1,40 @@
+import pandas as pd
+
+from manifest_join import ManifestIndex, normalize_keys
+
+
+def test_normalize_keys():
+    keys = pd.Series([" 00123 ", "123.0", 123, 123.0, "ab-7 ", "000", "", None, "0012a"], dtype=object)
+    assert [None if pd.isna(key) else key for key in normalize_keys(keys)] == \
+        ["123", "123", "123", "123", "AB-7", "0", None, None, "0012A"]
+
+
+def test_join_matches_padded_keys_keeps_rows_and_reports_misses():
+    manifest = pd.DataFrame({
+        "Barcode": ["00123", "123", "AB-7", "555", None],
+        "Site": ["first", "second", "third", "fourth", "fifth"],
+        "Volume": [1, 2, 3, 4, 5],
+    })
+    raw = pd.DataFrame(
+        {"Tube Barcode": ["123.0", " ab-7", "999", "123", None, "999"], "Volume": [10, 20, 30, 40, 50, 60]},
+        index=[7, 3, 9, 1, 4, 8],
+    )
+    index = ManifestIndex(manifest, "Barcode")
+    joined = index.join(raw, "Tube Barcode")
+
+    assert len(joined) == len(raw) and joined.index.equals(raw.index)
+    assert list(joined.columns) == ["Tube Barcode", "Volume_x", "Barcode", "Site", "Volume_y"]
+    # the first manifest row wins for the duplicated key 123
+    assert [None if pd.isna(v) else v for v in joined["Site"]] == ["first", "third", None, "first", None, None]
+    assert joined["Volume_x"].tolist() == raw["Volume"].tolist()
+
+    report = index.report().sort_values("key", ignore_index=True)
+    assert report.values.tolist() == [["123", "duplicate manifest key", 2], ["999", "raw key not in manifest", 2]]
+
+
+def test_same_key_column_name_is_not_duplicated():
+    manifest = pd.DataFrame({"Barcode": ["1", "2"], "Site": ["a", "b"]})
+    raw = pd.DataFrame({"Barcode": ["2", "3"]})
+    joined = ManifestIndex(manifest, "Barcode").join(raw, "Barcode")
+    assert list(joined.columns) == ["Barcode", "Site"]
+    assert [None if pd.isna(v) else v for v in joined["Site"]] == ["b", None]
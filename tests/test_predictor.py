@@ -0,0 +1,24 @@
+import os
+
+from predictor import load_predictor
+from train_mapper import save_artifact, train_artifact
+
+TEXTS = ["gender m f", "sex male female", "tube barcode 00123", "barcode t1 t2", "age 54 61", "age at collection 70"]
+LABELS = ["Gender", "Gender", "Tube Barcode", "Tube Barcode", "AgeAtCollection", "AgeAtCollection"]
+
+
+def test_model_trained_after_a_miss_is_picked_up(tmp_path):
+    path = str(tmp_path / "column_mapper.pkl")
+    assert load_predictor(path) is None
+
+    save_artifact(train_artifact(TEXTS, LABELS, "complement_nb"), path)
+    predictor = load_predictor(path)
+    assert predictor is not None and predictor.metadata["n_samples"] == 6
+    assert load_predictor(path) is predictor
+
+    # retraining replaces the file; the next call loads the new version
+    save_artifact(train_artifact(TEXTS[:4], LABELS[:4], "complement_nb"), path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    retrained = load_predictor(path)
+    assert retrained is not predictor and retrained.metadata["n_samples"] == 4
@@ -0,0 +1,24 @@
+from profiling import StageProfiler
+
+
+def test_nested_stage_keeps_the_outer_peak():
+    profiler = StageProfiler(memory=True)
+    with profiler.stage("outer"):
+        buffer = bytearray(20 * 2**20)
+        del buffer
+        with profiler.stage("inner"):
+            small = bytearray(2**20)
+            del small
+    report = profiler.report().set_index("stage")
+    assert report.loc["outer", "peak_mb"] >= 20
+    assert 1 <= report.loc["inner", "peak_mb"] < 20
+
+
+def test_inner_peak_counts_towards_outer():
+    profiler = StageProfiler(memory=True)
+    with profiler.stage("outer"):
+        with profiler.stage("inner"):
+            buffer = bytearray(20 * 2**20)
+            del buffer
+    report = profiler.report().set_index("stage")
+    assert report.loc["outer", "peak_mb"] >= 20
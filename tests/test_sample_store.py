@@ -0,0 +1,33 @@
+import pandas as pd
+
+from db import sqlite_database
+from sample_store import load_samples, save_harmonized
+
+
+def stored(db):
+    return db.read_sql(
+        "SELECT tube_barcode, external_id, run_id, fields FROM harmonized_samples ORDER BY id"
+    ).values.tolist()
+
+
+def test_saving_twice_updates_in_place_and_skips_keyless_rows():
+    db = sqlite_database()
+    final = pd.DataFrame({
+        "Tube Barcode": ["T1", "T2", None, "not received", "  "],
+        "ExternalId": ["P1", None, "P3", "nan", None],
+        "Gender": ["Male", "Female", "Male", "Female", "Male"],
+    })
+    first = save_harmonized(db, final, "site-a", mapping_versions={}, batch_size=2)
+    assert first["saved"] == 3 and first["skipped"] == 2
+    assert [row[:2] for row in stored(db)] == [["T1", "P1"], ["T2", ""], ["", "P3"]]
+
+    final.loc[1, "Gender"] = "Unknown"
+    second = save_harmonized(db, final, "site-a", mapping_versions={}, batch_size=2)
+    assert second["saved"] == 3 and second["skipped"] == 2
+    assert second["run_id"] != first["run_id"]
+
+    rows = stored(db)
+    assert len(rows) == 3
+    assert [row[2] for row in rows] == [second["run_id"]] * 3
+    assert load_samples(db, "site-a")["Gender"].tolist() == ["Male", "Unknown", "Male"]
+    assert len(db.read_sql("SELECT id FROM harmonization_runs")) == 2
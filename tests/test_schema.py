@@ -0,0 +1,27 @@
+import re
+
+from db import MAPPING_TABLES, SCHEMA_PATH, sqlite_database
+
+
+def seed_inserts():
+    with open(SCHEMA_PATH) as f:
+        schema = f.read()
+    for table, values in re.findall(r"INSERT INTO (\w+) \([^)]*\) VALUES(.*?);", schema, flags=re.S):
+        yield table, re.findall(r"\('((?:[^']|'')*)', '((?:[^']|'')*)'\)", values)
+
+
+def test_seed_has_no_case_variant_duplicates():
+    # MySQL's case-insensitive collation would reject these under UNIQUE (synonym, standard)
+    seen = 0
+    for table, rows in seed_inserts():
+        keys = [(synonym.strip().lower(), standard.lower()) for standard, synonym in rows]
+        assert len(keys) == len(set(keys)), table
+        seen += len(rows)
+    assert seen > 0
+
+
+def test_seed_loads():
+    db = sqlite_database()
+    with db.cursor() as cursor:
+        for table, rows in seed_inserts():
+            db.executemany(cursor, f"INSERT INTO {table} ({MAPPING_TABLES[table]}, synonym) VALUES (%s, %s)", rows)
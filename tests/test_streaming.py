@@ -0,0 +1,57 @@
+import io
+
+import pandas as pd
+
+from benchmarks.bench_pipeline import Workload
+from export import xlsx_bytes
+from harmonization import process_raw_to_template
+from streaming import harmonize_chunks, iter_raw_chunks, write_chunks
+
+WORKLOAD = Workload(250, seed=3)
+CONFIG = WORKLOAD.config
+PIPELINE_ARGS = dict(
+    column_mapping=CONFIG["column_mapping"], fixed_values=CONFIG["fixed_values"],
+    biomarker_cols=CONFIG["biomarker_cols"], calculation_functions=CONFIG["calculation_functions"],
+    biomarker_mapping=WORKLOAD.mappings["biomarker_mappings"], pos_neg_mapping=WORKLOAD.mappings["pos_neg_mappings"],
+    her2_ihc_mapping=WORKLOAD.mappings["her2_ihc_mappings"], menopause_mapping=WORKLOAD.mappings["menopause_mappings"],
+    transformations=WORKLOAD.transformations, height_truth=CONFIG["height_truth"], weight_truth=CONFIG["weight_truth"],
+)
+
+
+def whole_file(raw, columns):
+    final = process_raw_to_template(
+        template=WORKLOAD.template, raw=raw, shipping_manifest=WORKLOAD.manifest,
+        raw_col_merge=CONFIG["raw_col_merge"], ship_col_merge=CONFIG["ship_col_merge"], **PIPELINE_ARGS
+    )
+    assert set(final.columns) <= set(columns)
+    return final.reindex(columns=columns)
+
+
+def chunked(path, output):
+    chunks = harmonize_chunks(
+        iter_raw_chunks(path, chunksize=60), WORKLOAD.template, shipping_manifest=WORKLOAD.manifest,
+        raw_col_merge=CONFIG["raw_col_merge"], ship_col_merge=CONFIG["ship_col_merge"], **PIPELINE_ARGS
+    )
+    assert write_chunks(chunks, output) == len(WORKLOAD.raw)
+
+
+def test_csv_chunks_match_the_whole_file_run(tmp_path):
+    raw_path, output = tmp_path / "raw.csv", tmp_path / "out.csv"
+    WORKLOAD.raw.to_csv(raw_path, index=False)
+    chunked(raw_path, output)
+
+    streamed = pd.read_csv(output)
+    expected = whole_file(pd.read_csv(raw_path), streamed.columns)
+    pd.testing.assert_frame_equal(streamed, pd.read_csv(io.StringIO(expected.to_csv(index=False))))
+
+
+def test_xlsx_chunks_match_the_whole_file_run(tmp_path):
+    raw_path, output = tmp_path / "raw.xlsx", tmp_path / "out.xlsx"
+    WORKLOAD.raw.to_excel(raw_path, index=False)
+    chunked(raw_path, output)
+
+    streamed = pd.read_excel(output)
+    expected = whole_file(pd.read_excel(raw_path), streamed.columns)
+    # the constant-memory writer used for downloads produces the same sheet as to_excel
+    pd.testing.assert_frame_equal(pd.read_excel(io.BytesIO(xlsx_bytes(expected, constant_memory=True))), streamed)
+    pd.testing.assert_frame_equal(pd.read_excel(io.BytesIO(xlsx_bytes(expected))), streamed)
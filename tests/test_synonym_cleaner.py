@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fuzzy import make_fuzzy_cleaner
+from harmonization import SynonymCleaner, make_cleaner
+
+MAPPING = {"Female": ["f", "female", "Woman "], "Male": ["m", "MALE"], "1": [1, "one"]}
+
+
+def cells(series):
+    return [None if pd.isna(val) else val for val in series]
+
+
+@pytest.mark.parametrize("make", [make_cleaner, make_fuzzy_cleaner])
+def test_transform_matches_per_cell_cleaning(make):
+    cleaner = make(MAPPING)
+    series = pd.Series(
+        ["F", " female ", "woman", "WOMAN ", "m", "Male", "male ", "femle", "", "  ", None, np.nan, pd.NA, 1, 1.0, "1", "ONE", "f"],
+        index=range(100, 118), name="Gender", dtype=object,
+    )
+    transformed = cleaner.transform(series)
+    assert isinstance(transformed.dtype, pd.CategoricalDtype)
+    assert transformed.index.equals(series.index) and transformed.name == series.name
+    assert cells(transformed.astype(object)) == cells(series.map(cleaner))
+
+
+def test_transform_of_an_all_missing_column():
+    cleaner = SynonymCleaner(MAPPING)
+    series = pd.Series([None, np.nan], dtype=object)
+    assert cells(cleaner.transform(series).astype(object)) == [None, None]
+    assert cells(cleaner.transform(series.iloc[:0])) == []
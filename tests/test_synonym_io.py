@@ -0,0 +1,41 @@
+import pandas as pd
+
+from db import sqlite_database
+from synonym_io import import_synonyms
+
+
+def table_rows(db, table_name="gender_mappings"):
+    return db.read_sql(f"SELECT id, standard_value, synonym FROM {table_name} ORDER BY id").values.tolist()
+
+
+def add_rows(db, rows, table_name="gender_mappings"):
+    with db.cursor() as cursor:
+        db.executemany(cursor, f"INSERT INTO {table_name} (standard_value, synonym) VALUES (%s, %s)", rows)
+
+
+def incoming(*pairs):
+    return pd.DataFrame(pairs, columns=["standard", "synonym"])
+
+
+def test_replace_updates_the_row_the_plan_compared_against():
+    db = sqlite_database()
+    add_rows(db, [("Female", "M"), ("Male", "m")])
+    plan = import_synonyms(db, "gender_mappings", incoming(("Unknown", "m")), replace_conflicts=True)
+    assert plan["status"].tolist() == ["replaced"]
+    assert plan["existing_standard"].tolist() == ["Female"]
+    assert table_rows(db) == [[1, "Unknown", "M"], [2, "Male", "m"]]
+
+
+def test_rejected_remap_is_reported_and_the_rest_is_applied(tmp_path):
+    db = sqlite_database(str(tmp_path / "mappings.db"))
+    # the unique key compares synonyms case-insensitively, as MySQL's default collation does
+    with db.cursor() as cursor:
+        db.execute(cursor, "DROP TABLE gender_mappings")
+        db.execute(cursor, """CREATE TABLE gender_mappings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, standard_value TEXT NOT NULL, synonym TEXT NOT NULL COLLATE NOCASE,
+            UNIQUE (synonym, standard_value))""")
+    add_rows(db, [("Female", "M"), ("Male", "m")])
+
+    plan = import_synonyms(db, "gender_mappings", incoming(("Male", "M"), ("Female", "f")), replace_conflicts=True)
+    assert plan["status"].tolist() == ["failed", "new"]
+    assert table_rows(db) == [[1, "Female", "M"], [2, "Male", "m"], [3, "Female", "f"]]
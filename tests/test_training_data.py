@@ -0,0 +1,38 @@
+import io
+import os
+
+import pandas as pd
+
+from training_data import build_training_data, find_workbooks, scan_root
+
+
+def write_workbook(path, frame):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    frame.to_excel(path, index=False)
+
+
+def test_same_named_workbooks_in_subfolders_stay_apart(tmp_path):
+    write_workbook(tmp_path / "site_a" / "raw.xlsx", pd.DataFrame({"Patient": ["P1", "P2"], "Sex": ["F", "M"]}))
+    write_workbook(tmp_path / "site_b" / "raw.xlsx", pd.DataFrame({"Subject": ["S1"], "Age": [50]}))
+    source = str(tmp_path)
+    paths = find_workbooks(source)
+    output = str(tmp_path / "training_data.csv")
+    manifest = f"{output}.manifest.json"
+
+    summary, skipped = build_training_data(paths, output, manifest, workers=1, out=io.StringIO(), root=scan_root(source))
+    first = pd.read_csv(output, dtype=str, keep_default_na=False)
+    assert skipped == 0 and len(summary) == 2
+    assert sorted(first["source_file"].unique()) == ["site_a/raw.xlsx", "site_b/raw.xlsx"]
+
+    # label one row, then rebuild: nothing changed, so every row and the label are kept
+    first.loc[first["raw_header"] == "Subject", "target_template_field"] = "ExternalId"
+    first.to_csv(output, index=False)
+    summary, skipped = build_training_data(paths, output, manifest, workers=1, out=io.StringIO(), root=scan_root(source))
+    second = pd.read_csv(output, dtype=str, keep_default_na=False)
+    assert skipped == 2 and summary.empty
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_scan_root():
+    assert scan_root(os.path.join("archive", "**", "*.xlsx")) == "archive"
+    assert scan_root("*.xlsx") == "."
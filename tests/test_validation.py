@@ -0,0 +1,37 @@
+from benchmarks.bench_pipeline import Workload
+from harmonization import ColumnTransform, build_transformations, clean_date, clean_time
+from validation import PIPELINE_FORMATS, Validator, compile_rules
+
+
+def test_pipeline_formats_cover_the_reformatted_fields():
+    transformations = build_transformations(None, cleaner_for=lambda table_name: None)
+    assert set(PIPELINE_FORMATS) == {field for field, transform in transformations.items() if isinstance(transform, ColumnTransform)}
+
+
+def test_pipeline_output_has_no_format_violations():
+    final = Workload(500, seed=1).pipeline()
+    for field in PIPELINE_FORMATS:
+        assert (final[field] != "not received").any(), field
+
+    validator = Validator()
+    validator.check(final)
+    summary = validator.summary()
+    assert summary[summary["field"].isin(list(PIPELINE_FORMATS))].empty, summary.to_string()
+
+
+def test_date_and_time_rules_accept_cleaned_values():
+    rules = compile_rules()
+    date_rule, time_rule = rules["Date of Blood Draw/Cell Collection"], rules["Time of Draw"]
+    for raw in ["2023-05-06", "1 Jan 2020", "12/31/1999"]:
+        assert date_rule.accepts(clean_date(raw))
+    for raw in ["00:05", "12:30", "23:59:59", "7:04 PM"]:
+        assert time_rule.accepts(clean_time(raw))
+    assert not date_rule.accepts("06-MAY-2023")
+    assert not time_rule.accepts("14:30")
+
+
+def test_pass_through_dates_keep_the_template_format():
+    rules = compile_rules()
+    for field in ["Received Date", "Date of Transformation"]:
+        assert rules[field].accepts("01-JAN-2023")
+        assert not rules[field].accepts("2023-January-01")
@@ -0,0 +1,211 @@
+"""Model selection and training for the TF-IDF column mapper.
+
+Replaces the notebook's repeated cross-validation loops. The TF-IDF features
+of every fold are fitted once, cached on disk with joblib.Memory and shared by
+all classifier variants that use them; folds run in parallel. Each variant is
+reported with accuracy, top-k accuracy, fit time and per-column predict
+latency. The best variant is refitted on all labelled columns and exported
+with versioned metadata for predictor.load_predictor.
+
+The artifact goes to predictor.MODEL_PATH (``COLUMN_MAPPER_MODEL``), where the
+app loads it from, unless ``--output`` says otherwise.
+
+    python train_mapper.py training_data_v2_noblanks.csv
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Memory, Parallel, delayed, dump
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.naive_bayes import ComplementNB
+from sklearn.pipeline import FeatureUnion, Pipeline
+
+from predictor import MODEL_PATH
+from training_data import load_training_texts
+
+ARTIFACT_VERSION = 1
+TOP_K = 3
+DEFAULT_SEED = 42
+
+
+def word_char_features():
+    return FeatureUnion([
+        ("word_tfidf", TfidfVectorizer(ngram_range=(1, 2), analyzer="word", min_df=1)),
+        ("char_tfidf", TfidfVectorizer(ngram_range=(3, 5), analyzer="char_wb", min_df=1)),
+    ])
+
+
+def word_features():
+    return TfidfVectorizer(ngram_range=(1, 2), analyzer="word", min_df=1)
+
+
+FEATURES = {
+    "word+char": word_char_features,
+    "word": word_features,
+}
+
+# variant name -> (features, classifier factory); "logreg" is the notebook's model
+VARIANTS = {
+    "logreg": ("word+char", partial(LogisticRegression, max_iter=4000, class_weight="balanced")),
+    "logreg_c10": ("word+char", partial(LogisticRegression, C=10, max_iter=4000, class_weight="balanced")),
+    "logreg_word": ("word", partial(LogisticRegression, max_iter=4000, class_weight="balanced")),
+    "sgd_log": ("word+char", partial(SGDClassifier, loss="log_loss", class_weight="balanced", random_state=DEFAULT_SEED)),
+    "complement_nb": ("word+char", ComplementNB),
+}
+
+
+def fold_features(features, texts, train_idx, test_idx):
+    """Fit the vectorizer on the fold's training texts; returns both matrices and the timings."""
+    vectorizer = FEATURES[features]()
+    start = time.perf_counter()
+    X_train = vectorizer.fit_transform([texts[i] for i in train_idx])
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    X_test = vectorizer.transform([texts[i] for i in test_idx])
+    transform_seconds = time.perf_counter() - start
+    return X_train, X_test, fit_seconds, transform_seconds
+
+
+def top_k_hits(classes, probs, y_true, k=TOP_K):
+    top = np.asarray(classes)[np.argsort(-probs, axis=1)[:, :k]]
+    return (top == np.asarray(y_true)[:, None]).any(axis=1)
+
+
+def evaluate_fold(fold, texts, labels, train_idx, test_idx, variants, cache_dir=None):
+    """Metrics of every variant on one fold; variants sharing features share one fitted vectorizer."""
+    featurize = Memory(cache_dir, verbose=0).cache(fold_features)
+    y_train, y_test = labels[train_idx], labels[test_idx]
+    rows = []
+    for features in dict.fromkeys(VARIANTS[name][0] for name in variants):
+        X_train, X_test, features_seconds, transform_seconds = featurize(features, texts, train_idx, test_idx)
+        for name in variants:
+            if VARIANTS[name][0] != features:
+                continue
+            clf = VARIANTS[name][1]()
+            start = time.perf_counter()
+            clf.fit(X_train, y_train)
+            fit_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            probs = clf.predict_proba(X_test)
+            predict_seconds = time.perf_counter() - start
+            rows.append({
+                "variant": name,
+                "fold": fold,
+                "accuracy": float((clf.classes_[probs.argmax(axis=1)] == y_test).mean()),
+                f"top{TOP_K}_accuracy": float(top_k_hits(clf.classes_, probs, y_test).mean()),
+                "fit_seconds": features_seconds + fit_seconds,
+                "predict_ms_per_column": 1000 * (transform_seconds + predict_seconds) / len(test_idx),
+            })
+    return rows
+
+
+def cross_validate(texts, labels, variants=tuple(VARIANTS), folds=5, seed=DEFAULT_SEED, n_jobs=-1, cache_dir=None):
+    """Per-fold metrics of every variant, with folds evaluated in parallel."""
+    labels = np.asarray(labels, dtype=object)
+    splits = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(texts, labels)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(fold, texts, labels, train_idx, test_idx, variants, cache_dir)
+        for fold, (train_idx, test_idx) in enumerate(splits)
+    )
+    return pd.DataFrame([row for fold_rows in results for row in fold_rows])
+
+
+def summarize(fold_results):
+    """Mean of each metric per variant, best accuracy first."""
+    summary = fold_results.drop(columns="fold").groupby("variant").mean()
+    summary.insert(1, "accuracy_std", fold_results.groupby("variant")["accuracy"].std())
+    return summary.sort_values(["accuracy", f"top{TOP_K}_accuracy"], ascending=False)
+
+
+def compact(pipeline):
+    """Drop the vectorizers' stop_words_, which only serves introspection and can dominate the pickle."""
+    features = pipeline.named_steps["features"]
+    vectorizers = [step for _, step in features.transformer_list] if isinstance(features, FeatureUnion) else [features]
+    for vectorizer in vectorizers:
+        if hasattr(vectorizer, "stop_words_"):
+            vectorizer.stop_words_ = None
+    return pipeline
+
+
+def data_fingerprint(texts, labels):
+    digest = hashlib.sha256()
+    for text, label in zip(texts, labels):
+        digest.update(f"{text}\x1f{label}\x1e".encode())
+    return digest.hexdigest()
+
+
+def train_artifact(texts, labels, variant, cv_summary=None, **metadata):
+    """The variant refitted on all data, wrapped with its metadata as {"model", "metadata"}."""
+    features, classifier = VARIANTS[variant]
+    pipeline = Pipeline([("features", FEATURES[features]()), ("clf", classifier())])
+    start = time.perf_counter()
+    pipeline.fit(texts, labels)
+    metadata = {
+        "artifact_version": ARTIFACT_VERSION,
+        "variant": variant,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "sklearn_version": sklearn.__version__,
+        "n_samples": len(texts),
+        "classes": [str(c) for c in pipeline.classes_],
+        "training_sha256": data_fingerprint(texts, labels),
+        "fit_seconds": round(time.perf_counter() - start, 3),
+        "cv": {} if cv_summary is None else {key: float(val) for key, val in cv_summary.loc[variant].items()},
+        **metadata,
+    }
+    return {"model": compact(pipeline), "metadata": metadata}
+
+
+def save_artifact(artifact, path):
+    """Compressed joblib artifact plus a JSON copy of its metadata next to it."""
+    dump(artifact, path, compress=3)
+    with open(f"{path}.json", "w") as f:
+        json.dump(artifact["metadata"], f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validate column-mapper variants and export the best one.")
+    parser.add_argument("training_csv", help="labelled CSV with raw_header, sample_values and target_template_field")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel folds (default: all CPUs)")
+    parser.add_argument("--cache-dir", default=".train_cache", help="fold feature cache; '' disables it")
+    parser.add_argument("--min-class-count", type=int, default=2)
+    parser.add_argument("--output", default=MODEL_PATH, help=f"exported model (default: {MODEL_PATH}, the one the app loads)")
+    parser.add_argument("--no-export", action="store_true", help="only report cross-validation results")
+    parser.add_argument("--report", help="also write the per-fold results to this CSV")
+    args = parser.parse_args(argv)
+
+    texts, labels = load_training_texts(args.training_csv, args.min_class_count)
+    print(f"{len(texts)} labelled columns, {len(set(labels))} fields", file=sys.stderr)
+
+    start = time.perf_counter()
+    fold_results = cross_validate(texts, labels, args.variants, args.folds, args.seed, args.jobs, args.cache_dir or None)
+    summary = summarize(fold_results)
+    print(summary.round(4).to_string())
+    print(f"cross-validation: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if args.report:
+        fold_results.to_csv(args.report, index=False)
+
+    if not args.no_export:
+        best = summary.index[0]
+        artifact = train_artifact(
+            texts, labels, best, summary, training_data=args.training_csv, folds=args.folds, seed=args.seed
+        )
+        save_artifact(artifact, args.output)
+        print(f"exported {best} -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Reproducible builder for the column-mapper training data.
+
+Replaces the first cell of template_col_predict.ipynb. Every workbook in the
+archive is scanned in a process pool and each column becomes one row of
+``training_data.csv`` (source_file, raw_header, sample_values,
+target_template_field); source_file is the workbook's path relative to the
+scanned folder, so same-named workbooks in different subfolders stay apart.
+Sample values are drawn with a seed derived from the run seed, source file
+and header, so rebuilding gives the same samples. A manifest of file hashes
+lets later runs skip unchanged workbooks; their rows (and any labels filled in
+since) are carried over. Rows are appended to the CSV as each workbook
+finishes, and failures are reported per file.
+
+    python training_data.py raw_clinical_data/ --output training_data.csv
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from ingestion import excel_engine
+from predictor import clean_text, sample_values
+
+OUTPUT_COLUMNS = ["source_file", "raw_header", "sample_values", "target_template_field"]
+DEFAULT_SEED = 42
+
+
+def find_workbooks(source):
+    """Workbooks under a directory (recursively) or matching a glob pattern, sorted."""
+    pattern = os.path.join(source, "**", "*.xlsx") if os.path.isdir(source) else source
+    paths = glob.glob(pattern, recursive=True)
+    return sorted(path for path in paths if not os.path.basename(path).startswith("~$"))
+
+
+def scan_root(source):
+    """Folder that source_file names are relative to: the directory itself, or the fixed part of a glob pattern."""
+    if os.path.isdir(source):
+        return source
+    root = os.path.dirname(source)
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root or "."
+
+
+def source_name(path, root):
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_workbook(path, seed=DEFAULT_SEED, sheet_name=0, digest=None, source_file=None):
+    """Training rows for every non-empty column of the workbook's first sheet."""
+    source_file = source_file or os.path.basename(path)
+    result = {"path": path, "source_file": source_file, "hash": digest or file_hash(path), "rows": [], "error": "", "seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        raw = pd.read_excel(path, sheet_name=sheet_name, engine=excel_engine())
+        for col in raw.columns:
+            sample = sample_values(raw[col], seed=f"{seed}:{source_file}:{col}")
+            if sample == "[]":
+                continue
+            result["rows"].append({
+                "source_file": source_file,
+                "raw_header": col,
+                "sample_values": sample,
+                "target_template_field": ""
+            })
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def load_training_texts(path, min_class_count=1):
+    """Texts and lower-cased target fields from a labelled training CSV, prepared as in the notebook.
+
+    Fields with fewer than ``min_class_count`` examples are dropped.
+    """
+    df = pd.read_csv(path).dropna(subset=["raw_header", "sample_values", "target_template_field"])
+    texts = (df["raw_header"].astype(str) + " " + df["sample_values"].astype(str)).map(clean_text)
+    labels = df["target_template_field"].str.strip().str.lower()
+    keep = labels.map(labels.value_counts()) >= min_class_count
+    return texts[keep].tolist(), labels[keep].tolist()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def build_training_data(paths, output, manifest_path, seed=DEFAULT_SEED, workers=None, out=sys.stderr, root=None):
+    """Scan new or changed workbooks into ``output``; source_file names are relative to ``root``.
+
+    Returns a summary DataFrame of the scanned workbooks and the number of unchanged ones skipped.
+    """
+    manifest = load_manifest(manifest_path)
+    existing = pd.read_csv(output, dtype=str, keep_default_na=False) if os.path.exists(output) else pd.DataFrame(columns=OUTPUT_COLUMNS)
+    labels = {
+        (row.source_file, row.raw_header): row.target_template_field
+        for row in existing.itertuples(index=False) if row.target_template_field
+    }
+
+    root = root or os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    names = {path: source_name(path, root) for path in paths}
+    hashes = {path: file_hash(path) for path in paths}
+    unchanged = {
+        path for path in paths
+        if manifest.get(path, {}).get("hash") == hashes[path]
+        and manifest[path].get("seed") == seed and not manifest[path].get("error")
+    }
+    todo = [path for path in paths if path not in unchanged]
+
+    # rewrite the CSV with the rows that are still valid, then append as workbooks finish
+    kept = existing[existing["source_file"].isin({names[path] for path in unchanged})]
+    kept.reindex(columns=OUTPUT_COLUMNS).to_csv(output, index=False)
+    manifest = {path: entry for path, entry in manifest.items() if path in unchanged}
+    save_manifest(manifest, manifest_path)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(scan_workbook, path, seed, 0, hashes[path], names[path]) for path in todo]
+        # consumed in submission order so the CSV row order does not depend on timing
+        for done, future in enumerate(futures, start=1):
+            result = future.result()
+            rows = pd.DataFrame(result["rows"], columns=OUTPUT_COLUMNS)
+            rows["target_template_field"] = [
+                labels.get((source_file, str(header)), "") for source_file, header in zip(rows["source_file"], rows["raw_header"])
+            ]
+            rows.to_csv(output, mode="a", header=False, index=False)
+            manifest[result["path"]] = {"hash": result["hash"], "seed": seed, "rows": len(rows), "error": result["error"]}
+            save_manifest(manifest, manifest_path)
+
+            status = f"FAILED {result['error']}" if result["error"] else f"{len(rows)} columns"
+            print(f"[{done}/{len(todo)}] {result['source_file']}: {status} ({result['seconds']}s)", file=out, flush=True)
+            results.append({"file": result["path"], "columns": len(rows), "seconds": result["seconds"], "error": result["error"]})
+    return pd.DataFrame(results, columns=["file", "columns", "seconds", "error"]), len(unchanged)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the column-mapper training CSV from a folder of raw workbooks.")
+    parser.add_argument("source", help="directory of raw workbooks, or a glob pattern")
+    parser.add_argument("--output", default="training_data.csv")
+    parser.add_argument("--manifest", help="file-hash manifest (default: <output>.manifest.json)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--errors", help="also write failed workbooks to this CSV")
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.source)
+    if not paths:
+        print(f"No workbooks found in {args.source}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    summary, skipped = build_training_data(
+        paths, args.output, args.manifest or f"{args.output}.manifest.json", args.seed, args.workers, root=scan_root(args.source)
+    )
+    failed = summary[summary["error"] != ""]
+    print(f"{len(summary)} workbooks scanned, {skipped} unchanged, {len(failed)} failed "
+          f"in {time.perf_counter() - start:.1f}s -> {args.output}")
+    if not failed.empty:
+        print(failed[["file", "error"]].to_string(index=False))
+        if args.errors:
+            failed.to_csv(args.errors, index=False)
+    return int(not failed.empty)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
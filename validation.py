@@ -0,0 +1,123 @@
+"""Checks of the harmonized output against the template's allowed values.
+
+compile_rules turns TEMPLATE_FIELDS into one rule per constrained field: an
+``allowed`` list becomes a set of values, and a definition naming a format
+(XX-MON-YYYY dates, HH:MM times, decimal values) becomes a pattern. The date
+and time fields the pipeline reformats are checked against the format it
+writes instead. Columns are checked through their distinct values:
+pd.factorize codes every cell, each distinct value is checked once and the
+verdicts are spread back to the rows by code, so a column costs one hash pass
+plus work per distinct value. Blanks and "not received" always pass.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from template_fields import TEMPLATE_FIELDS
+
+EXEMPT_VALUES = {"", "not received"}
+MAX_EXAMPLES = 5
+SUMMARY_COLUMNS = ["field", "rule", "invalid", "rows", "examples"]
+
+MONTHS = "JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC"
+MONTH_NAMES = "January|February|March|April|May|June|July|August|September|October|November|December"
+# definition text -> (rule name, pattern the whole value must match)
+FORMAT_PATTERNS = {
+    "XX-MON-YYYY": ("date XX-MON-YYYY", rf"\d{{2}}-(?:{MONTHS})-\d{{4}}"),
+    "HH:MM": ("time HH:MM", r"(?:[01]\d|2[0-3]):[0-5]\d"),
+    "(Decimal value)": ("decimal", r"[-+]?(?:\d+\.?\d*|\.\d+)"),
+}
+# fields the pipeline rewrites (the date and time entries of build_transformations) are checked
+# against what clean_date_column ("%Y-%B-%d") and clean_time_column ("%I:%M:%S %p") write;
+# every other field keeps the raw value and is checked against the template's wording
+PIPELINE_FORMATS = {
+    "Date of Blood Draw/Cell Collection": ("date YYYY-Month-DD", rf"\d{{4}}-(?:{MONTH_NAMES})-(?:0[1-9]|[12]\d|3[01])"),
+    "Time of Draw": ("time HH:MM:SS AM/PM", r"(?:0[1-9]|1[0-2]):[0-5]\d:[0-5]\d [AP]M"),
+}
+
+
+class Rule:
+    def __init__(self, name, accepts):
+        self.name = name
+        self.accepts = accepts
+
+
+def parse_allowed(text):
+    return [val.strip() for val in str(text).split(",") if val.strip()]
+
+
+def compile_rules(fields=TEMPLATE_FIELDS):
+    """``{field: Rule}`` for every field with allowed values or a known format."""
+    rules = {}
+    for field, meta in fields.items():
+        allowed = parse_allowed(meta.get("allowed", ""))
+        if allowed:
+            rules[field] = Rule("allowed values", frozenset(allowed).__contains__)
+            continue
+        formats = [PIPELINE_FORMATS[field]] if field in PIPELINE_FORMATS else [
+            name_pattern for marker, name_pattern in FORMAT_PATTERNS.items() if marker in meta.get("definition", "")
+        ]
+        if formats:
+            name, pattern = formats[0]
+            regex = re.compile(pattern)
+            rules[field] = Rule(name, lambda text, regex=regex: regex.fullmatch(text) is not None)
+    return rules
+
+
+def value_text(val):
+    """The text a cell is checked as; whole floats read as integers (2.0 -> "2")."""
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)
+    return str(val).strip()
+
+
+def check_column(series, rule):
+    """Boolean mask of the invalid cells of ``series`` and the distinct invalid values."""
+    codes, uniques = pd.factorize(series)
+    texts = [value_text(val) for val in uniques]
+    bad = np.array([text not in EXEMPT_VALUES and not rule.accepts(text) for text in texts] + [False])
+    # missing cells have code -1, which picks the trailing False
+    return bad[codes], [text for text, is_bad in zip(texts, bad) if is_bad]
+
+
+class Validator:
+    """Applies compiled rules to a frame, or to the chunks of one output in turn.
+
+    ``check`` returns the invalid cells of the frame it is given; the counts and
+    example values add up across calls and are read with ``summary``.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = compile_rules() if rules is None else rules
+        self.counts = {}
+        self.examples = {}
+
+    def check(self, frame):
+        """``{column: boolean row mask}`` for the columns of ``frame`` with invalid cells."""
+        invalid = {}
+        for field, rule in self.rules.items():
+            if field not in frame.columns:
+                continue
+            mask, bad_values = check_column(frame[field], rule)
+            counts = self.counts.setdefault(field, [0, 0])
+            counts[0] += int(mask.sum())
+            counts[1] += len(mask)
+            if bad_values:
+                invalid[field] = mask
+                examples = self.examples.setdefault(field, [])
+                examples.extend(val for val in bad_values[:MAX_EXAMPLES - len(examples)] if val not in examples)
+        return invalid
+
+    def total(self):
+        return sum(invalid for invalid, _ in self.counts.values())
+
+    def summary(self):
+        """One row per checked column with invalid cells, most violations first."""
+        rows = [
+            {"field": field, "rule": self.rules[field].name, "invalid": invalid, "rows": rows,
+             "examples": "; ".join(self.examples.get(field, []))}
+            for field, (invalid, rows) in self.counts.items() if invalid
+        ]
+        summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+        return summary.sort_values("invalid", ascending=False, kind="stable", ignore_index=True)